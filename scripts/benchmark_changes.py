@@ -0,0 +1,126 @@
+"""Measure the throughput of applying changes, comparing the compiled change
+applier (applyChange) with the interpreting reference implementation.
+
+    python scripts/benchmark_changes.py [numPoints]
+"""
+
+import sys
+import timeit
+from copy import deepcopy
+
+from fontra.core.changes import _applyChange, applyChange
+from fontra.core.classes import Font, Layer, Source, StaticGlyph, VariableGlyph
+from fontra.core.packedpath import PackedPath
+
+
+def makeFont(numPoints, numLayers=4):
+    numContours = max(1, numPoints // 50)
+    contours = [
+        {
+            "points": [
+                {"x": contourIndex * 10 + i, "y": i * 2}
+                for i in range(numPoints // numContours)
+            ],
+            "isClosed": True,
+        }
+        for contourIndex in range(numContours)
+    ]
+    layers = {
+        f"layer{i}": Layer(
+            glyph=StaticGlyph(
+                path=PackedPath.fromUnpackedContours(contours), xAdvance=1000
+            )
+        )
+        for i in range(numLayers)
+    }
+    sources = [
+        Source(name=layerName, layerName=layerName, location={"wght": i})
+        for i, layerName in enumerate(layers)
+    ]
+    glyph = VariableGlyph(name="uni4E00", sources=sources, layers=layers)
+    return Font(glyphs={glyph.name: glyph})
+
+
+def moveAllPointsChange(font, dx, dy):
+    glyph = font.glyphs["uni4E00"]
+    return {
+        "p": ["glyphs", "uni4E00", "layers"],
+        "c": [
+            {
+                "p": [layerName, "glyph", "path"],
+                "c": [
+                    {"f": "=xy", "a": [i, x + dx, y + dy]}
+                    for i, (x, y) in enumerate(
+                        zip(
+                            layer.glyph.path.coordinates[0::2],
+                            layer.glyph.path.coordinates[1::2],
+                        )
+                    )
+                ],
+            }
+            for layerName, layer in glyph.layers.items()
+        ],
+    }
+
+
+def sourcesAndAdvancesChange(font):
+    glyph = font.glyphs["uni4E00"]
+    return {
+        "p": ["glyphs", "uni4E00"],
+        "c": [
+            {"p": ["layers", layerName, "glyph"], "f": "=", "a": ["xAdvance", 1100]}
+            for layerName in glyph.layers
+        ]
+        + [
+            {"p": ["sources", i, "location"], "f": "=", "a": ["wght", i * 100]}
+            for i in range(len(glyph.sources))
+        ],
+    }
+
+
+def benchmark(label, font, change, numItems, number=5):
+    results = {}
+    for name, func in [("interpreted", _applyChange), ("compiled", applyChange)]:
+        subject = deepcopy(font)
+        seconds = min(
+            timeit.repeat(lambda: func(subject, change), number=number, repeat=3)
+        )
+        results[name] = seconds / number
+    speedup = results["interpreted"] / results["compiled"]
+    print(f"{label}:")
+    for name, seconds in results.items():
+        print(
+            f"    {name:>11}: {seconds * 1000:8.2f} ms per change, "
+            f"{numItems / seconds:12,.0f} items/s"
+        )
+    print(f"    speedup: {speedup:.2f}x")
+
+
+def main():
+    numPoints = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    font = makeFont(numPoints)
+    glyph = font.glyphs["uni4E00"]
+    numLayers = len(glyph.layers)
+    totalPoints = sum(
+        len(layer.glyph.path.pointTypes) for layer in glyph.layers.values()
+    )
+
+    change = moveAllPointsChange(font, 5, -5)
+    benchmark(
+        f"move {totalPoints} points in {numLayers} layers ({totalPoints} children)",
+        font,
+        change,
+        totalPoints,
+    )
+    change = sourcesAndAdvancesChange(font)
+    benchmark(
+        "set advances and source locations",
+        font,
+        change,
+        len(change["c"]),
+        number=2000,
+    )
+
+
+if __name__ == "__main__":
+    main()
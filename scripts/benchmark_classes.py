@@ -0,0 +1,105 @@
+"""Measure the speed of converting glyphs to and from dicts, comparing the
+generated functions from fontra.core.classes with dataclasses.asdict() and
+dacite.from_dict(). The glyphs are read from the MutatorSans test font.
+
+    python scripts/benchmark_classes.py [fontPath]
+"""
+
+import asyncio
+import contextlib
+import json
+import pathlib
+import sys
+import timeit
+from dataclasses import asdict
+
+import dacite
+
+from fontra.backends.designspace import DesignspaceBackend
+from fontra.core.classes import VariableGlyph, classFromDictFuncs, classToDictFuncs
+from fontra.core.packedpath import PointType
+from fontra.core.remote import _jsonDefault
+
+repoRoot = pathlib.Path(__file__).resolve().parent.parent
+defaultFontPath = (
+    repoRoot / "test-py" / "data" / "mutatorsans" / "MutatorSans.designspace"
+)
+
+
+async def readGlyphs(fontPath):
+    font = DesignspaceBackend.fromPath(fontPath)
+    with contextlib.closing(font):
+        glyphMap = await font.getGlyphMap()
+        return [await font.getGlyph(glyphName) for glyphName in sorted(glyphMap)]
+
+
+def benchmark(label, candidates, numItems, number=20):
+    results = {}
+    for name, func in candidates:
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        results[name] = seconds / number
+    print(f"{label}:")
+    for name, seconds in results.items():
+        print(
+            f"    {name:>9}: {seconds * 1000:8.2f} ms, "
+            f"{numItems / seconds:10,.0f} glyphs/s"
+        )
+    first, second = results.values()
+    print(f"    speedup: {first / second:.2f}x")
+
+
+def main():
+    fontPath = sys.argv[1] if len(sys.argv) > 1 else defaultFontPath
+    glyphs = asyncio.run(readGlyphs(fontPath))
+    glyphDicts = [
+        json.loads(json.dumps(asdict(glyph), default=_jsonDefault)) for glyph in glyphs
+    ]
+    toDict = classToDictFuncs[VariableGlyph]
+    fromDict = classFromDictFuncs[VariableGlyph]
+    castConfig = dacite.Config(cast=[PointType])
+    print(f"{len(glyphs)} glyphs from {pathlib.Path(fontPath).name}")
+
+    benchmark(
+        "to dict",
+        [
+            ("asdict", lambda: [asdict(glyph) for glyph in glyphs]),
+            ("generated", lambda: [toDict(glyph) for glyph in glyphs]),
+        ],
+        len(glyphs),
+    )
+    benchmark(
+        "to JSON",
+        [
+            (
+                "asdict",
+                lambda: [
+                    json.dumps(asdict(glyph), default=_jsonDefault) for glyph in glyphs
+                ],
+            ),
+            (
+                "generated",
+                lambda: [
+                    json.dumps(toDict(glyph), default=_jsonDefault) for glyph in glyphs
+                ],
+            ),
+        ],
+        len(glyphs),
+    )
+    benchmark(
+        "from dict",
+        [
+            (
+                "dacite",
+                lambda: [
+                    dacite.from_dict(VariableGlyph, glyphDict, config=castConfig)
+                    for glyphDict in glyphDicts
+                ],
+            ),
+            ("generated", lambda: [fromDict(glyphDict) for glyphDict in glyphDicts]),
+        ],
+        len(glyphs),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measure the memory used per glyph, comparing the slot-based classes from
+fontra.core.classes with equivalent classes whose instances have a __dict__.
+The glyphs are read from the MutatorSans test font.
+
+    python scripts/benchmark_memory.py [fontPath] [numCopies]
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import gc
+import json
+import pathlib
+import sys
+import tracemalloc
+
+from fontra.backends.designspace import DesignspaceBackend
+from fontra.core.classes import (
+    VariableGlyph,
+    classFromDictFuncs,
+    classSchema,
+    makeFromDictFuncs,
+    toDict,
+)
+from fontra.core.lrucache import estimateSize
+from fontra.core.remote import _jsonDefault
+
+repoRoot = pathlib.Path(__file__).resolve().parent.parent
+defaultFontPath = (
+    repoRoot / "test-py" / "data" / "mutatorsans" / "MutatorSans.designspace"
+)
+
+
+async def readGlyphDicts(fontPath):
+    font = DesignspaceBackend.fromPath(fontPath)
+    with contextlib.closing(font):
+        glyphMap = await font.getGlyphMap()
+        glyphs = [await font.getGlyph(glyphName) for glyphName in sorted(glyphMap)]
+    return [
+        json.loads(json.dumps(toDict(glyph), default=_jsonDefault)) for glyph in glyphs
+    ]
+
+
+def makeDictBasedClass(cls):
+    # Recreate the dataclass `cls` without slots
+    classFields = [
+        (
+            classField.name,
+            classField.type,
+            dataclasses.field(
+                default=classField.default,
+                default_factory=classField.default_factory,
+                kw_only=classField.kw_only,
+            ),
+        )
+        for classField in dataclasses.fields(cls)
+    ]
+    namespace = {}
+    if hasattr(cls, "__post_init__"):
+        namespace["__post_init__"] = cls.__post_init__
+    return dataclasses.make_dataclass(cls.__name__, classFields, namespace=namespace)
+
+
+def measure(fromDict, glyphDicts, numCopies):
+    gc.collect()
+    tracemalloc.start()
+    glyphs = [fromDict(glyphDict) for _ in range(numCopies) for glyphDict in glyphDicts]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(glyphs), glyphs
+
+
+def main():
+    fontPath = sys.argv[1] if len(sys.argv) > 1 else defaultFontPath
+    numCopies = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    glyphDicts = asyncio.run(readGlyphDicts(fontPath))
+    print(f"{len(glyphDicts)} glyphs from {pathlib.Path(fontPath).name}")
+
+    dictBasedSchema = {
+        makeDictBasedClass(cls): classFields for cls, classFields in classSchema.items()
+    }
+    dictBasedFromDictFuncs = makeFromDictFuncs(dictBasedSchema)
+    dictBasedVariableGlyph = next(
+        cls for cls in dictBasedSchema if cls.__name__ == "VariableGlyph"
+    )
+
+    results = {}
+    for name, fromDict in [
+        ("__dict__", dictBasedFromDictFuncs[dictBasedVariableGlyph]),
+        ("slots", classFromDictFuncs[VariableGlyph]),
+    ]:
+        bytesPerGlyph, glyphs = measure(fromDict, glyphDicts, numCopies)
+        estimatedBytesPerGlyph = sum(estimateSize(glyph) for glyph in glyphs) / len(
+            glyphs
+        )
+        results[name] = bytesPerGlyph
+        print(
+            f"    {name:>8}: {bytesPerGlyph:8,.0f} bytes per glyph "
+            f"(estimated for the cache: {estimatedBytesPerGlyph:,.0f})"
+        )
+        del glyphs
+    saved = 1 - results["slots"] / results["__dict__"]
+    print(f"    saved: {saved:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,18 @@ def main():
     parser.add_argument(
         "--launch", action="store_true", help="Launch the default browser"
     )
+    parser.add_argument(
+        "--no-websocket-compression",
+        action="store_true",
+        help="Don't offer permessage-deflate compression for websocket messages",
+    )
+    parser.add_argument(
+        "--compression-threshold",
+        type=int,
+        default=FontraServer.compressionThreshold,
+        help="The size in bytes below which websocket messages are sent uncompressed "
+        "(default: %(default)s)",
+    )
     parser.add_argument(
         "-V",
         "--version",
@@ -49,6 +61,8 @@ def main():
         projectManager=manager,
         launchWebBrowser=args.launch,
         versionToken=secrets.token_hex(4),
+        websocketCompression=not args.no_websocket_compression,
+        compressionThreshold=args.compression_threshold,
     )
     server.setup()
     server.run()
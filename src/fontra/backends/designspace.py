@@ -6,6 +6,7 @@ import math
 import os
 import pathlib
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from dataclasses import asdict, dataclass
 from datetime import datetime
@@ -17,7 +18,7 @@ from fontTools.designspaceLib import DesignSpaceDocument
 from fontTools.misc.transform import Transform
 from fontTools.pens.recordingPen import RecordingPointPen
 from fontTools.ufoLib import UFOReaderWriter
-from fontTools.ufoLib.glifLib import GlyphSet
+from fontTools.ufoLib.glifLib import GlyphSet, readGlyphFromString
 
 from ..core.changes import applyChange
 from ..core.classes import (
@@ -31,7 +32,13 @@ from ..core.classes import (
     VariableGlyph,
 )
 from ..core.packedpath import PackedPathPointPen
-from .ufo_utils import extractGlyphNameAndUnicodes
+from .ufo_utils import (
+    GlyphMapIndex,
+    extractComponentNames,
+    extractGlyphNameAndUnicodes,
+    scanGLIFComponentNames,
+    scanGLIFFiles,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -53,11 +60,14 @@ infoAttrsToCopy = [
 
 
 class DesignspaceBackend:
+    # Our read and write methods do synchronous file I/O
+    hasBlockingIO = True
+
     @classmethod
-    def fromPath(cls, path):
-        return cls(DesignSpaceDocument.fromfile(path))
+    def fromPath(cls, path, progressCallback=None):
+        return cls(DesignSpaceDocument.fromfile(path), progressCallback)
 
-    def __init__(self, dsDoc):
+    def __init__(self, dsDoc, progressCallback=None):
         self.dsDoc = dsDoc
         self.dsDoc.findDefault()
         axes = []
@@ -88,13 +98,16 @@ class DesignspaceBackend:
         }
         self.loadUFOLayers()
         self.buildFileNameMapping()
+        defaultGlyphSet = self.defaultUFOLayer.glyphSet
+        self.glyphMapIndex = GlyphMapIndex.fromGlyphSet(defaultGlyphSet)
         self.glyphMap = getGlyphMapFromGlyphSet(
-            self.dsSources.findItem(isDefault=True).layer.glyphSet
+            defaultGlyphSet, self.glyphMapIndex, progressCallback
         )
+        self.glyphMapIndex.save()
         self.savedGlyphModificationTimes = {}
 
     def close(self):
-        pass
+        self.glyphMapIndex.save()
 
     @property
     def defaultDSSource(self):
@@ -150,8 +163,14 @@ class DesignspaceBackend:
             )
 
     def buildFileNameMapping(self):
+        # Reading contents.plist and validating it stats every .glif file,
+        # so load the glyph sets of all layers concurrently
+        with ThreadPoolExecutor() as executor:
+            glyphSets = list(
+                executor.map(lambda ufoLayer: ufoLayer.glyphSet, self.ufoLayers)
+            )
         glifFileNames = {}
-        for glyphSet in self.ufoLayers.iterAttrs("glyphSet"):
+        for glyphSet in glyphSets:
             for glyphName, fileName in glyphSet.contents.items():
                 glifFileNames[fileName] = glyphName
         self.glifFileNames = glifFileNames
@@ -197,6 +216,29 @@ class DesignspaceBackend:
 
         return glyph
 
+    async def getComponentNames(self, glyphNames=None):
+        """Return a dict mapping glyph names to the sorted names of the glyphs
+        used as components in any of their layers. This only scans the .glif
+        files for components, which is much faster than loading the glyphs.
+        """
+        if glyphNames is None:
+            glyphNames = self.glyphMap
+        componentNames = {
+            glyphName: set() for glyphName in glyphNames if glyphName in self.glyphMap
+        }
+        for glyphSet in self.ufoLayers.iterAttrs("glyphSet"):
+            fileNames = {
+                glyphSet.contents[glyphName]: glyphName
+                for glyphName in componentNames
+                if glyphName in glyphSet
+            }
+            scannedNames = scanGLIFComponentNames(
+                glyphSet.fs.getsyspath("/"), fileNames, _extractComponentNames
+            )
+            for fileName, names in scannedNames.items():
+                componentNames[fileNames[fileName]].update(names)
+        return {glyphName: sorted(names) for glyphName, names in componentNames.items()}
+
     def _unpackLocalDesignSpace(self, dsDict, ufoPath, defaultLayerName):
         axes = [
             LocalAxis(
@@ -229,6 +271,21 @@ class DesignspaceBackend:
         return axes, sources
 
     async def putGlyph(self, glyphName, glyph, unicodes):
+        await self.putGlyphs([(glyphName, glyph, unicodes)])
+
+    async def putGlyphs(self, glyphs):
+        # Each contents.plist is written only once for the whole batch
+        modifiedGlyphSets = {}  # using a dict as an order-preserving set
+        try:
+            for glyphName, glyph, unicodes in glyphs:
+                self._putGlyph(glyphName, glyph, unicodes, modifiedGlyphSets)
+        finally:
+            # Also when a glyph failed: the .glif files of the glyphs before
+            # it have been written, and must be listed in contents.plist
+            for glyphSet in modifiedGlyphSets:
+                self.updateGlyphSetContents(glyphSet)
+
+    def _putGlyph(self, glyphName, glyph, unicodes, modifiedGlyphSets):
         assert isinstance(unicodes, list)
         assert all(isinstance(cp, int) for cp in unicodes)
         modTimes = set()
@@ -257,10 +314,13 @@ class DesignspaceBackend:
 
             glyphSet.writeGlyph(glyphName, layerGlyph, drawPointsFunc=drawPointsFunc)
             if writeGlyphSetContents:
-                # FIXME: this is inefficient if we write many glyphs
-                self.updateGlyphSetContents(glyphSet)
+                modifiedGlyphSets[glyphSet] = None
 
             modTimes.add(glyphSet.getGLIFModificationTime(glyphName))
+            if glyphSet == self.defaultUFOLayer.glyphSet:
+                self.glyphMapIndex.updateEntry(
+                    glyphSet.contents[glyphName], glyphName, unicodes
+                )
 
         relevantLayerNames = set(
             layer.fontraLayerName
@@ -270,13 +330,38 @@ class DesignspaceBackend:
         layersToDelete = relevantLayerNames - usedLayers
         for layerName in layersToDelete:
             glyphSet = self.ufoLayers.findItem(fontraLayerName=layerName).glyphSet
+            if glyphSet == self.defaultUFOLayer.glyphSet:
+                self.glyphMapIndex.deleteEntry(glyphSet.contents[glyphName])
             glyphSet.deleteGlyph(glyphName)
-            # FIXME: this is inefficient if we write many glyphs
-            self.updateGlyphSetContents(glyphSet)
+            modifiedGlyphSets[glyphSet] = None
             modTimes.add(None)
 
         self.savedGlyphModificationTimes[glyphName] = modTimes
 
+    async def deleteGlyph(self, glyphName):
+        await self.deleteGlyphs([glyphName])
+
+    async def deleteGlyphs(self, glyphNames):
+        modifiedGlyphSets = {}  # using a dict as an order-preserving set
+        try:
+            for glyphName in glyphNames:
+                if glyphName not in self.glyphMap:
+                    raise KeyError(f"Glyph '{glyphName}' does not exist")
+                for glyphSet in self.ufoLayers.iterAttrs("glyphSet"):
+                    if glyphName not in glyphSet:
+                        continue
+                    if glyphSet == self.defaultUFOLayer.glyphSet:
+                        self.glyphMapIndex.deleteEntry(glyphSet.contents[glyphName])
+                    glyphSet.deleteGlyph(glyphName)
+                    modifiedGlyphSets[glyphSet] = None
+                del self.glyphMap[glyphName]
+                # Tell the external change watcher that we deleted this glyph
+                self.savedGlyphModificationTimes[glyphName] = {None}
+        finally:
+            # Also when a glyph failed, for the glyphs deleted before it
+            for glyphSet in modifiedGlyphSets:
+                self.updateGlyphSetContents(glyphSet)
+
     def _getGlobalSource(self, source, create=False):
         sourceLocation = {**self.defaultLocation, **source.location}
         sourceLocationTuple = tuplifyLocation(sourceLocation)
@@ -381,43 +466,84 @@ class DesignspaceBackend:
         return self.dsDoc.lib
 
     async def watchExternalChanges(self):
+        async for changes in self.watchFileChanges():
+            result = await self.processExternalChanges(changes)
+            if result is not None:
+                yield result
+
+    async def watchFileChanges(self):
+        """Yield lists of (change, path) tuples for the files that changed in
+        our UFOs. This does not touch our data, see processExternalChanges().
+        """
         ufoPaths = sorted(set(self.ufoLayers.iterAttrs("path")))
         async for changes in watchfiles.awatch(*ufoPaths):
             changes = cleanupWatchFilesChanges(changes)
-            changedItems = await self._analyzeExternalChanges(changes)
-
-            glyphMapUpdates = {}
-
-            # TODO: update glyphMap for changed non-new glyphs
-
-            for glyphName in changedItems.newGlyphs:
-                try:
-                    glifData = self.defaultSourceGlyphSet.getGLIF(glyphName)
-                except KeyError:
-                    logger.info(f"new glyph '{glyphName}' not found in default source")
-                    continue
-                gn, unicodes = extractGlyphNameAndUnicodes(glifData)
-                glyphMapUpdates[glyphName] = unicodes
+            if any(
+                change != watchfiles.Change.modified and path.endswith(".glif")
+                for change, path in changes
+            ):
+                #
+                # In some cases we're responding to a changed glyph while the
+                # contents.plist hasn't finished writing yet. Let's pause a
+                # little bit and hope for the best.
+                #
+                # This is obviously not a solid solution, and I'm not sure there
+                # is one, given we don't know whether new .glif files written
+                # before or after the corresponding contents.plist file. And even
+                # if we do know, the amount of time between the two events can be
+                # arbitrarily long, at least in theory, when many new glyphs are
+                # written at once.
+                #
+                # TODO: come up with a better solution.
+                #
+                await asyncio.sleep(0.15)
+            yield changes
+
+    async def processExternalChanges(self, changes):
+        """Update our data for the external file `changes`, and return a
+        (change, reloadPattern) tuple for the font handler, or None if there
+        is nothing to report.
+        """
+        changedItems = self._analyzeExternalChanges(changes)
+
+        glyphMapUpdates = {}
+
+        # TODO: update glyphMap for changed non-new glyphs
+
+        defaultGlyphSet = self.defaultUFOLayer.glyphSet
+        for glyphName in changedItems.newGlyphs:
+            try:
+                glifData = defaultGlyphSet.getGLIF(glyphName)
+            except KeyError:
+                logger.info(f"new glyph '{glyphName}' not found in default source")
+                continue
+            gn, unicodes = extractGlyphNameAndUnicodes(glifData)
+            glyphMapUpdates[glyphName] = unicodes
+            self.glyphMapIndex.updateEntry(
+                defaultGlyphSet.contents[glyphName], glyphName, unicodes
+            )
 
-            for glyphName in changedItems.deletedGlyphs:
-                glyphMapUpdates[glyphName] = None
+        for glyphName in changedItems.deletedGlyphs:
+            glyphMapUpdates[glyphName] = None
+        self.glyphMapIndex.retainEntries(defaultGlyphSet.contents.values())
 
-            externalChange = makeGlyphMapChange(glyphMapUpdates)
+        externalChange = makeGlyphMapChange(glyphMapUpdates)
 
-            reloadPattern = (
-                {"glyphs": dict.fromkeys(changedItems.changedGlyphs)}
-                if changedItems.changedGlyphs
-                else None
-            )
+        reloadPattern = (
+            {"glyphs": dict.fromkeys(changedItems.changedGlyphs)}
+            if changedItems.changedGlyphs
+            else None
+        )
 
-            if externalChange:
-                rootObject = {"glyphMap": self.glyphMap}
-                applyChange(rootObject, externalChange)
+        if externalChange:
+            rootObject = {"glyphMap": self.glyphMap}
+            applyChange(rootObject, externalChange)
 
-            if externalChange or reloadPattern:
-                yield externalChange, reloadPattern
+        if externalChange or reloadPattern:
+            return externalChange, reloadPattern
+        return None
 
-    async def _analyzeExternalChanges(self, changes):
+    def _analyzeExternalChanges(self, changes):
         changedItems = SimpleNamespace(
             changedGlyphs=set(),
             newGlyphs=set(),
@@ -431,20 +557,6 @@ class DesignspaceBackend:
                 self._analyzeExternalGlyphChanges(change, path, changedItems)
 
         if changedItems.rebuildGlyphSetContents:
-            #
-            # In some cases we're responding to a changed glyph while the
-            # contents.plist hasn't finished writing yet. Let's pause a little
-            # bit and hope for the best.
-            #
-            # This is obviously not a solid solution, and I'm not sure there is
-            # one, given we don't know whether new .glif files written before or
-            # after the corresponding contents.plist file. And even if we do know,
-            # the amount of time between the two events can be arbitrarily long,
-            # at least in theory, when many new glyphs are written at once.
-            #
-            # TODO: come up with a better solution.
-            #
-            await asyncio.sleep(0.15)
             for glyphSet in self.ufoLayers.iterAttrs("glyphSet"):
                 glyphSet.rebuildContents()
 
@@ -459,9 +571,10 @@ class DesignspaceBackend:
             changedItems.rebuildGlyphSetContents = True
             if path.startswith(os.path.join(self.dsDoc.default.path, "glyphs/")):
                 # The glyph was deleted from the default source,
-                # do a full delete
+                # do a full delete, unless we deleted it ourselves
                 del self.glifFileNames[fileName]
-                changedItems.deletedGlyphs.add(glyphName)
+                if self.savedGlyphModificationTimes.get(glyphName) != {None}:
+                    changedItems.deletedGlyphs.add(glyphName)
             # else:
             # The glyph was deleted from a non-default source,
             # just reload.
@@ -518,10 +631,10 @@ def makeGlyphMapChange(glyphMapUpdates):
 
 class UFOBackend:
     @classmethod
-    def fromPath(cls, path):
+    def fromPath(cls, path, progressCallback=None):
         dsDoc = DesignSpaceDocument()
         dsDoc.addSourceDescriptor(path=os.fspath(path), styleName="default")
-        return DesignspaceBackend(dsDoc)
+        return DesignspaceBackend(dsDoc, progressCallback)
 
 
 class UFOGlyph:
@@ -638,7 +751,8 @@ def serializeGlyphLayers(glyphSets, glyphName, sourceLayerName):
 def serializeStaticGlyph(glyphSet, glyphName):
     glyph = UFOGlyph()
     glyph.lib = {}
-    pen = PackedPathPointPen()
+    # Keep "364.0" as is when the glyph is written back
+    pen = PackedPathPointPen(keepIntegralFloats=True)
     glyphSet.readGlyph(glyphName, glyph, pen, validate=False)
     components = [*pen.components] + unpackVariableComponents(glyph.lib)
     staticGlyph = StaticGlyph(
@@ -660,6 +774,21 @@ def unpackVariableComponents(lib):
     return components
 
 
+_variableComponentsLibKeyBytes = VARIABLE_COMPONENTS_LIB_KEY.encode("utf-8")
+
+
+def _extractComponentNames(data):
+    componentNames = extractComponentNames(data)
+    if _variableComponentsLibKeyBytes in data:
+        glyph = UFOGlyph()
+        glyph.lib = {}
+        readGlyphFromString(data, glyph, validate=False)
+        componentNames += [
+            component.name for component in unpackVariableComponents(glyph.lib)
+        ]
+    return componentNames
+
+
 def buildUFOLayerGlyph(
     glyphSet: GlyphSet,
     glyphName: str,
@@ -700,11 +829,31 @@ def buildUFOLayerGlyph(
     return layerGlyph, pen.replay
 
 
-def getGlyphMapFromGlyphSet(glyphSet):
+def getGlyphMapFromGlyphSet(glyphSet, glyphMapIndex=None, progressCallback=None):
+    glyphSetPath = glyphSet.fs.getsyspath("/")
+    contents = glyphSet.contents
+    indexedEntries = {}
+    if glyphMapIndex is not None:
+        glyphMapIndex.retainEntries(contents.values())
+        for fileName in contents.values():
+            entry = glyphMapIndex.getEntry(fileName)
+            if entry is not None:
+                indexedEntries[fileName] = entry
+    scannedEntries = scanGLIFFiles(
+        glyphSetPath,
+        [fileName for fileName in contents.values() if fileName not in indexedEntries],
+        progressCallback,
+    )
+
     glyphMap = {}
-    for glyphName in glyphSet.keys():
-        glifData = glyphSet.getGLIF(glyphName)
-        gn, unicodes = extractGlyphNameAndUnicodes(glifData)
+    for glyphName, fileName in contents.items():
+        entry = indexedEntries.get(fileName)
+        if entry is None:
+            gn, unicodes, statKey = scannedEntries[fileName]
+            if glyphMapIndex is not None and statKey is not None:
+                glyphMapIndex.setEntry(fileName, statKey, gn, unicodes)
+        else:
+            gn, unicodes = entry
         assert gn == glyphName, (gn, glyphName)
         glyphMap[glyphName] = unicodes
     return glyphMap
@@ -1,14 +1,46 @@
+import json
+import logging
+import os
+from copy import copy
+from itertools import islice
+
 from fontTools.misc.psCharStrings import SimpleT2Decompiler
 from fontTools.pens.pointPen import GuessSmoothPointPen
 from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates, table__g_l_y_f
+from fontTools.varLib.iup import iup_delta
+from fontTools.varLib.models import supportScalar
+from fontTools.varLib.varStore import VarStoreInstancer
 
+from ..core.cachedir import getCachePath, writeFileAtomically
 from ..core.classes import GlobalAxis, Layer, Source, StaticGlyph, VariableGlyph
+from ..core.lrucache import LRUCache
 from ..core.packedpath import PackedPath, PackedPathPointPen
 
+logger = logging.getLogger(__name__)
+
+# _instantiateFromGvar() uses private fontTools functions. If they are missing,
+# or don't behave as expected, the public (but slower) glyph set API is used.
+try:
+    from fontTools.ttLib.ttGlyphSet import _setCoordinates
+except ImportError:
+    _setCoordinates = None
+canInstantiateFromGvar = _setCoordinates is not None and hasattr(
+    table__g_l_y_f, "_getCoordinatesAndControls"
+)
+
 
 class OTFBackend:
+    # The lazily loaded TTFont is not thread-safe, so while our read methods
+    # should not block the event loop, they should not run concurrently
+    hasBlockingIO = True
+    maxConcurrentReads = 1
+    # Instanced glyph sets are only used for CFF2 fonts and for variable
+    # composite glyphs, gvar outlines are computed directly from the deltas
+    variationGlyphSetCacheSize = 16
+
     @classmethod
-    def fromPath(cls, path):
+    def fromPath(cls, path, progressCallback=None):
         self = cls()
         self.path = path
         self.font = TTFont(path, lazy=True)
@@ -28,10 +60,14 @@ class OTFBackend:
             glyphMap[glyphName].append(code)
         self.glyphMap = glyphMap
         self.glyphSet = self.font.getGlyphSet()
-        self.variationGlyphSets = {}
+        self.variationGlyphSets = LRUCache(self.variationGlyphSetCacheSize)
+        self.variationLocationIndex = VariationLocationIndex.fromFontPath(path)
+        self._glyphNamesToIndex = iter(glyphMap)
+        self._useGvarInstantiation = canInstantiateFromGvar
         return self
 
     def close(self):
+        self.variationLocationIndex.save()
         self.font.close()
 
     async def getGlyphMap(self):
@@ -52,14 +88,26 @@ class OTFBackend:
                 layerName=defaultLayerName,
             )
         ]
-        for sparseLoc in self._getGlyphVariationLocations(glyphName):
-            fullLoc = defaultLocation | sparseLoc
+        sparseLocs = self._getGlyphVariationLocations(glyphName)
+        fullLocs = [defaultLocation | sparseLoc for sparseLoc in sparseLocs]
+        varGlyphs = None
+        if self._canInstantiateFromGvar(glyphName):
+            try:
+                varGlyphs = self._instantiateFromGvar(glyphName, fullLocs)
+            except (AttributeError, TypeError, ValueError) as e:
+                # Most likely an incompatible fontTools version
+                logger.warning(
+                    "instantiating glyphs from gvar failed, "
+                    f"falling back to glyph sets: {e!r}"
+                )
+                self._useGvarInstantiation = False
+        if varGlyphs is None:
+            varGlyphs = [
+                serializeGlyph(self._getVariationGlyphSet(fullLoc), glyphName)
+                for fullLoc in fullLocs
+            ]
+        for sparseLoc, fullLoc, varGlyph in zip(sparseLocs, fullLocs, varGlyphs):
             locStr = locationToString(sparseLoc)
-            varGlyphSet = self.variationGlyphSets.get(locStr)
-            if varGlyphSet is None:
-                varGlyphSet = self.font.getGlyphSet(location=fullLoc, normalized=True)
-                self.variationGlyphSets[locStr] = varGlyphSet
-            varGlyph = serializeGlyph(varGlyphSet, glyphName)
             layers[locStr] = Layer(glyph=varGlyph)
             sources.append(Source(location=fullLoc, name=locStr, layerName=locStr))
         if self.charStrings is not None:
@@ -68,8 +116,114 @@ class OTFBackend:
         glyph.sources = sources
         return glyph
 
+    def _getVariationGlyphSet(self, location):
+        locStr = locationToString(location)
+        varGlyphSet = self.variationGlyphSets.get(locStr)
+        if varGlyphSet is None:
+            varGlyphSet = self.font.getGlyphSet(location=location, normalized=True)
+            self.variationGlyphSets[locStr] = varGlyphSet
+        return varGlyphSet
+
+    def _canInstantiateFromGvar(self, glyphName):
+        return (
+            self._useGvarInstantiation
+            and self.gvarVariations is not None
+            and not self.font["glyf"][glyphName].isVarComposite()
+        )
+
+    def _instantiateFromGvar(self, glyphName, locations):
+        # Compute the glyph at all `locations` in one go: the deltas are
+        # decoded (and their inferred points interpolated) only once, instead
+        # of once per location as the instanced glyph sets do. The arithmetic
+        # is the same as fontTools' ttGlyphSet, so the results are identical.
+        glyfTable = self.font["glyf"]
+        hMetrics = self.font["hmtx"].metrics
+        vMetrics = getattr(self.font.get("vmtx"), "metrics", None)
+        coordinates, control = glyfTable._getCoordinatesAndControls(
+            glyphName, hMetrics, vMetrics
+        )
+        endPts = control[1] if control[0] >= 1 else list(range(len(control[1])))
+        deltas = []
+        for variation in self.gvarVariations.get(glyphName, []):
+            delta = variation.coordinates
+            if None in delta:
+                delta = iup_delta(delta, coordinates, endPts)
+            deltas.append((variation.axes, GlyphCoordinates(delta)))
+
+        hvarTable = getattr(self.font.get("HVAR"), "table", None)
+        if hvarTable is not None:
+            varIndex = (
+                self.font.getGlyphID(glyphName)
+                if hvarTable.AdvWidthMap is None
+                else hvarTable.AdvWidthMap.mapping[glyphName]
+            )
+            hvarInstancer = VarStoreInstancer(
+                hvarTable.VarStore, self.font["fvar"].axes
+            )
+
+        varGlyphs = []
+        for location in locations:
+            varCoordinates = GlyphCoordinates(coordinates)
+            for axes, delta in deltas:
+                scalar = supportScalar(location, axes)
+                if scalar:
+                    varCoordinates += delta * scalar
+            ttGlyph = copy(glyfTable[glyphName])  # Shallow copy
+            # Returns the phantom point metrics: width, lsb, height, tsb
+            width, lsb = _setCoordinates(ttGlyph, varCoordinates, glyfTable)[:2]
+            if hvarTable is not None:
+                hvarInstancer.setLocation(location)
+                width = hMetrics[glyphName][0] + hvarInstancer[varIndex]
+            pen = PackedPathPointPen()
+            offset = lsb - ttGlyph.xMin if hasattr(ttGlyph, "xMin") else 0
+            ttGlyph.drawPoints(GuessSmoothPointPen(pen), glyfTable, offset)
+            varGlyphs.append(
+                StaticGlyph(
+                    path=pen.getPath(), components=pen.components, xAdvance=width
+                )
+            )
+        return varGlyphs
+
+    async def getComponentNames(self, glyphNames=None):
+        if glyphNames is None:
+            glyphNames = self.glyphMap
+        glyf = self.font.get("glyf")
+        if glyf is None:
+            # CFF-based fonts don't have components
+            return {
+                glyphName: [] for glyphName in glyphNames if glyphName in self.glyphMap
+            }
+        return {
+            glyphName: sorted(set(glyf[glyphName].getComponentNames(glyf)))
+            for glyphName in glyphNames
+            if glyphName in self.glyphMap
+        }
+
+    async def updateVariationLocationIndex(self, maxNumGlyphs=None):
+        """Add the variation locations of up to `maxNumGlyphs` more glyphs (or
+        of all remaining glyphs if None) to the variation location index.
+        Return True if the index is complete, in which case it is saved.
+        """
+        index = self.variationLocationIndex
+        glyphNames = list(islice(self._glyphNamesToIndex, maxNumGlyphs))
+        for glyphName in glyphNames:
+            if index.getEntry(glyphName) is None:
+                index.setEntry(
+                    glyphName, self._collectGlyphVariationLocations(glyphName)
+                )
+        if maxNumGlyphs is not None and len(glyphNames) == maxNumGlyphs:
+            return False
+        index.save()
+        return True
+
     def _getGlyphVariationLocations(self, glyphName):
-        # TODO/FIXME: This misses variations that only exist in HVAR/VVAR
+        locations = self.variationLocationIndex.getEntry(glyphName)
+        if locations is None:
+            locations = self._collectGlyphVariationLocations(glyphName)
+            self.variationLocationIndex.setEntry(glyphName, locations)
+        return locations
+
+    def _collectGlyphVariationLocations(self, glyphName):
         locations = set()
         if self.gvarVariations is not None:
             locations = {
@@ -93,8 +247,30 @@ class OTFBackend:
                 for varDataIndex in vsIndices
                 for loc in getLocationsFromVarstore(varDataIndex, varStore, fvarAxes)
             }
+        locations.update(
+            tuplifyLocation(loc)
+            for loc in self._getMetricsVariationLocations(glyphName)
+        )
+        locations.discard(())
         return [dict(loc) for loc in sorted(locations)]
 
+    def _getMetricsVariationLocations(self, glyphName):
+        # The advances may vary at locations where the outline doesn't
+        for tableTag, mapName in [("HVAR", "AdvWidthMap"), ("VVAR", "AdvHeightMap")]:
+            table = getattr(self.font.get(tableTag), "table", None)
+            if table is None:
+                continue
+            varIndexMap = getattr(table, mapName)
+            varIndex = (
+                self.font.getGlyphID(glyphName)
+                if varIndexMap is None
+                else varIndexMap.mapping.get(glyphName)
+            )
+            if varIndex is not None:
+                yield from getLocationsFromVarIndex(
+                    varIndex, table.VarStore, self.font["fvar"].axes
+                )
+
     async def getGlobalAxes(self):
         return self.globalAxes
 
@@ -112,12 +288,99 @@ def tuplifyLocation(loc):
 def getLocationsFromVarstore(varDataIndex, varStore, fvarAxes):
     regions = varStore.VarRegionList.Region
     for regionIndex in varStore.VarData[varDataIndex].VarRegionIndex:
-        location = {
-            fvarAxes[i].axisTag: reg.PeakCoord
-            for i, reg in enumerate(regions[regionIndex].VarRegionAxis)
-            if reg.PeakCoord != 0
-        }
-        yield location
+        yield getRegionLocation(regions[regionIndex], fvarAxes)
+
+
+def getLocationsFromVarIndex(varIndex, varStore, fvarAxes):
+    # Only the regions for which the delta set has non-zero deltas
+    varDataIndex, itemIndex = varIndex >> 16, varIndex & 0xFFFF
+    if varDataIndex >= len(varStore.VarData):
+        return  # NO_VARIATION_INDEX
+    varData = varStore.VarData[varDataIndex]
+    if itemIndex >= len(varData.Item):
+        return
+    regions = varStore.VarRegionList.Region
+    for regionIndex, delta in zip(varData.VarRegionIndex, varData.Item[itemIndex]):
+        if delta:
+            yield getRegionLocation(regions[regionIndex], fvarAxes)
+
+
+def getRegionLocation(region, fvarAxes):
+    return {
+        fvarAxes[i].axisTag: reg.PeakCoord
+        for i, reg in enumerate(region.VarRegionAxis)
+        if reg.PeakCoord != 0
+    }
+
+
+class VariationLocationIndex:
+    """A persistent cache for the variation locations of each glyph of a
+    variable font: the peak locations of its gvar tuples or CFF2 blend regions,
+    and of its HVAR/VVAR advance deltas. The index is validated against the
+    font file's modification time and size.
+    """
+
+    formatVersion = 1
+
+    def __init__(self, path, fontPath):
+        self.path = path
+        self.fontPath = os.path.abspath(os.fspath(fontPath))
+        self.statKey = statFontFile(self.fontPath)
+        self.entries = {}
+        self.dirty = False
+        self._load()
+
+    @classmethod
+    def fromFontPath(cls, fontPath):
+        return cls(getCachePath("variationlocations", fontPath, ".json"), fontPath)
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_bytes())
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(data, dict)
+            or data.get("formatVersion") != self.formatVersion
+            or data.get("fontPath") != self.fontPath
+            or data.get("statKey") != self.statKey
+        ):
+            return
+        self.entries = data.get("entries", {})
+
+    def save(self):
+        if not self.dirty or self.statKey is None:
+            return
+        data = dict(
+            formatVersion=self.formatVersion,
+            fontPath=self.fontPath,
+            statKey=self.statKey,
+            entries=dict(self.entries),
+        )
+        try:
+            writeFileAtomically(self.path, json.dumps(data).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"could not save variation location index: {e!r}")
+            return
+        self.dirty = False
+
+    def getEntry(self, glyphName):
+        """Return the list of sparse normalized locations for `glyphName`, or
+        None if the index has no entry for it.
+        """
+        return self.entries.get(glyphName)
+
+    def setEntry(self, glyphName, locations):
+        self.entries[glyphName] = locations
+        self.dirty = True
+
+
+def statFontFile(fontPath):
+    try:
+        st = os.stat(fontPath)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
 
 
 def unpackAxes(font):
@@ -1,13 +1,20 @@
+import json
 import logging
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from fontTools.ufoLib.filenames import userNameToFileName
 
+from ..core.cachedir import getCachePath, writeFileAtomically
+
 logger = logging.getLogger(__name__)
 
 
 _glyphNamePat = re.compile(rb'<glyph\s+name\s*=\s*"([^"]+)"')
 _unicodePat = re.compile(rb'<unicode\s+hex\s*=\s*"([^"]+)"')
+_componentBasePat = re.compile(rb'<component\s[^>]*?\bbase\s*=\s*"([^"]+)"')
 
 
 def extractGlyphNameAndUnicodes(data, fileName=None):
@@ -24,3 +31,164 @@ def extractGlyphNameAndUnicodes(data, fileName=None):
             )
     unicodes = [int(u, 16) for u in _unicodePat.findall(data)]
     return glyphName, unicodes
+
+
+def extractComponentNames(data):
+    return [name.decode("utf-8") for name in _componentBasePat.findall(data)]
+
+
+class GlyphMapIndex:
+    """A persistent cache for the glyph name and unicodes of each .glif file
+    in a glyph set. Entries are keyed by .glif file name, and are validated
+    against the file's modification time and size, so only files that changed
+    since the index was last saved need to be parsed.
+    """
+
+    formatVersion = 1
+
+    def __init__(self, path, glyphSetPath):
+        self.path = path
+        self.glyphSetPath = os.fspath(glyphSetPath)
+        self.entries = {}
+        self.dirty = False
+        self._load()
+
+    @classmethod
+    def fromGlyphSet(cls, glyphSet):
+        glyphSetPath = glyphSet.fs.getsyspath("/")
+        return cls(getCachePath("glyphmaps", glyphSetPath, ".json"), glyphSetPath)
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_bytes())
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(data, dict)
+            or data.get("formatVersion") != self.formatVersion
+            or data.get("glyphSetPath") != self.glyphSetPath
+        ):
+            return
+        self.entries = data.get("entries", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = dict(
+            formatVersion=self.formatVersion,
+            glyphSetPath=self.glyphSetPath,
+            entries=self.entries,
+        )
+        try:
+            writeFileAtomically(self.path, json.dumps(data).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"could not save glyph map index: {e!r}")
+            return
+        self.dirty = False
+
+    def getEntry(self, fileName):
+        """Return a (glyphName, unicodes) tuple for `fileName`, or None if the
+        index has no valid entry for it.
+        """
+        entry = self.entries.get(fileName)
+        if entry is None or entry[:2] != statGLIF(self.glyphSetPath, fileName):
+            return None
+        return entry[2], entry[3]
+
+    def setEntry(self, fileName, statKey, glyphName, unicodes):
+        self.entries[fileName] = list(statKey) + [glyphName, list(unicodes)]
+        self.dirty = True
+
+    def updateEntry(self, fileName, glyphName, unicodes):
+        statKey = statGLIF(self.glyphSetPath, fileName)
+        if statKey is None:
+            self.deleteEntry(fileName)
+        else:
+            self.setEntry(fileName, statKey, glyphName, unicodes)
+
+    def deleteEntry(self, fileName):
+        if self.entries.pop(fileName, None) is not None:
+            self.dirty = True
+
+    def retainEntries(self, fileNames):
+        staleFileNames = self.entries.keys() - set(fileNames)
+        for fileName in staleFileNames:
+            del self.entries[fileName]
+        if staleFileNames:
+            self.dirty = True
+
+
+def statGLIF(glyphSetPath, fileName):
+    try:
+        st = os.stat(os.path.join(glyphSetPath, fileName))
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def scanGLIFFiles(
+    glyphSetPath, fileNames, progressCallback=None, maxWorkers=None, chunkSize=256
+):
+    """Read and parse .glif files in chunks, using a thread pool if there are
+    many. Return a dict mapping file names to (glyphName, unicodes, statKey)
+    tuples. If given, `progressCallback` is called with the number of scanned
+    files and the total number of files after each chunk.
+    """
+    scanChunk = partial(_scanGLIFChunk, glyphSetPath)
+    return _scanInChunks(scanChunk, fileNames, progressCallback, maxWorkers, chunkSize)
+
+
+def scanGLIFComponentNames(
+    glyphSetPath,
+    fileNames,
+    extractFunc=extractComponentNames,
+    maxWorkers=None,
+    chunkSize=256,
+):
+    """Read .glif files like scanGLIFFiles(), but only look for components.
+    Return a dict mapping file names to lists of component base names, as
+    found by `extractFunc`, which is called with the .glif data.
+    """
+    scanChunk = partial(_scanGLIFComponentsChunk, glyphSetPath, extractFunc)
+    return _scanInChunks(scanChunk, fileNames, None, maxWorkers, chunkSize)
+
+
+def _scanInChunks(scanChunk, fileNames, progressCallback, maxWorkers, chunkSize):
+    fileNames = list(fileNames)
+    chunks = [fileNames[i : i + chunkSize] for i in range(0, len(fileNames), chunkSize)]
+    results = {}
+    if len(chunks) > 1:
+        executor = ThreadPoolExecutor(max_workers=maxWorkers)
+        chunkResults = executor.map(scanChunk, chunks)
+    else:
+        executor = None
+        chunkResults = map(scanChunk, chunks)
+    try:
+        for chunkResult in chunkResults:
+            results.update(chunkResult)
+            if progressCallback is not None:
+                progressCallback(len(results), len(fileNames))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return results
+
+
+def _scanGLIFChunk(glyphSetPath, fileNames):
+    results = {}
+    for fileName in fileNames:
+        # Stat before reading, so a concurrent modification can't result in
+        # an index entry that looks valid but contains old data
+        statKey = statGLIF(glyphSetPath, fileName)
+        with open(os.path.join(glyphSetPath, fileName), "rb") as f:
+            glyphName, unicodes = extractGlyphNameAndUnicodes(f.read())
+        results[fileName] = (glyphName, unicodes, statKey)
+    return results
+
+
+def _scanGLIFComponentsChunk(glyphSetPath, extractFunc, fileNames):
+    results = {}
+    for fileName in fileNames:
+        with open(os.path.join(glyphSetPath, fileName), "rb") as f:
+            results[fileName] = extractFunc(f.read())
+    return results
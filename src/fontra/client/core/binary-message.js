@@ -0,0 +1,66 @@
+// Decoder for the binary websocket message format, see
+// src/fontra/core/binarymessage.py for a description of the format.
+
+export const BINARY_ENCODING = "fontra-binary-1";
+
+const TYPED_ARRAY_KEY = "__typedarray__";
+
+const typedArrayTypes = {
+  B: Uint8Array,
+  h: Int16Array,
+  i: Int32Array,
+  d: Float64Array,
+};
+
+const isLittleEndian = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+export function decodeBinaryMessage(buffer) {
+  const headerLength = new DataView(buffer).getUint32(0, true);
+  const headerEnd = 4 + headerLength;
+  const header = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength))
+  );
+  const dataStart = align(headerEnd);
+  const arrays = header.buffers.map(([typeCode, byteOffset, length]) => {
+    const arrayType = typedArrayTypes[typeCode];
+    if (arrayType === undefined) {
+      throw new Error(`unknown typed array type: ${typeCode}`);
+    }
+    const start = dataStart + byteOffset;
+    if (!isLittleEndian && arrayType.BYTES_PER_ELEMENT > 1) {
+      return readBigEndianArray(buffer, start, length, arrayType);
+    }
+    return new arrayType(buffer, start, length);
+  });
+  return arrays.length ? resolveTypedArrays(header.message, arrays) : header.message;
+}
+
+function resolveTypedArrays(value, arrays) {
+  if (Array.isArray(value)) {
+    return value.map((item) => resolveTypedArrays(item, arrays));
+  } else if (value !== null && typeof value === "object") {
+    const index = value[TYPED_ARRAY_KEY];
+    if (index !== undefined && Object.keys(value).length === 1) {
+      return arrays[index];
+    }
+    const result = {};
+    for (const [key, item] of Object.entries(value)) {
+      result[key] = resolveTypedArrays(item, arrays);
+    }
+    return result;
+  }
+  return value;
+}
+
+function readBigEndianArray(buffer, start, length, arrayType) {
+  const itemSize = arrayType.BYTES_PER_ELEMENT;
+  const bytes = new Uint8Array(buffer, start, length * itemSize).slice();
+  for (let i = 0; i < bytes.length; i += itemSize) {
+    bytes.subarray(i, i + itemSize).reverse();
+  }
+  return new arrayType(bytes.buffer);
+}
+
+function align(numBytes) {
+  return (numBytes + 7) & ~7;
+}
@@ -6,6 +6,7 @@ import {
   matchChangePath,
 } from "./changes.js";
 import { getClassSchema } from "../core/classes.js";
+import { RemoteError } from "./errors.js";
 import { getGlyphMapProxy, makeCharacterMapFromGlyphMap } from "./cmap.js";
 import { StaticGlyphController, VariableGlyphController } from "./glyph-controller.js";
 import { LRUCache } from "./lru-cache.js";
@@ -168,7 +169,7 @@ export class FontController {
   }
 
   async _getGlyph(glyphName) {
-    let glyph = await this.font.getGlyph(glyphName);
+    let glyph = await this._requestGlyph(glyphName);
     if (glyph !== null) {
       glyph = VariableGlyph.fromObject(glyph);
       glyph = new VariableGlyphController(glyph, this.globalAxes);
@@ -177,6 +178,48 @@ export class FontController {
     return glyph;
   }
 
+  _requestGlyph(glyphName) {
+    // Glyph requests made during the same event loop turn are coalesced
+    // into a single getGlyphs() call
+    if (this._pendingGlyphRequests === undefined) {
+      this._pendingGlyphRequests = new Map();
+      queueMicrotask(() => this._sendGlyphRequests());
+    }
+    let request = this._pendingGlyphRequests.get(glyphName);
+    if (request === undefined) {
+      request = {};
+      request.promise = new Promise((resolve, reject) => {
+        request.resolve = resolve;
+        request.reject = reject;
+      });
+      this._pendingGlyphRequests.set(glyphName, request);
+    }
+    return request.promise;
+  }
+
+  async _sendGlyphRequests() {
+    const requests = this._pendingGlyphRequests;
+    delete this._pendingGlyphRequests;
+    let glyphs;
+    try {
+      glyphs = await this.font.getGlyphs([...requests.keys()]);
+    } catch (error) {
+      for (const request of requests.values()) {
+        request.reject(error);
+      }
+      return;
+    }
+    for (const [glyphName, request] of requests.entries()) {
+      const glyph = glyphs[glyphName] ?? null;
+      if (glyph?.exception !== undefined) {
+        // This glyph failed to load, the others are fine
+        request.reject(new RemoteError(glyph.exception));
+      } else {
+        request.resolve(glyph);
+      }
+    }
+  }
+
   updateGlyphDependencies(glyph) {
     const glyphName = glyph.name;
     // Zap previous used-by data for this glyph, if any
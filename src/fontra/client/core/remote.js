@@ -1,3 +1,4 @@
+import { BINARY_ENCODING, decodeBinaryMessage } from "./binary-message.js";
 import { RemoteError } from "./errors.js";
 
 export async function getRemoteProxy(wsURL) {
@@ -62,6 +63,7 @@ export class RemoteObject {
       throw new Error("assert -- trying to open new websocket while we still have one");
     }
     this.websocket = new WebSocket(this.wsURL);
+    this.websocket.binaryType = "arraybuffer";
     this.websocket.onmessage = (event) => this._handleIncomingMessage(event);
     this._connectPromise = new Promise((resolve, reject) => {
       this.websocket.onopen = (event) => {
@@ -71,6 +73,7 @@ export class RemoteObject {
         this.websocket.onerror = (event) => this._onerror(event);
         const message = {
           "client-uuid": this.clientUUID,
+          "encodings": [BINARY_ENCODING],
         };
         this.websocket.send(JSON.stringify(message));
       };
@@ -96,7 +99,10 @@ export class RemoteObject {
   }
 
   async _handleIncomingMessage(event) {
-    const message = JSON.parse(event.data);
+    const message =
+      typeof event.data === "string"
+        ? JSON.parse(event.data)
+        : decodeBinaryMessage(event.data);
     const clientCallID = message["client-call-id"];
     const serverCallID = message["server-call-id"];
 
@@ -0,0 +1,213 @@
+import json
+import re
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, fields, is_dataclass
+
+from .packedpath import PackedPath
+
+# The binary message format, as negotiated during the websocket handshake:
+#
+# - uint32, little endian: the byte length of the header
+# - the header: UTF-8 encoded JSON, of the form {"buffers": [...], "message": {...}}
+# - zero padding up to a multiple of 8 bytes
+# - the data section, containing the typed array data, each array aligned to
+#   8 bytes
+#
+# In the message, a typed array is represented as {"__typedarray__": index},
+# where `index` refers to an item in the "buffers" list. A buffer item is
+# [typeCode, byteOffset, length], where byteOffset is relative to the start of
+# the data section. Type codes follow the array module; the JS counterparts are:
+#
+#     "B": Uint8Array, "h": Int16Array, "i": Int32Array, "d": Float64Array
+#
+# All array data is little endian.
+
+BINARY_ENCODING = "fontra-binary-1"
+
+TYPED_ARRAY_KEY = "__typedarray__"
+
+_headerLengthStruct = struct.Struct("<I")
+_typeCodes = {"B", "h", "i", "d"}
+
+
+def encodeBinaryMessage(message):
+    """Encode `message` as bytes. The message may contain dataclass instances;
+    PackedPath coordinates and point types are encoded as typed arrays.
+    """
+    encodedValue = encodeBinaryValue(message)
+    return _buildMessage(encodedValue.buffersJSON, encodedValue.json, encodedValue.data)
+
+
+def encodeBinaryMessageWithValue(message, key, encodedValue):
+    """Encode `message`, with `encodedValue`, the result of encodeBinaryValue(),
+    as the value for `key`. This gives the same result as
+    encodeBinaryMessage({**message, key: value}), but reuses the encoded value.
+    `message` must not contain typed array data itself.
+    """
+    messageJSON = _dumps(message)
+    assert messageJSON.startswith("{") and messageJSON.endswith("}")
+    separator = "," if message else ""
+    messageJSON = f"{messageJSON[:-1]}{separator}{_dumps(key)}:{encodedValue.json}}}"
+    return _buildMessage(encodedValue.buffersJSON, messageJSON, encodedValue.data)
+
+
+@dataclass(frozen=True)
+class EncodedBinaryValue:
+    json: str  # the JSON text for the value, with typed array placeholders
+    buffersJSON: str  # the JSON text for the "buffers" list
+    data: bytes  # the data section
+
+
+def encodeBinaryValue(value):
+    """Encode `value` for embedding in binary messages, see
+    encodeBinaryMessageWithValue().
+    """
+    arrays = []
+    value = _prepareValue(value, arrays)
+    buffers = []
+    chunks = []
+    byteOffset = 0
+    for arr in arrays:
+        buffers.append([arr.typecode, byteOffset, len(arr)])
+        if sys.byteorder != "little":
+            arr.byteswap()
+        data = arr.tobytes()
+        chunks.append(data)
+        chunks.append(_padding(len(data)))
+        byteOffset += _align(len(data))
+    return EncodedBinaryValue(
+        json=_dumps(value), buffersJSON=_dumps(buffers), data=b"".join(chunks)
+    )
+
+
+def encodeBinaryDict(encodedValues):
+    """Combine `encodedValues`, a dict mapping keys to results of
+    encodeBinaryValue(), into the encoded value for a dict with the decoded
+    values. This gives the same result as encodeBinaryValue() for that dict,
+    without encoding the values again.
+    """
+    itemsJSON = []
+    buffers = []
+    chunks = []
+    byteOffset = 0
+    for key, encodedValue in encodedValues.items():
+        valueJSON = encodedValue.json
+        if buffers:
+            valueJSON = _shiftTypedArrayIndices(valueJSON, len(buffers))
+        itemsJSON.append(f"{_dumps(key)}:{valueJSON}")
+        for typeCode, valueByteOffset, length in json.loads(encodedValue.buffersJSON):
+            buffers.append([typeCode, byteOffset + valueByteOffset, length])
+        # The data section of each value is padded to a multiple of 8 bytes
+        chunks.append(encodedValue.data)
+        byteOffset += len(encodedValue.data)
+    return EncodedBinaryValue(
+        json=f"{{{','.join(itemsJSON)}}}",
+        buffersJSON=_dumps(buffers),
+        data=b"".join(chunks),
+    )
+
+
+# The placeholders as written by _dumps(). Strings in the JSON text can't
+# match, as their quotes are escaped.
+_typedArrayPlaceholderPattern = re.compile(r'\{"' + TYPED_ARRAY_KEY + r'":(\d+)\}')
+
+
+def _shiftTypedArrayIndices(valueJSON, offset):
+    return _typedArrayPlaceholderPattern.sub(
+        lambda m: f'{{"{TYPED_ARRAY_KEY}":{int(m.group(1)) + offset}}}', valueJSON
+    )
+
+
+def _buildMessage(buffersJSON, messageJSON, data):
+    header = f'{{"buffers":{buffersJSON},"message":{messageJSON}}}'.encode("utf-8")
+    headerEnd = _headerLengthStruct.size + len(header)
+    return b"".join(
+        [_headerLengthStruct.pack(len(header)), header, _padding(headerEnd), data]
+    )
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+def decodeBinaryMessage(data):
+    """Decode a message encoded with encodeBinaryMessage(). Typed arrays are
+    returned as lists.
+    """
+    data = memoryview(data)
+    (headerLength,) = _headerLengthStruct.unpack_from(data)
+    headerEnd = _headerLengthStruct.size + headerLength
+    header = json.loads(bytes(data[_headerLengthStruct.size : headerEnd]))
+    dataStart = _align(headerEnd)
+    arrays = []
+    for typeCode, byteOffset, length in header["buffers"]:
+        if typeCode not in _typeCodes:
+            raise ValueError(f"unknown typed array type: {typeCode!r}")
+        arr = array(typeCode)
+        start = dataStart + byteOffset
+        arr.frombytes(data[start : start + length * arr.itemsize])
+        if sys.byteorder != "little":
+            arr.byteswap()
+        arrays.append(arr.tolist())
+    message = header["message"]
+    if arrays:
+        message = _resolveTypedArrays(message, arrays)
+    return message
+
+
+def _prepareValue(value, arrays):
+    if isinstance(value, PackedPath):
+        return {
+            "coordinates": _addTypedArray(_packCoordinates(value.coordinates), arrays),
+            "pointTypes": _addTypedArray(array("B", value.pointTypes), arrays),
+            "contourInfo": [_prepareValue(info, arrays) for info in value.contourInfo],
+        }
+    elif is_dataclass(value):
+        return {
+            field.name: _prepareValue(getattr(value, field.name), arrays)
+            for field in fields(value)
+        }
+    elif isinstance(value, dict):
+        return {key: _prepareValue(item, arrays) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_prepareValue(item, arrays) for item in value]
+    return value
+
+
+def _packCoordinates(coordinates):
+    try:
+        arr = array("i", map(int, coordinates))
+    except (OverflowError, ValueError):  # too large, or inf/nan
+        return array("d", coordinates)
+    if arr != coordinates:
+        # there are non-integer values
+        return array("d", coordinates)
+    if arr and -0x8000 <= min(arr) and max(arr) <= 0x7FFF:
+        arr = array("h", arr)
+    return arr
+
+
+def _addTypedArray(arr, arrays):
+    arrays.append(arr)
+    return {TYPED_ARRAY_KEY: len(arrays) - 1}
+
+
+def _resolveTypedArrays(value, arrays):
+    if isinstance(value, dict):
+        index = value.get(TYPED_ARRAY_KEY)
+        if index is not None and len(value) == 1:
+            return arrays[index]
+        return {key: _resolveTypedArrays(item, arrays) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [_resolveTypedArrays(item, arrays) for item in value]
+    return value
+
+
+def _align(numBytes):
+    return (numBytes + 7) & ~7
+
+
+def _padding(numBytes):
+    return bytes(_align(numBytes) - numBytes)
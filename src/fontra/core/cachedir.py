@@ -0,0 +1,47 @@
+import hashlib
+import os
+import pathlib
+import tempfile
+
+CACHE_DIR_ENV_VAR = "FONTRA_CACHE_DIR"
+
+
+def getCacheDir(*subDirs):
+    """Return the folder where Fontra can store derived data that can be
+    regenerated at any time. The location can be overridden with the
+    FONTRA_CACHE_DIR environment variable.
+    """
+    cacheDir = os.environ.get(CACHE_DIR_ENV_VAR)
+    if cacheDir is None:
+        cacheHome = os.environ.get("XDG_CACHE_HOME")
+        if cacheHome is None:
+            cacheHome = pathlib.Path.home() / ".cache"
+        cacheDir = pathlib.Path(cacheHome) / "fontra"
+    return pathlib.Path(cacheDir).joinpath(*subDirs)
+
+
+def getCachePath(category, sourcePath, suffix=""):
+    """Return a cache file path for data derived from `sourcePath`. The file
+    name is based on a hash of the absolute source path, so distinct sources
+    never share a cache file.
+    """
+    sourcePath = os.path.abspath(os.fspath(sourcePath))
+    digest = hashlib.sha1(sourcePath.encode("utf-8")).hexdigest()
+    return getCacheDir(category) / f"{digest}{suffix}"
+
+
+def writeFileAtomically(path, data):
+    """Write `data` to `path`, so that readers see either the old or the new
+    file. Each call uses its own temporary file, so concurrent writers, for
+    example in different processes, don't clobber each other's data.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmpPath, path)
+    except BaseException:
+        os.unlink(tmpPath)
+        raise
@@ -1,6 +1,7 @@
+from functools import lru_cache
 from typing import Mapping, MutableMapping, MutableSequence, Sequence
 
-from .classes import classCastFuncs, classSchema
+from .classes import classCastFuncs, classSchema, shallowCopy
 
 
 def setItem(subject, key, item, *, itemCast=None):
@@ -61,6 +62,12 @@ changeFunctions = {
     ),
 }
 
+# Optional variants of changeFunctions that apply a run of calls at once, given
+# a list of argument lists. Used by compileChange().
+batchChangeFunctions = {
+    "=xy": lambda path, argsList: path.setPointPositions(argsList),
+}
+
 #
 # A "change" object is a simple JS object containing several
 # keys.
@@ -78,12 +85,145 @@ changeFunctions = {
 #
 
 
-def applyChange(subject, change):
-    """Apply `change` to `subject`."""
-    _applyChange(subject, change)
+def applyChange(subject, change, *, copyOnWrite=False, ownedObjects=()):
+    """Apply `change` to `subject`.
+
+    If `copyOnWrite` is true, objects reachable from `subject` are not modified
+    in place: each object along a change path is replaced by a shallow copy
+    before it is touched. References obtained earlier to (parts of) `subject`
+    therefore keep their old contents. Only `subject` itself and the objects in
+    `ownedObjects` are modified in place.
+    """
+    copiedObjects = None
+    if copyOnWrite:
+        copiedObjects = {id(obj): obj for obj in [subject, *ownedObjects]}
+    compileChange(change)(subject, None, copiedObjects)
+
+
+def compileChange(change):
+    """Compile `change` into a function with the signature
+    `applyFunc(subject, itemCast, copiedObjects)`, which applies the change to
+    `subject` the same way _applyChange() does, but without interpreting the
+    change tree again.
+
+    - The function lookups and argument unpacking happen once, here.
+    - Path walkers are cached per path, and what a path element means for a
+      given subject type (item or attribute, and its item cast) is cached per
+      type.
+    - Runs of sibling changes that only call the same function, like "=xy" for
+      each of thousands of points, become a single loop.
+    """
+    walkPath = _compilePath(tuple(change.get("p", ())))
+    functionName = change.get("f")
+    callFunction = (
+        _compileCall(functionName, [change.get("a", [])])
+        if functionName is not None
+        else None
+    )
+    applyChildren = _compileChildren(change.get("c", ()))
+
+    def applyCompiledChange(subject, itemCast, copiedObjects):
+        if walkPath is not None:
+            subject, itemCast = walkPath(subject, copiedObjects)
+        if callFunction is not None:
+            callFunction(subject, itemCast)
+        if applyChildren is not None:
+            applyChildren(subject, itemCast, copiedObjects)
+
+    return applyCompiledChange
+
+
+@lru_cache(maxsize=4096)
+def _compilePath(path):
+    if not path:
+        return None
+
+    def walkPath(subject, copiedObjects):
+        itemCast = None
+        for pathElement in path:
+            if _isItemContainer(type(subject)):
+                itemCast = None
+                child = subject[pathElement]
+                if copiedObjects is not None and id(child) not in copiedObjects:
+                    child = _copyForWrite(child, copiedObjects)
+                    subject[pathElement] = child
+            else:
+                itemCast = _getItemCast(type(subject), pathElement, "subtype")
+                child = getattr(subject, pathElement)
+                if copiedObjects is not None and id(child) not in copiedObjects:
+                    child = _copyForWrite(child, copiedObjects)
+                    setattr(subject, pathElement, child)
+            subject = child
+        return subject, itemCast
+
+    return walkPath
+
+
+def _compileCall(functionName, argsList):
+    changeFunc = changeFunctions[functionName]
+    batchChangeFunc = batchChangeFunctions.get(functionName)
+
+    if batchChangeFunc is not None and len(argsList) > 1:
+
+        def callFunction(subject, itemCast):
+            batchChangeFunc(subject, argsList)
+
+    elif functionName in baseChangeFunctions:
+
+        def callFunction(subject, itemCast):
+            for args in argsList:
+                argsItemCast = itemCast
+                if argsItemCast is None and args:
+                    argsItemCast = _getItemCast(type(subject), args[0], "type")
+                changeFunc(subject, *args, itemCast=argsItemCast)
+
+    else:
+
+        def callFunction(subject, itemCast):
+            for args in argsList:
+                changeFunc(subject, *args)
+
+    return callFunction
+
+
+def _compileChildren(children):
+    if not children:
+        return None
+
+    # Group runs of leaf changes (no path, no children) calling the same function
+    groups = []
+    for child in children:
+        functionName = child.get("f")
+        isLeafCall = (
+            functionName is not None and not child.get("p") and not child.get("c")
+        )
+        if isLeafCall and groups and groups[-1][0] == functionName:
+            groups[-1][1].append(child.get("a", []))
+        elif isLeafCall:
+            groups.append((functionName, [child.get("a", [])]))
+        else:
+            groups.append((None, child))
+
+    compiledChildren = []
+    for functionName, item in groups:
+        if functionName is None:
+            compiledChildren.append((None, compileChange(item)))
+        else:
+            compiledChildren.append((_compileCall(functionName, item), None))
+
+    def applyChildren(subject, itemCast, copiedObjects):
+        for callFunction, applyCompiledChange in compiledChildren:
+            if callFunction is not None:
+                callFunction(subject, itemCast)
+            else:
+                applyCompiledChange(subject, itemCast, copiedObjects)
 
+    return applyChildren
 
-def _applyChange(subject, change, *, itemCast=None):
+
+def _applyChange(subject, change, *, itemCast=None, copiedObjects=None):
+    # The straightforward, interpreting implementation of applyChange(). It is
+    # the reference for compileChange(), and is used by tests and benchmarks.
     path = change.get("p", [])
     functionName = change.get("f")
     children = change.get("c", [])
@@ -91,10 +231,17 @@ def _applyChange(subject, change, *, itemCast=None):
     for pathElement in path:
         itemCast = None
         if isinstance(subject, (Mapping, Sequence)):
-            subject = subject[pathElement]
+            child = subject[pathElement]
+            if copiedObjects is not None and id(child) not in copiedObjects:
+                child = _copyForWrite(child, copiedObjects)
+                subject[pathElement] = child
         else:
             itemCast = getItemCast(subject, pathElement, "subtype")
-            subject = getattr(subject, pathElement)
+            child = getattr(subject, pathElement)
+            if copiedObjects is not None and id(child) not in copiedObjects:
+                child = _copyForWrite(child, copiedObjects)
+                setattr(subject, pathElement, child)
+        subject = child
 
     if functionName is not None:
         changeFunc = changeFunctions[functionName]
@@ -107,7 +254,13 @@ def _applyChange(subject, change, *, itemCast=None):
             changeFunc(subject, *args)
 
     for subChange in children:
-        _applyChange(subject, subChange, itemCast=itemCast)
+        _applyChange(subject, subChange, itemCast=itemCast, copiedObjects=copiedObjects)
+
+
+def _copyForWrite(obj, copiedObjects):
+    obj = shallowCopy(obj)
+    copiedObjects[id(obj)] = obj
+    return obj
 
 
 def getItemCast(subject, attrName, fieldKey):
@@ -120,6 +273,29 @@ def getItemCast(subject, attrName, fieldKey):
     return None
 
 
+def _getItemCast(cls, attrName, fieldKey):
+    if cls not in classSchema:
+        return None
+    return _getClassItemCast(cls, attrName, fieldKey)
+
+
+@lru_cache(maxsize=None)
+def _getClassItemCast(cls, attrName, fieldKey):
+    subtype = classSchema[cls][attrName].get(fieldKey)
+    return classCastFuncs.get(subtype) if subtype is not None else None
+
+
+_itemContainerTypes = {}
+
+
+def _isItemContainer(cls):
+    isItemContainer = _itemContainerTypes.get(cls)
+    if isItemContainer is None:
+        isItemContainer = issubclass(cls, (Mapping, Sequence))
+        _itemContainerTypes[cls] = isItemContainer
+    return isItemContainer
+
+
 _MISSING = object()
 
 
@@ -296,3 +472,258 @@ def _iterateChangePaths(change, depth, prefix=()):
         return
     for childChange in change.get("c", []):
         yield from _iterateChangePaths(childChange, depth, path)
+
+
+def compactChanges(changes):
+    """Return a single change that is equivalent to applying all `changes` in
+    order, with redundant operations removed, or `None` if nothing is left.
+
+    An operation is redundant if a later operation overwrites its result: a
+    "=" or "d" on the same key, or on a parent of the item it modifies, or a
+    "=xy" for the same point. Operations that shift list items (for example
+    "+", "-", ":" or "insertPoint") prevent earlier operations on items of
+    that list from being dropped. The remaining operations are nested by
+    their common path prefixes.
+    """
+    leaves = []
+    for change in changes:
+        _flattenChange(change, (), leaves)
+
+    keptLeaves = []
+    overwritten = _OverwriteTrie()
+    for path, functionName, args in reversed(leaves):
+        target = _getChangeTarget(path, functionName, args)
+        if overwritten.contains(target):
+            # A later operation replaces the result of this one
+            continue
+        keptLeaves.append((path, functionName, args))
+        if functionName in _overwritingChangeFunctions:
+            overwritten.add(target)
+        else:
+            # The operation may shift list items: later operations on items
+            # within `path` don't necessarily refer to the same items as
+            # earlier ones
+            overwritten.discardDescendants(path)
+    keptLeaves.reverse()
+    return _changeFromLeaves(keptLeaves)
+
+
+def filterChangeTargets(change, keepTarget):
+    """Return the part of `change` consisting of the operations for which
+    `keepTarget(targetPath)` returns True, or `None` if no operations are left.
+    `targetPath` is a tuple: the path of the item that the operation modifies.
+    For "=" and "d" this includes the key, for "=xy" it ends with the tuple
+    ("=xy", pointIndex). For other operations it is the path of the container
+    they modify.
+    """
+    leaves = []
+    _flattenChange(change, (), leaves)
+    return _changeFromLeaves(
+        [leaf for leaf in leaves if keepTarget(_getChangeTarget(*leaf))]
+    )
+
+
+def collectShiftingChangeTargets(change):
+    """Return a list of the target paths (see filterChangeTargets()) of the
+    operations in `change` that don't overwrite their target, but shift list
+    items, for example "+" or "insertPoint". Unlike the overwriting operations,
+    these give a different result when they are applied twice.
+    """
+    leaves = []
+    _flattenChange(change, (), leaves)
+    return [
+        _getChangeTarget(*leaf)
+        for leaf in leaves
+        if leaf[1] not in _overwritingChangeFunctions
+    ]
+
+
+_overwritingChangeFunctions = {"=", "d", "=xy"}
+
+
+def _flattenChange(change, prefix, leaves):
+    path = prefix + tuple(change.get("p", ()))
+    functionName = change.get("f")
+    if functionName is not None:
+        leaves.append((path, functionName, change.get("a", [])))
+    for childChange in change.get("c", ()):
+        _flattenChange(childChange, path, leaves)
+
+
+def _getChangeTarget(path, functionName, args):
+    # Return the path of the item that the operation replaces or modifies.
+    # Points are identified by a tuple, which never collides with the str or
+    # int path elements of a change.
+    if functionName in ("=", "d"):
+        return path + (args[0],)
+    elif functionName == "=xy":
+        return path + (("=xy", args[0]),)
+    return path
+
+
+class _OverwriteTrie:
+    """A set of paths, supporting a fast test whether a path equals, or is
+    nested within, any of the paths in the set.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, path):
+        node = self.root
+        for pathElement in path[:-1]:
+            node = node.setdefault(pathElement, {})
+            if node is None:
+                # A parent path is already in the set
+                return
+        node[path[-1]] = None
+
+    def contains(self, path):
+        node = self.root
+        for pathElement in path:
+            node = node.get(pathElement, _MISSING)
+            if node is _MISSING:
+                return False
+            if node is None:
+                return True
+        return False
+
+    def discardDescendants(self, path):
+        node = self.root
+        for pathElement in path:
+            node = node.get(pathElement, _MISSING)
+            if node is _MISSING or node is None:
+                return
+        node.clear()
+
+
+def _changeFromLeaves(leaves):
+    children = _nestChangeLeaves(leaves)
+    if not children:
+        return None
+    return _normalizeChange({"c": children})
+
+
+def _nestChangeLeaves(leaves):
+    children = []
+    i = 0
+    while i < len(leaves):
+        path, functionName, args = leaves[i]
+        if not path:
+            children.append({"f": functionName, "a": args})
+            i += 1
+            continue
+        pathElement = path[0]
+        j = i + 1
+        while j < len(leaves) and leaves[j][0][:1] == (pathElement,):
+            j += 1
+        if j - i == 1:
+            children.append({"p": list(path), "f": functionName, "a": args})
+        else:
+            subChildren = _nestChangeLeaves(
+                [(path[1:], f, a) for path, f, a in leaves[i:j]]
+            )
+            children.append(_normalizeChange({"p": [pathElement], "c": subChildren}))
+        i = j
+    return children
+
+
+class SubscriptionIndex:
+    """An inverted index of match patterns: a trie of path elements, where
+    each node knows which subscribers have a pattern leaf at that node. This
+    allows finding the subscribers matching a change without testing each
+    subscriber's pattern.
+
+    A subscriber can be any hashable object.
+    """
+
+    def __init__(self):
+        self._root = _SubscriptionNode()
+        self._subscriberPaths = {}
+
+    def setPattern(self, subscriber, matchPattern):
+        """Set the match pattern for `subscriber`, replacing its previous
+        pattern, if any. An empty pattern removes the subscriber.
+        """
+        oldPaths = self._subscriberPaths.get(subscriber, set())
+        newPaths = set(_iteratePatternPaths(matchPattern))
+        for path in oldPaths - newPaths:
+            self._removePath(subscriber, path)
+        for path in newPaths - oldPaths:
+            node = self._root
+            for pathElement in path:
+                node = node.children.setdefault(pathElement, _SubscriptionNode())
+            node.subscribers.add(subscriber)
+        if newPaths:
+            self._subscriberPaths[subscriber] = newPaths
+        else:
+            self._subscriberPaths.pop(subscriber, None)
+
+    def _removePath(self, subscriber, path):
+        nodes = [self._root]
+        for pathElement in path:
+            nodes.append(nodes[-1].children[pathElement])
+        nodes[-1].subscribers.discard(subscriber)
+        # Prune nodes that no longer lead to any subscriber
+        for pathElement, parent, node in reversed(list(zip(path, nodes, nodes[1:]))):
+            if node.subscribers or node.children:
+                break
+            del parent.children[pathElement]
+
+    def matchChange(self, change):
+        """Return the set of subscribers whose pattern matches `change`, in
+        the same sense as matchChangePattern().
+        """
+        subscribers = set()
+        self._matchChange(change, self._root, subscribers)
+        return subscribers
+
+    def _matchChange(self, change, node, subscribers):
+        for pathElement in change.get("p", []):
+            node = node.children.get(pathElement)
+            if node is None:
+                return
+            subscribers.update(node.subscribers)
+        for childChange in change.get("c", []):
+            self._matchChange(childChange, node, subscribers)
+
+    def matchPattern(self, matchPattern):
+        """Return the set of subscribers whose pattern intersects with
+        `matchPattern`, in the same sense as patternIntersect().
+        """
+        subscribers = set()
+        self._matchPattern(matchPattern, self._root, subscribers)
+        return subscribers
+
+    def _matchPattern(self, matchPattern, node, subscribers):
+        for pathElement, childPattern in matchPattern.items():
+            childNode = node.children.get(pathElement)
+            if childNode is None:
+                continue
+            if childPattern is None:
+                subscribers.update(childNode.iterSubscribers())
+            else:
+                subscribers.update(childNode.subscribers)
+                self._matchPattern(childPattern, childNode, subscribers)
+
+
+class _SubscriptionNode:
+    __slots__ = ["subscribers", "children"]
+
+    def __init__(self):
+        self.subscribers = set()
+        self.children = {}
+
+    def iterSubscribers(self):
+        yield from self.subscribers
+        for child in self.children.values():
+            yield from child.iterSubscribers()
+
+
+def _iteratePatternPaths(matchPattern, prefix=()):
+    for pathElement, childPattern in matchPattern.items():
+        path = prefix + (pathElement,)
+        if childPattern is None:
+            yield path
+        else:
+            yield from _iteratePatternPaths(childPattern, path)
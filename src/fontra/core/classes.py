@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import copy
 import sys
-from dataclasses import dataclass, field, is_dataclass
+from array import array
+from dataclasses import asdict, dataclass, field, fields, is_dataclass
 from functools import partial
 from typing import Any, Optional, get_args, get_type_hints
 
@@ -10,7 +12,7 @@ import dacite
 from .packedpath import PackedPath, PointType
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Transformation:
     translateX: float = 0
     translateY: float = 0
@@ -27,14 +29,14 @@ Location = dict[str, float]
 CustomData = dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class Component:
     name: str
     transformation: Transformation = field(default_factory=Transformation)
     location: Location = field(default_factory=Location)
 
 
-@dataclass
+@dataclass(slots=True)
 class StaticGlyph:
     path: PackedPath = field(default_factory=PackedPath)
     components: list[Component] = field(default_factory=list)
@@ -43,7 +45,7 @@ class StaticGlyph:
     verticalOrigin: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Source:
     name: str
     layerName: str
@@ -52,13 +54,13 @@ class Source:
     customData: CustomData = field(default_factory=CustomData)
 
 
-@dataclass
+@dataclass(slots=True)
 class Layer:
     glyph: StaticGlyph
     customData: CustomData = field(default_factory=CustomData)
 
 
-@dataclass
+@dataclass(slots=True)
 class LocalAxis:
     name: str
     minValue: float
@@ -75,7 +77,7 @@ class VariableGlyph:
     customData: CustomData = field(default_factory=CustomData)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class GlobalAxis:
     name: str  # this identifies the axis
     label: str  # a user friendly label
@@ -109,6 +111,18 @@ class Font:
         super().__setattr__(attrName, value)
 
 
+def shallowCopy(obj):
+    """Return a copy of `obj` that shares its children with `obj`. Replacing,
+    inserting or deleting attributes or items of the copy does not affect
+    `obj`. This is the building block for copy-on-write change application,
+    see changes.applyChange().
+    """
+    if isinstance(obj, PackedPath):
+        # PackedPath modifies its lists in place, so they can't be shared
+        return obj.copy()
+    return copy.copy(obj)
+
+
 def makeSchema(*classes, schema=None):
     if schema is None:
         schema = {}
@@ -153,6 +167,177 @@ def makeCastFuncs(schema, config=None):
     return castFuncs
 
 
+def makeToDictFuncs(schema):
+    """Return a dict mapping each class in `schema` to a function that converts
+    an instance of the class to a dict. This is a faster alternative to
+    dataclasses.asdict(): the functions are generated from the schema, and the
+    returned dicts share values that aren't dataclass instances (for example
+    lists of numbers, or custom data dicts) with the instance. That's fine for
+    serialization, which is what they're meant for.
+    """
+    lines = []
+    for cls in schema:
+        lines.append(f"def {_funcName('toDict', cls)}(obj):")
+        lines.append("    return {")
+        for fieldName, fieldDef in _iterFieldDefs(cls, schema):
+            lines.append(
+                f"        {fieldName!r}: "
+                + _toDictExpression(f"obj.{fieldName}", fieldDef)
+                + ","
+            )
+        lines.append("    }")
+        lines.append("")
+    return _compileFuncs("toDict", schema, lines)
+
+
+def makeFromDictFuncs(schema):
+    """Return a dict mapping each class in `schema` to a function that builds
+    an instance of the class from a dict, in the way dacite.from_dict() does,
+    but faster: the functions are generated from the schema. Missing fields
+    get their default values, unknown keys are ignored. Lists and dicts are
+    copied, values that are already instances of the field's dataclass are
+    used as is.
+
+    The types are checked cheaply: the functions raise TypeError if a field
+    value isn't of the field's type, but the items of lists and dicts are
+    only checked if they are dataclass instances.
+    """
+    lines = []
+    for cls in schema:
+        lines.append(f"def {_funcName('fromDict', cls)}(data):")
+        lines.append("    if not isinstance(data, dict):")
+        lines.append(f"        _raiseWrongType(data, {cls.__name__!r}, 'dict')")
+        lines.append("    kwargs = {}")
+        for fieldName, fieldDef in _iterFieldDefs(cls, schema):
+            lines.append(f"    value = data.get({fieldName!r}, _MISSING)")
+            lines.append("    if value is not _MISSING:")
+            qualName = f"{cls.__name__}.{fieldName}"
+            checkExpression = _typeCheckExpression("value", fieldDef)
+            if checkExpression is not None:
+                typeName = _typeName(fieldDef["type"])
+                lines.append(f"        if not ({checkExpression}):")
+                lines.append(
+                    f"            _raiseWrongType(value, {qualName!r}, {typeName!r})"
+                )
+            expression = _fromDictExpression("value", fieldDef)
+            lines.append(f"        kwargs[{fieldName!r}] = {expression}")
+        lines.append(f"    return {cls.__name__}(**kwargs)")
+        lines.append("")
+    return _compileFuncs("fromDict", schema, lines)
+
+
+def _iterFieldDefs(cls, schema):
+    classFields = schema[cls]
+    for classField in fields(cls):
+        # Fields with unparameterized types, such as `dict`, are not in the schema
+        yield classField.name, classFields.get(classField.name, {})
+
+
+def _toDictExpression(value, fieldDef):
+    tp = fieldDef.get("type")
+    subtype = fieldDef.get("subtype")
+    if is_dataclass(tp):
+        expression = f"{_funcName('toDict', tp)}({value})"
+        if fieldDef.get("optional"):
+            expression = f"None if {value} is None else {expression}"
+        return expression
+    elif is_dataclass(subtype):
+        itemExpression = f"{_funcName('toDict', subtype)}(item)"
+        if tp.__name__ == "list":
+            return f"[{itemExpression} for item in {value}]"
+        return f"{{key: {itemExpression} for key, item in {value}.items()}}"
+    return value
+
+
+# The types accepted for fields of these types, see _typeCheckExpression()
+_acceptedTypes = {
+    "str": "str",
+    "bool": "bool",
+    "int": "int",
+    "float": "(int, float)",
+    "list": "(list, tuple, array)",
+    "dict": "dict",
+}
+
+
+def _typeCheckExpression(value, fieldDef):
+    tp = fieldDef.get("type")
+    if tp is None:
+        return None
+    if is_dataclass(tp):
+        acceptedTypes = f"(dict, {tp.__name__})"
+    else:
+        acceptedTypes = _acceptedTypes.get(tp.__name__)
+        if acceptedTypes is None:
+            return None
+    expression = f"isinstance({value}, {acceptedTypes})"
+    if fieldDef.get("optional"):
+        expression = f"{value} is None or {expression}"
+    return expression
+
+
+def _typeName(tp):
+    return getattr(tp, "__name__", str(tp))
+
+
+def _raiseWrongType(value, name, typeName):
+    raise TypeError(
+        f"wrong value type for {name}: expected {typeName}, "
+        f"got {type(value).__name__}"
+    )
+
+
+def _checkItemType(item, cls):
+    if not isinstance(item, cls):
+        _raiseWrongType(item, f"{cls.__name__} item", f"{cls.__name__} or dict")
+    return item
+
+
+def _fromDictExpression(value, fieldDef):
+    tp = fieldDef.get("type")
+    subtype = fieldDef.get("subtype")
+    if is_dataclass(tp):
+        expression = (
+            f"{_funcName('fromDict', tp)}({value}) "
+            f"if isinstance({value}, dict) else {value}"
+        )
+        if fieldDef.get("optional"):
+            expression = f"None if {value} is None else {expression}"
+        return expression
+    elif is_dataclass(subtype):
+        itemExpression = (
+            f"{_funcName('fromDict', subtype)}(item) "
+            f"if isinstance(item, dict) else _checkItemType(item, {subtype.__name__})"
+        )
+        if tp.__name__ == "list":
+            return f"[{itemExpression} for item in {value}]"
+        return f"{{key: {itemExpression} for key, item in {value}.items()}}"
+    elif tp is not None and tp.__name__ == "list":
+        return f"list({value})"
+    elif tp is not None and tp.__name__ == "dict":
+        return f"dict({value})"
+    return value
+
+
+def _funcName(prefix, cls):
+    return f"{prefix}_{cls.__name__}"
+
+
+def _compileFuncs(prefix, schema, lines):
+    namespace = {cls.__name__: cls for cls in schema}
+    namespace["_MISSING"] = _MISSING
+    namespace["array"] = array
+    namespace["_raiseWrongType"] = _raiseWrongType
+    namespace["_checkItemType"] = _checkItemType
+    exec(
+        compile("\n".join(lines), f"<generated {prefix} functions>", "exec"), namespace
+    )
+    return {cls: namespace[_funcName(prefix, cls)] for cls in schema}
+
+
+_MISSING = object()
+
+
 def classesToStrings(schema):
     return {
         cls.__name__: {
@@ -167,9 +352,32 @@ def classesToStrings(schema):
 
 
 _castConfig = dacite.Config(cast=[PointType])
-from_dict = partial(dacite.from_dict, config=_castConfig)
 classSchema = makeSchema(Font)
-classCastFuncs = makeCastFuncs(classSchema, config=_castConfig)
+classToDictFuncs = makeToDictFuncs(classSchema)
+classFromDictFuncs = makeFromDictFuncs(classSchema)
+classCastFuncs = classFromDictFuncs
+
+
+def from_dict(cls, data):
+    """Build an instance of `cls` from `data`, a dict. For the classes in the
+    class schema this uses the generated functions from makeFromDictFuncs(),
+    for other classes it falls back to dacite.from_dict().
+    """
+    fromDictFunc = classFromDictFuncs.get(cls)
+    if fromDictFunc is None:
+        return dacite.from_dict(cls, data, config=_castConfig)
+    return fromDictFunc(data)
+
+
+def toDict(obj):
+    """Return a dict representation of the dataclass instance `obj`. For the
+    classes in the class schema this uses the generated functions from
+    makeToDictFuncs(), for other classes it falls back to dataclasses.asdict().
+    """
+    toDictFunc = classToDictFuncs.get(type(obj))
+    if toDictFunc is None:
+        return asdict(obj)
+    return toDictFunc(obj)
 
 
 def serializableClassSchema():
@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+
+class ComponentGraph:
+    """The component dependencies between glyphs: which glyphs a glyph is made
+    of, and which glyphs it is used by. Transitive closures are computed on
+    demand and memoised, and only the affected closures are invalidated when a
+    glyph's components change. Cyclic component references are tolerated: a
+    glyph that is part of a cycle is in its own closures.
+    """
+
+    def __init__(self):
+        self.madeOf = {}  # glyphName -> frozenset of component names
+        self.usedBy = defaultdict(set)  # componentName -> set of glyph names
+        self._madeOfClosures = {}
+        self._usedByClosures = {}
+
+    def __contains__(self, glyphName):
+        return glyphName in self.madeOf
+
+    def setComponents(self, glyphName, componentNames):
+        componentNames = frozenset(componentNames)
+        oldComponentNames = self.madeOf.get(glyphName)
+        if componentNames == oldComponentNames:
+            return
+        self._invalidateClosures(glyphName, oldComponentNames or ())
+        self._removeEdges(glyphName)
+        self.madeOf[glyphName] = componentNames
+        for componentName in componentNames:
+            self.usedBy[componentName].add(glyphName)
+        # Added components can reach other glyphs than the removed ones
+        self._invalidateClosures(glyphName, componentNames)
+
+    def removeGlyph(self, glyphName):
+        if glyphName in self.madeOf:
+            self.setComponents(glyphName, ())
+            del self.madeOf[glyphName]
+
+    def _removeEdges(self, glyphName):
+        for componentName in self.madeOf.get(glyphName, ()):
+            users = self.usedBy[componentName]
+            users.discard(glyphName)
+            if not users:
+                del self.usedBy[componentName]
+
+    def _invalidateClosures(self, glyphName, componentNames):
+        # The glyphs that (indirectly) use glyphName can reach other glyphs
+        # now, and the glyphs that glyphName reaches can be reached by others
+        if self._madeOfClosures:
+            for name in [glyphName, *self.getUsedBy(glyphName)]:
+                self._madeOfClosures.pop(name, None)
+        if self._usedByClosures:
+            for componentName in componentNames:
+                for name in [componentName, *self.getMadeOf(componentName)]:
+                    self._usedByClosures.pop(name, None)
+
+    def getMadeOf(self, glyphName, transitive=True):
+        """Return the set of glyphs used as components by `glyphName`,
+        including nested components if `transitive` is true.
+        """
+        if not transitive:
+            return set(self.madeOf.get(glyphName, ()))
+        return set(self._getClosure(glyphName, self.madeOf, self._madeOfClosures))
+
+    def getUsedBy(self, glyphName, transitive=True):
+        """Return the set of glyphs that use `glyphName` as a component,
+        including indirect uses if `transitive` is true.
+        """
+        if not transitive:
+            return set(self.usedBy.get(glyphName, ()))
+        return set(self._getClosure(glyphName, self.usedBy, self._usedByClosures))
+
+    def isCyclic(self, glyphName):
+        return glyphName in self._getClosure(
+            glyphName, self.madeOf, self._madeOfClosures
+        )
+
+    def getCyclicGlyphs(self):
+        """Return the set of glyphs that are part of a component cycle."""
+        return {glyphName for glyphName in self.madeOf if self.isCyclic(glyphName)}
+
+    @staticmethod
+    def _getClosure(glyphName, edges, closures):
+        closure = closures.get(glyphName)
+        if closure is not None:
+            return closure
+        # Iterative depth-first search, reusing memoised closures where we can
+        closure = set()
+        stack = [glyphName]
+        while stack:
+            for name in edges.get(stack.pop(), ()):
+                if name in closure:
+                    continue
+                closure.add(name)
+                nestedClosure = closures.get(name)
+                if nestedClosure is not None:
+                    closure.update(nestedClosure)
+                else:
+                    stack.append(name)
+        closure = frozenset(closure)
+        closures[glyphName] = closure
+        return closure
@@ -1,27 +1,37 @@
 import asyncio
 import functools
 import logging
+import os
+import time
 import traceback
 from collections import UserDict, defaultdict
-from contextlib import contextmanager
-from copy import deepcopy
-from dataclasses import dataclass
-from typing import Any
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager, contextmanager, suppress
+from dataclasses import dataclass, is_dataclass
+from typing import Any, Optional
 
 from .changes import (
+    SubscriptionIndex,
     applyChange,
     collectChangePaths,
+    collectShiftingChangeTargets,
+    compactChanges,
     filterChangePattern,
-    matchChangePattern,
+    filterChangeTargets,
     patternDifference,
     patternFromPath,
     patternIntersect,
     patternUnion,
 )
-from .classes import Font
+from .classes import Font, from_dict, toDict
 from .clipboard import parseClipboard
+from .componentgraph import ComponentGraph
 from .glyphnames import getSuggestedGlyphName, getUnicodeFromGlyphName
-from .lrucache import LRUCache
+from .history import EditHistory, HistoryRecord, getHistoryKey
+from .instancer import GlyphInstancer
+from .journal import ChangeJournal
+from .lrucache import LRUCache, SizedLRUCache
+from .remote import PreEncodedDict, PreEncodedValue
 
 logger = logging.getLogger(__name__)
 
@@ -48,21 +58,188 @@ backendDeleterNames = {
     attr: "delete" + baseName for attr, baseName in backendAttrMapping
 }
 
+backendBatchMethodNames = {
+    "putGlyph": "putGlyphs",
+    "deleteGlyph": "deleteGlyphs",
+}
+
+backendReadMethodNames = {
+    "getGlyph",
+    "getComponentNames",
+    "updateVariationLocationIndex",
+    *backendGetterNames.values(),
+}
+backendWriteMethodNames = {
+    "putGlyph",
+    "deleteGlyph",
+    *backendBatchMethodNames.values(),
+    *backendSetterNames.values(),
+    *backendDeleterNames.values(),
+}
+
+
+class ExecutorBackend:
+    """Wrap a backend whose async read and write methods in fact perform
+    blocking I/O, so these calls run in an executor instead of on the event
+    loop. Other attributes are passed through to the wrapped backend.
+
+    Up to `maxConcurrentReads` read calls can run at the same time. Write
+    calls run one at a time, and only while no read calls are running. The
+    wrapped methods must not suspend (await anything that doesn't complete
+    right away).
+
+    If the backend splits its external change watching into
+    watchFileChanges() and processExternalChanges(), the latter runs like a
+    write call.
+
+    A cancelled call keeps its slot until the executor is done with it, as
+    the executor can't interrupt it. Use aclose() to close the backend once
+    all running calls are done.
+    """
+
+    def __init__(self, backend, executor=None, maxConcurrentReads=4):
+        maxConcurrentReads = min(
+            maxConcurrentReads,
+            getattr(backend, "maxConcurrentReads", maxConcurrentReads),
+        )
+        self.backend = backend
+        self.executor = executor
+        self.maxConcurrentReads = maxConcurrentReads
+        self._readSemaphore = asyncio.Semaphore(maxConcurrentReads)
+        self._writeLock = asyncio.Lock()
+
+    def __getattr__(self, attrName):
+        value = getattr(self.backend, attrName)
+        if attrName in backendReadMethodNames:
+            return functools.partial(self._callRead, value)
+        elif attrName in backendWriteMethodNames:
+            return functools.partial(self._callWrite, value)
+        elif attrName == "watchExternalChanges" and hasattr(
+            self.backend, "processExternalChanges"
+        ):
+            return self._watchExternalChanges
+        return value
+
+    async def _watchExternalChanges(self):
+        # Only the waiting for file changes happens on the event loop: the
+        # backend updates its data like a write call, so it doesn't race with
+        # the reads and writes running in the executor
+        async for changes in self.backend.watchFileChanges():
+            result = await self._callWrite(self.backend.processExternalChanges, changes)
+            if result is not None:
+                yield result
+
+    async def _callRead(self, method, *args, **kwargs):
+        async with self._readSemaphore:
+            return await self._runInExecutor(method, *args, **kwargs)
+
+    async def _callWrite(self, method, *args, **kwargs):
+        async with self._exclusiveAccess():
+            return await self._runInExecutor(method, *args, **kwargs)
+
+    async def aclose(self):
+        async with self._exclusiveAccess():
+            self.backend.close()
+
+    @asynccontextmanager
+    async def _exclusiveAccess(self):
+        async with self._writeLock:
+            # Take all read slots, so no reads happen during the write
+            for _ in range(self.maxConcurrentReads):
+                await self._readSemaphore.acquire()
+            try:
+                yield
+            finally:
+                for _ in range(self.maxConcurrentReads):
+                    self._readSemaphore.release()
+
+    async def _runInExecutor(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor,
+            functools.partial(_runCoroutineFunction, method, *args, **kwargs),
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Cancelling doesn't stop the call in the executor: wait for it to
+            # finish, so the caller doesn't give up its slot while it runs
+            while not future.done():
+                with suppress(asyncio.CancelledError):
+                    await asyncio.wait([future])
+            if not future.cancelled():
+                future.exception()  # retrieve it, so it isn't logged
+            raise
+
+
+def _runCoroutineFunction(coroFunc, *args, **kwargs):
+    # The wrapped methods are coroutine functions that block instead of
+    # awaiting, so they complete in a single step, and we don't need the
+    # overhead of setting up an event loop with asyncio.run()
+    coro = coroFunc(*args, **kwargs)
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    coro.close()
+    raise RuntimeError(
+        f"{coroFunc.__qualname__}() suspended, which is not supported for "
+        "backends with blocking I/O"
+    )
+
 
 @dataclass
 class FontHandler:
     backend: Any  # TODO: need Backend protocol
     readOnly: bool = False
+    backendExecutor: Optional[Executor] = None
+    maxConcurrentBackendReads: int = 4
+    cacheSize: int = 100 * 1024 * 1024  # estimated bytes, excluding root data
+    encodedGlyphCacheSize: int = 1000  # number of glyphs
+    glyphInstanceCacheSize: int = 1000  # number of instances
+    variationIndexChunkSize: int = 500  # number of glyphs
+    writeDelay: float = 0.05  # seconds, per write key
+    writeBatchWindow: float = 0.01  # seconds
+    historySize: int = 20 * 1024 * 1024  # estimated bytes
+    historyLogPath: Optional[os.PathLike] = None
+    journalPath: Optional[os.PathLike] = None
+    journalSyncDelay: float = 0.1  # seconds
 
     def __post_init__(self):
         if not hasattr(self.backend, "putGlyph"):
             self.readOnly = True
+        if getattr(self.backend, "hasBlockingIO", False):
+            self.backend = ExecutorBackend(
+                self.backend, self.backendExecutor, self.maxConcurrentBackendReads
+            )
         self.connections = set()
-        self.glyphUsedBy = {}
-        self.glyphMadeOf = {}
+        self.componentGraph = ComponentGraph()
+        self._componentGraphIsComplete = False
+        self._componentGraphLock = asyncio.Lock()
+        self._staleComponentGlyphs = set()
         self.clientData = defaultdict(dict)
-        self.localData = LRUCache()
+        self.subscriptionIndices = {
+            LIVE_CHANGES_PATTERN_KEY: SubscriptionIndex(),
+            CHANGES_PATTERN_KEY: SubscriptionIndex(),
+        }
+        self._connectionsByClientUUID = None
+        self.localData = SizedLRUCache(self.cacheSize, isPinned=_isRootDataKey)
+        self.encodedGlyphs = LRUCache(self.encodedGlyphCacheSize)
+        self.glyphInstancers = LRUCache(self.glyphInstanceCacheSize)
+        self.glyphInstances = LRUCache(self.glyphInstanceCacheSize)
+        self._glyphsBeingLoaded = {}
         self._dataScheduledForWriting = {}
+        self._writeScheduleTimes = {}
+        self.history = EditHistory(self.historySize, self.historyLogPath)
+        self.journal = None
+        if self.journalPath is not None and not self.readOnly:
+            self.journal = ChangeJournal(self.journalPath)
+        self._scheduledJournalSeqs = {}
+        # The write keys with journaled changes that can't be replayed onto
+        # already written data, see _appendJournalSnapshots()
+        self._journalSnapshotKeys = set()
+        self._numJournaledChangesInFlight = 0
+        self._journalSyncTask = None
 
     async def startTasks(self):
         if hasattr(self.backend, "watchExternalChanges"):
@@ -75,19 +252,48 @@ class FontHandler:
         self._processWritesTask.add_done_callback(taskDoneHelper)
         self._writingInProgressEvent = asyncio.Event()
         self._writingInProgressEvent.set()
+        if hasattr(self.backend, "updateVariationLocationIndex"):
+            self._variationIndexTask = asyncio.create_task(
+                self.buildVariationLocationIndex()
+            )
+            self._variationIndexTask.add_done_callback(taskDoneHelper)
+        if self.journal is not None:
+            await self._replayJournal()
 
     async def close(self):
-        self.backend.close()
+        if hasattr(self, "_variationIndexTask"):
+            self._variationIndexTask.cancel()
+            # Its taskDoneHelper reports any errors
+            await asyncio.wait([self._variationIndexTask])
         if hasattr(self, "_watcherTask"):
             self._watcherTask.cancel()
         if hasattr(self, "_processWritesTask"):
+            # Pending writes must reach the backend before it is closed
             await self.finishWriting()  # shield for cancel?
             self._processWritesTask.cancel()
+        if isinstance(self.backend, ExecutorBackend):
+            await self.backend.aclose()
+        else:
+            self.backend.close()
+        self.history.close()
+        if self.journal is not None:
+            self.journal.close()
+
+    async def buildVariationLocationIndex(self):
+        # Index the variation locations of all glyphs in chunks, so glyph
+        # requests don't have to wait for the whole font to be indexed
+        while not await self.backend.updateVariationLocationIndex(
+            self.variationIndexChunkSize
+        ):
+            pass
 
     async def processExternalChanges(self):
         async for change, reloadPattern in self.backend.watchExternalChanges():
             try:
                 if change is not None:
+                    change = compactChanges([change])
+                if change is not None:
+                    self._clearHistory(collectChangePaths(change, 2))
                     await self.updateLocalDataWithExternalChange(change)
                     await self.broadcastChange(change, None, False)
                 if reloadPattern is not None:
@@ -110,6 +316,7 @@ class FontHandler:
             await self._processWritesEvent.wait()
             try:
                 await self._processWritesOneCycle()
+                self._truncateJournal()
             except Exception as e:
                 self._processWritesError = e
                 raise
@@ -119,23 +326,47 @@ class FontHandler:
 
     async def _processWritesOneCycle(self):
         while self._dataScheduledForWriting:
-            writeKey, (writeFunc, connection) = popFirstItem(
-                self._dataScheduledForWriting
+            # Debounce per write key: a key is written once it hasn't been
+            # scheduled again for writeDelay seconds. The pending writes are
+            # ordered by schedule time, so the first one is due first.
+            firstWriteKey = next(iter(self._dataScheduledForWriting))
+            waitTime = (
+                self._writeScheduleTimes[firstWriteKey]
+                + self.writeDelay
+                - time.monotonic()
             )
-            reloadPattern = _writeKeyToPattern(writeKey)
-            logger.info(f"write {writeKey} to backend")
+            if waitTime > 0:
+                await asyncio.sleep(waitTime)
+                continue
+            writeBatch = self._popWriteBatch()
+            writeKeys = [writeKey for writeKey, _ in writeBatch]
+            journalSeqs = [
+                (writeKey, self._scheduledJournalSeqs.pop(writeKey, None))
+                for writeKey in writeKeys
+            ]
+            reloadPattern = {}
+            for writeKey in writeKeys:
+                reloadPattern = patternUnion(
+                    reloadPattern, _writeKeyToPattern(writeKey)
+                )
+            connections = [connection for _, (_, connection) in writeBatch]
+            self._appendJournalSnapshots(writeBatch, journalSeqs)
+            logger.info(f"write {_formatWriteKeys(writeKeys)} to backend")
+            startTime = time.perf_counter()
             try:
-                errorMessage = await writeFunc()
+                errorMessage = await self._performWrites(
+                    [writeCall for _, (writeCall, _) in writeBatch]
+                )
             except Exception as e:
                 logger.error("exception while writing data: %r", e)
                 traceback.print_exc()
                 await self.reloadData(reloadPattern)
-                if connection is not None:
+                for connection in _uniqueConnections(connections):
                     await connection.proxy.messageFromServer(
                         "The data could not be saved due to an error.",
                         f"The edit has been reverted.\n\n{e!r}",
                     )
-                else:
+                if None in connections:
                     # No connection to inform, let's error
                     raise
             else:
@@ -149,34 +380,206 @@ class FontHandler:
                             "The edit could not be reverted due to an additional error."
                             f"\n\n{e!r}"
                         )
-                    if connection is not None:
+                    for connection in _uniqueConnections(connections):
                         await connection.proxy.messageFromServer(
                             "The data could not be saved.",
                             messageDetail,
                         )
-                    else:
-                        # This ideally can't happen
-                        assert False, errorMessage
+                    # This ideally can't happen
+                    assert None not in connections, errorMessage
+            elapsed = time.perf_counter() - startTime
+            logger.info(f"wrote {len(writeBatch)} item(s) in {elapsed:.3f} seconds")
+            for writeKey, journalSeq in journalSeqs:
+                if journalSeq is not None:
+                    # Written, or reverted if there was an error: either way
+                    # the journaled changes for writeKey are done with
+                    self.journal.appendWritten(writeKey, journalSeq)
             await asyncio.sleep(0)
 
+    def _popWriteBatch(self):
+        writeKey, writeItem = popFirstItem(self._dataScheduledForWriting)
+        del self._writeScheduleTimes[writeKey]
+        writeBatch = [(writeKey, writeItem)]
+        (methodName, _), _ = writeItem
+        batchMethodName = backendBatchMethodNames.get(methodName)
+        if batchMethodName is not None and hasattr(self.backend, batchMethodName):
+            # Collect the other writes that can go into the same batch, and
+            # that are due, or almost: writes scheduled together end up in a
+            # single batch, even if they were scheduled a few moments apart
+            dueTime = time.monotonic() - self.writeDelay + self.writeBatchWindow
+            for otherWriteKey, ((otherMethodName, _), _) in list(
+                self._dataScheduledForWriting.items()
+            ):
+                if self._writeScheduleTimes[otherWriteKey] > dueTime:
+                    break
+                if otherMethodName == methodName:
+                    writeBatch.append(
+                        (
+                            otherWriteKey,
+                            self._dataScheduledForWriting.pop(otherWriteKey),
+                        )
+                    )
+                    del self._writeScheduleTimes[otherWriteKey]
+        return writeBatch
+
+    def _appendJournalSnapshots(self, writeBatch, journalSeqs):
+        # A crash during the write, or before it is marked as written, leaves
+        # it unknown whether the backend has the journaled changes. Replaying
+        # them is fine as long as they overwrite their targets, but a list
+        # insertion would be done twice. So for such changes, the journal
+        # gets the written data, from which the replay can start instead.
+        for (writeKey, ((methodName, args), _)), (_, journalSeq) in zip(
+            writeBatch, journalSeqs
+        ):
+            if journalSeq is None or writeKey not in self._journalSnapshotKeys:
+                continue
+            self._journalSnapshotKeys.discard(writeKey)
+            self.journal.appendSnapshot(
+                writeKey, journalSeq, _getWrittenValue(methodName, args)
+            )
+
+    async def _performWrites(self, writeCalls):
+        methodName, args = writeCalls[0]
+        if len(writeCalls) == 1:
+            return await getattr(self.backend, methodName)(
+                *_getWriteArgs(methodName, args)
+            )
+        batchMethod = getattr(self.backend, backendBatchMethodNames[methodName])
+        if methodName == "deleteGlyph":
+            return await batchMethod([glyphName for _, (glyphName,) in writeCalls])
+        return await batchMethod([args for _, args in writeCalls])
+
     @contextmanager
     def useConnection(self, connection):
         self.connections.add(connection)
+        self._connectionsByClientUUID = None
         try:
             yield
         finally:
             self.connections.remove(connection)
+            self._connectionsByClientUUID = None
+
+    def _getConnectionsByClientUUID(self):
+        connectionsByClientUUID = self._connectionsByClientUUID
+        if connectionsByClientUUID is None:
+            connectionsByClientUUID = defaultdict(list)
+            for connection in self.connections:
+                connectionsByClientUUID[connection.clientUUID].append(connection)
+            # A connection's client UUID is only known after its handshake
+            if None not in connectionsByClientUUID:
+                self._connectionsByClientUUID = connectionsByClientUUID
+        return connectionsByClientUUID
+
+    def _getSubscribedConnections(self, clientUUIDs, excludeConnection=None):
+        connectionsByClientUUID = self._getConnectionsByClientUUID()
+        return [
+            connection
+            for clientUUID in clientUUIDs
+            for connection in connectionsByClientUUID.get(clientUUID, ())
+            if connection != excludeConnection
+        ]
 
     @remoteMethod
     async def getGlyph(self, glyphName, *, connection=None):
         glyph = self.localData.get(("glyphs", glyphName))
         if glyph is None:
             glyph = await self._getGlyph(glyphName)
-            self.localData[("glyphs", glyphName)] = glyph
+        if connection is not None and glyph is not None:
+            # Remote calls: popular glyphs only get encoded once
+            return self._getEncodedGlyph(glyphName, glyph)
         return glyph
 
+    def _getEncodedGlyph(self, glyphName, glyph):
+        encodedGlyph = self.encodedGlyphs.get(glyphName)
+        # Changed glyphs are new objects (see _updateLocalDataAndWriteToBackend),
+        # so the identity check guards against stale cache entries
+        if encodedGlyph is None or encodedGlyph.value is not glyph:
+            encodedGlyph = PreEncodedValue(glyph)
+            self.encodedGlyphs[glyphName] = encodedGlyph
+        return encodedGlyph
+
+    @remoteMethod
+    async def getGlyphs(self, glyphNames, *, connection=None):
+        """Return a dict mapping the glyph names to glyphs, or None for glyphs
+        that don't exist. A glyph that fails to load doesn't fail the others:
+        the error is logged, and the glyph is given as None, or for remote
+        calls as {"exception": repr(error)}.
+        """
+        results = await asyncio.gather(
+            *(
+                self.getGlyph(glyphName, connection=connection)
+                for glyphName in glyphNames
+            ),
+            return_exceptions=True,
+        )
+        glyphs = {}
+        for glyphName, glyph in zip(glyphNames, results):
+            if isinstance(glyph, BaseException):
+                if not isinstance(glyph, Exception):
+                    raise glyph
+                logger.error(f"exception while loading glyph {glyphName!r}: {glyph!r}")
+                glyph = None if connection is None else {"exception": repr(glyph)}
+            glyphs[glyphName] = glyph
+        if connection is not None:
+            # Remote calls: the cached glyph encodings are reused
+            return PreEncodedDict(glyphs)
+        return glyphs
+
+    @remoteMethod
+    async def getGlyphInstance(self, glyphName, location, *, connection=None):
+        """Return the glyph interpolated at `location` as a StaticGlyph, or None
+        if the glyph doesn't exist. The location uses the user space values of
+        the global axes, and may include local axes of the glyph.
+        """
+        glyphInstancer = await self.getGlyphInstancer(glyphName)
+        if glyphInstancer is None:
+            return None
+        normalizedLocation = glyphInstancer.getNormalizedLocation(location)
+        cacheKey = (glyphName, normalizedLocation)
+        cachedInstance = self.glyphInstances.get(cacheKey)
+        if cachedInstance is not None and cachedInstance[0] is glyphInstancer:
+            return cachedInstance[1]
+        instance = glyphInstancer.instantiateNormalized(normalizedLocation)
+        self.glyphInstances[cacheKey] = (glyphInstancer, instance)
+        return instance
+
+    async def getGlyphInstancer(self, glyphName):
+        glyph = await self.getGlyph(glyphName)
+        if glyph is None:
+            return None
+        globalAxes = await self.getData("axes")
+        glyphInstancer = self.glyphInstancers.get(glyphName)
+        # Edits replace the glyph and axes objects (copy-on-write), so identity
+        # checks tell whether the instancer is still valid
+        if (
+            glyphInstancer is None
+            or glyphInstancer.glyph is not glyph
+            or glyphInstancer.globalAxes is not globalAxes
+        ):
+            glyphInstancer = GlyphInstancer(glyph, globalAxes)
+            self.glyphInstancers[glyphName] = glyphInstancer
+        return glyphInstancer
+
     def _getGlyph(self, glyphName):
-        return asyncio.create_task(self._getGlyphFromBackend(glyphName))
+        # Concurrent requests for the same glyph share a single backend load
+        loadTask = self._glyphsBeingLoaded.get(glyphName)
+        if loadTask is None:
+            loadTask = asyncio.create_task(self._loadGlyph(glyphName))
+            self._glyphsBeingLoaded[glyphName] = loadTask
+        # Shield the shared task: one cancelled request shouldn't affect others
+        return asyncio.shield(loadTask)
+
+    async def _loadGlyph(self, glyphName):
+        loadTask = asyncio.current_task()
+        try:
+            glyph = await self._getGlyphFromBackend(glyphName)
+            # If the glyph was reloaded in the meantime, our result may be stale
+            if self._glyphsBeingLoaded.get(glyphName) is loadTask:
+                self.localData[("glyphs", glyphName)] = glyph
+        finally:
+            if self._glyphsBeingLoaded.get(glyphName) is loadTask:
+                del self._glyphsBeingLoaded[glyphName]
+        return glyph
 
     async def _getGlyphFromBackend(self, glyphName):
         glyph = await self.backend.getGlyph(glyphName)
@@ -231,8 +634,9 @@ class FontHandler:
 
     def _adjustMatchPattern(self, func, pathOrPattern, wantLiveChanges, connection):
         key = LIVE_CHANGES_PATTERN_KEY if wantLiveChanges else CHANGES_PATTERN_KEY
-        matchPattern = self._getClientData(connection, key, {})
-        self._setClientData(connection, key, func(matchPattern, pathOrPattern))
+        matchPattern = func(self._getClientData(connection, key, {}), pathOrPattern)
+        self._setClientData(connection, key, matchPattern)
+        self.subscriptionIndices[key].setPattern(connection.clientUUID, matchPattern)
 
     @remoteMethod
     async def editIncremental(self, liveChange, *, connection):
@@ -242,12 +646,60 @@ class FontHandler:
     async def editFinal(
         self, finalChange, rollbackChange, editLabel, broadcast=False, *, connection
     ):
-        # TODO: use finalChange, rollbackChange, editLabel for history recording
         # TODO: locking/checking
+        finalChange = compactChanges([finalChange])
+        if finalChange is None:
+            return
         await self.updateLocalDataAndWriteToBackend(finalChange, connection)
         # return {"error": "computer says no"}
         if broadcast:
             await self.broadcastChange(finalChange, connection, False)
+        rollbackChange = compactChanges([rollbackChange])
+        if rollbackChange is not None:
+            record = HistoryRecord(
+                finalChange,
+                rollbackChange,
+                editLabel,
+                clientUUID=getattr(connection, "clientUUID", None),
+            )
+            self.history.pushRecord(getHistoryKey(finalChange), record)
+
+    @remoteMethod
+    async def undo(self, glyphName=None, *, connection):
+        return await self._undoRedo(glyphName, False, connection)
+
+    @remoteMethod
+    async def redo(self, glyphName=None, *, connection):
+        return await self._undoRedo(glyphName, True, connection)
+
+    @remoteMethod
+    async def getUndoRedoInfo(self, glyphName=None, isRedo=False, *, connection):
+        record = self.history.getTopRecord(
+            glyphName, isRedo, getattr(connection, "clientUUID", None)
+        )
+        return record.getInfo() if record is not None else None
+
+    async def _undoRedo(self, glyphName, isRedo, connection):
+        # Edits of glyphs are recorded by glyph name, other edits use None.
+        # A client only undoes its own edits.
+        record = self.history.popRecord(
+            glyphName, isRedo, getattr(connection, "clientUUID", None)
+        )
+        if record is None:
+            return None
+        await self.updateLocalDataAndWriteToBackend(record.rollbackChange, connection)
+        # The client requesting the undo doesn't have the change yet either
+        await self.broadcastChange(record.rollbackChange, None, False)
+        return record.getInfo()
+
+    def _clearHistory(self, paths):
+        # Any external change to an item invalidates its edit history
+        for path in paths:
+            if path[0] == "glyphs":
+                if len(path) > 1:
+                    self.history.clear(path[1])
+            else:
+                self.history.clear(None)
 
     async def broadcastChange(self, change, sourceConnection, isLiveChange):
         if isLiveChange:
@@ -255,15 +707,10 @@ class FontHandler:
         else:
             matchPatternKeys = [LIVE_CHANGES_PATTERN_KEY, CHANGES_PATTERN_KEY]
 
-        connections = [
-            connection
-            for connection in self.connections
-            if connection != sourceConnection
-            and any(
-                matchChangePattern(change, self._getClientData(connection, k, {}))
-                for k in matchPatternKeys
-            )
-        ]
+        clientUUIDs = set()
+        for key in matchPatternKeys:
+            clientUUIDs.update(self.subscriptionIndices[key].matchChange(change))
+        connections = self._getSubscribedConnections(clientUUIDs, sourceConnection)
 
         await asyncio.gather(
             *[connection.proxy.externalChange(change) for connection in connections]
@@ -272,11 +719,15 @@ class FontHandler:
     async def updateLocalDataWithExternalChange(self, change):
         await self._updateLocalDataAndWriteToBackend(change, None, True)
 
-    async def updateLocalDataAndWriteToBackend(self, change, sourceConnection):
-        await self._updateLocalDataAndWriteToBackend(change, sourceConnection, False)
+    async def updateLocalDataAndWriteToBackend(
+        self, change, sourceConnection, *, journalSeq=None
+    ):
+        await self._updateLocalDataAndWriteToBackend(
+            change, sourceConnection, False, journalSeq
+        )
 
     async def _updateLocalDataAndWriteToBackend(
-        self, change, sourceConnection, isExternalChange
+        self, change, sourceConnection, isExternalChange, journalSeq=None
     ):
         if isExternalChange:
             # The change is coming from the backend:
@@ -290,13 +741,38 @@ class FontHandler:
                 return
 
         rootKeys, rootObject = await self._prepareRootObject(change)
-        applyChange(rootObject, change)
-        await self._updateLocalData(
-            rootKeys,
+        # Copy-on-write: objects that may already be scheduled for writing
+        # are replaced instead of modified, so they can be written as is. The
+        # glyphMap dict itself can be big, so it is modified in place: only
+        # its changed entries are replaced, see _getWriteArgs().
+        applyChange(
             rootObject,
-            sourceConnection,
-            not isExternalChange and not self.readOnly,
+            change,
+            copyOnWrite=True,
+            ownedObjects=[rootObject.glyphs, rootObject.glyphMap],
         )
+        writeToBackEnd = not isExternalChange and not self.readOnly
+        if not writeToBackEnd or self.journal is None:
+            await self._updateLocalData(
+                rootKeys, rootObject, sourceConnection, writeToBackEnd
+            )
+            return
+        if journalSeq is None:
+            # Journal the change right after applying it, so the journal order
+            # matches the order in which changes are applied
+            journalSeq = self.journal.appendChange(change)
+            self._scheduleJournalSync()
+        self._journalSnapshotKeys.update(
+            _targetToWriteKey(target) for target in collectShiftingChangeTargets(change)
+        )
+        # The journal must not be truncated until the writes are scheduled
+        self._numJournaledChangesInFlight += 1
+        try:
+            await self._updateLocalData(
+                rootKeys, rootObject, sourceConnection, writeToBackEnd, journalSeq
+            )
+        finally:
+            self._numJournaledChangesInFlight -= 1
 
     def _getLocalDataPattern(self):
         localPattern = {}
@@ -332,45 +808,59 @@ class FontHandler:
         return rootKeys, rootObject
 
     async def _updateLocalData(
-        self, rootKeys, rootObject, sourceConnection, writeToBackEnd
+        self, rootKeys, rootObject, sourceConnection, writeToBackEnd, journalSeq=None
     ):
-        for rootKey in rootKeys + sorted(rootObject._assignedAttributeNames):
+        rootKeys = dict.fromkeys(rootKeys + sorted(rootObject._assignedAttributeNames))
+        for rootKey in rootKeys:
             if rootKey == "glyphs":
                 glyphSet = rootObject.glyphs
                 glyphMap = await self.getData("glyphMap")
                 for glyphName in sorted(glyphSet.keys()):
                     writeKey = ("glyphs", glyphName)
-                    if glyphName in glyphSet.newKeys:
-                        self.localData[writeKey] = glyphSet[glyphName]
+                    self.localData[writeKey] = glyphSet[glyphName]
+                    self.encodedGlyphs.pop(glyphName, None)
+                    self.updateGlyphDependencies(glyphName, glyphSet[glyphName])
                     if not writeToBackEnd:
                         continue
-                    writeFunc = functools.partial(
-                        self.backend.putGlyph,
+                    writeArgs = (
                         glyphName,
-                        deepcopy(glyphSet[glyphName]),
+                        glyphSet[glyphName],
                         glyphMap.get(glyphName, []),
                     )
-                    await self.scheduleDataWrite(writeKey, writeFunc, sourceConnection)
+                    await self.scheduleDataWrite(
+                        writeKey, "putGlyph", writeArgs, sourceConnection, journalSeq
+                    )
                 for glyphName in sorted(glyphSet.deletedKeys):
                     writeKey = ("glyphs", glyphName)
                     _ = self.localData.pop(writeKey, None)
+                    self.encodedGlyphs.pop(glyphName, None)
+                    self.componentGraph.removeGlyph(glyphName)
                     if not writeToBackEnd:
                         continue
-                    writeFunc = functools.partial(self.backend.deleteGlyph, glyphName)
-                    await self.scheduleDataWrite(writeKey, writeFunc, sourceConnection)
+                    await self.scheduleDataWrite(
+                        writeKey,
+                        "deleteGlyph",
+                        (glyphName,),
+                        sourceConnection,
+                        journalSeq,
+                    )
             else:
                 if rootKey in rootObject._assignedAttributeNames:
                     self.localData[rootKey] = getattr(rootObject, rootKey)
                 if not writeToBackEnd:
                     continue
-                method = getattr(self.backend, backendSetterNames[rootKey], None)
-                if method is None:
+                methodName = backendSetterNames[rootKey]
+                if not hasattr(self.backend, methodName):
                     logger.info(f"No backend write method found for {rootKey}")
                     continue
-                writeFunc = functools.partial(method, deepcopy(rootObject[rootKey]))
-                await self.scheduleDataWrite(rootKey, writeFunc, sourceConnection)
+                writeArgs = (getattr(rootObject, rootKey),)
+                await self.scheduleDataWrite(
+                    rootKey, methodName, writeArgs, sourceConnection, journalSeq
+                )
 
-    async def scheduleDataWrite(self, writeKey, writeFunc, connection):
+    async def scheduleDataWrite(
+        self, writeKey, methodName, args, connection, journalSeq=None
+    ):
         if self._dataScheduledForWriting is None:
             # The write-"thread" is no longer running
             await self.reloadData(_writeKeyToPattern(writeKey))
@@ -381,35 +871,144 @@ class FontHandler:
             )
             return
         shouldSignal = not self._dataScheduledForWriting
-        self._dataScheduledForWriting[writeKey] = (writeFunc, connection)
+        # A pending write for the same key gets replaced, moving it to the end
+        self._dataScheduledForWriting.pop(writeKey, None)
+        self._dataScheduledForWriting[writeKey] = ((methodName, args), connection)
+        self._writeScheduleTimes[writeKey] = time.monotonic()
+        if journalSeq is not None:
+            self._scheduledJournalSeqs[writeKey] = journalSeq
         if shouldSignal:
             self._processWritesEvent.set()  # write: go!
             self._writingInProgressEvent.clear()
 
+    def _scheduleJournalSync(self):
+        if self._journalSyncTask is None:
+            self._journalSyncTask = asyncio.create_task(self._syncJournal())
+            self._journalSyncTask.add_done_callback(taskDoneHelper)
+
+    async def _syncJournal(self):
+        # Wait a little, so closely spaced changes share a single fsync
+        await asyncio.sleep(self.journalSyncDelay)
+        self._journalSyncTask = None
+        await asyncio.to_thread(self.journal.sync)
+
+    def _truncateJournal(self):
+        if (
+            self.journal is None
+            or self._dataScheduledForWriting
+            or self._numJournaledChangesInFlight
+        ):
+            return
+        # All journaled changes have been written
+        self.journal.truncate()
+        self._scheduledJournalSeqs.clear()
+        self._journalSnapshotKeys.clear()
+
+    async def _replayJournal(self):
+        changes, writtenSeqs, snapshots = self.journal.read()
+        if not changes:
+            self.journal.truncate()
+            return
+        logger.info(f"replaying {len(changes)} change(s) from {self.journal.path}")
+        for writeKey, (seq, value) in sorted(
+            snapshots.items(), key=lambda item: item[1][0]
+        ):
+            if writtenSeqs.get(writeKey, 0) >= seq:
+                continue
+            # The write may have happened or not: start from the written data
+            change = await self._getSnapshotChange(writeKey, value)
+            if change is not None:
+                await self.updateLocalDataAndWriteToBackend(
+                    change, None, journalSeq=seq
+                )
+            writtenSeqs[writeKey] = seq
+        for seq, change in changes:
+            # Skip the parts of the change that were written before the crash
+            change = filterChangeTargets(
+                change,
+                lambda target: writtenSeqs.get(_targetToWriteKey(target), 0) < seq,
+            )
+            if change is not None:
+                await self.updateLocalDataAndWriteToBackend(
+                    change, None, journalSeq=seq
+                )
+        self._truncateJournal()
+
+    async def _getSnapshotChange(self, writeKey, value):
+        if isinstance(writeKey, tuple):
+            _, glyphName = writeKey
+            if value is not None:
+                return {"p": ["glyphs"], "f": "=", "a": [glyphName, value]}
+            if await self.getGlyph(glyphName) is None:
+                return None
+            return {"p": ["glyphs"], "f": "d", "a": [glyphName]}
+        # Let Font build the value, as the change wouldn't cast a list of dicts
+        value = getattr(from_dict(Font, {writeKey: value}), writeKey)
+        return {"p": [], "f": "=", "a": [writeKey, value]}
+
     def iterGlyphMadeOf(self, glyphName):
-        for dependantGlyphName in self.glyphMadeOf.get(glyphName, ()):
-            yield dependantGlyphName
-            yield from self.iterGlyphMadeOf(dependantGlyphName)
+        # Only glyphs that have been loaded or scanned are taken into account
+        yield from self.componentGraph.getMadeOf(glyphName)
 
     def iterGlyphUsedBy(self, glyphName):
-        for dependantGlyphName in self.glyphUsedBy.get(glyphName, ()):
-            yield dependantGlyphName
-            yield from self.iterGlyphUsedBy(dependantGlyphName)
+        # Only glyphs that have been loaded or scanned are taken into account
+        yield from self.componentGraph.getUsedBy(glyphName)
 
     def updateGlyphDependencies(self, glyphName, glyph):
-        # Zap previous used-by data for this glyph, if any
-        for componentName in self.glyphMadeOf.get(glyphName, ()):
-            if componentName in self.glyphUsedBy:
-                self.glyphUsedBy[componentName].discard(glyphName)
-        componentNames = set(_iterAllComponentNames(glyph))
-        if componentNames:
-            self.glyphMadeOf[glyphName] = componentNames
-        elif glyphName in self.glyphMadeOf:
-            del self.glyphMadeOf[glyphName]
-        for componentName in componentNames:
-            if componentName not in self.glyphUsedBy:
-                self.glyphUsedBy[componentName] = set()
-            self.glyphUsedBy[componentName].add(glyphName)
+        self.componentGraph.setComponents(glyphName, _iterAllComponentNames(glyph))
+
+    async def getComponentGraph(self):
+        """Return the component graph for all glyphs of the font. The first
+        call builds it from a component-only scan of the backend, if it
+        supports that; after that it is kept up to date with edits and
+        external changes.
+        """
+        async with self._componentGraphLock:
+            if not self._componentGraphIsComplete:
+                glyphNames = None
+            elif self._staleComponentGlyphs:
+                glyphNames = sorted(self._staleComponentGlyphs)
+            else:
+                return self.componentGraph
+            self._staleComponentGlyphs = set()
+            componentNames = await self._getComponentNamesFromBackend(glyphNames)
+            glyphMap = await self.getData("glyphMap")
+            for glyphName, names in componentNames.items():
+                # Glyphs that were loaded or edited in the meantime are at least
+                # as recent as the scan, and deleted glyphs should stay deleted
+                if glyphName in self.componentGraph or glyphName not in glyphMap:
+                    continue
+                self.componentGraph.setComponents(glyphName, names)
+            self._componentGraphIsComplete = True
+            return self.componentGraph
+
+    async def _getComponentNamesFromBackend(self, glyphNames):
+        if glyphNames is None:
+            glyphNames = list(await self.getData("glyphMap"))
+        if hasattr(self.backend, "getComponentNames"):
+            return await self.backend.getComponentNames(glyphNames)
+        # Fall back to loading the glyphs, bypassing our cache
+        componentNames = {}
+        for glyphName in glyphNames:
+            glyph = await self.backend.getGlyph(glyphName)
+            if glyph is not None:
+                componentNames[glyphName] = set(_iterAllComponentNames(glyph))
+        return componentNames
+
+    @remoteMethod
+    async def getGlyphsUsedBy(self, glyphName, transitive=True, *, connection=None):
+        componentGraph = await self.getComponentGraph()
+        return sorted(componentGraph.getUsedBy(glyphName, transitive))
+
+    @remoteMethod
+    async def getGlyphsMadeOf(self, glyphName, transitive=True, *, connection=None):
+        componentGraph = await self.getComponentGraph()
+        return sorted(componentGraph.getMadeOf(glyphName, transitive))
+
+    @remoteMethod
+    async def getCyclicGlyphs(self, *, connection=None):
+        componentGraph = await self.getComponentGraph()
+        return sorted(componentGraph.getCyclicGlyphs())
 
     async def reloadData(self, reloadPattern):
         # Drop local data to ensure it gets reloaded from the backend
@@ -417,13 +1016,22 @@ class FontHandler:
             if rootKey == "glyphs":
                 for glyphName in value:
                     self.localData.pop(("glyphs", glyphName), None)
+                    self.encodedGlyphs.pop(glyphName, None)
+                    self._glyphsBeingLoaded.pop(glyphName, None)
+                    self.history.clear(glyphName)
+                    self.componentGraph.removeGlyph(glyphName)
+                    self._staleComponentGlyphs.add(glyphName)
             else:
                 self.localData.pop(rootKey, None)
+                self.history.clear(None)
 
         logger.info(f"broadcasting external changes: {reloadPattern}")
 
+        clientUUIDs = set()
+        for subscriptionIndex in self.subscriptionIndices.values():
+            clientUUIDs.update(subscriptionIndex.matchPattern(reloadPattern))
         connections = []
-        for connection in self.connections:
+        for connection in self._getSubscribedConnections(clientUUIDs):
             subscribePattern = self._getCombinedSubscribePattern(connection)
             connReloadPattern = patternIntersect(subscribePattern, reloadPattern)
             if connReloadPattern:
@@ -461,6 +1069,48 @@ def _iterAllComponentNames(glyph):
             yield compo.name
 
 
+def _isRootDataKey(key):
+    # Root data, such as the glyph map and the axes, is keyed by a string,
+    # and should always stay cached. Glyphs are keyed by ("glyphs", glyphName).
+    return not isinstance(key, tuple)
+
+
+def _uniqueConnections(connections):
+    return [
+        connection
+        for connection in dict.fromkeys(connections)
+        if connection is not None
+    ]
+
+
+def _formatWriteKeys(writeKeys, maxKeys=5):
+    writeKeysString = ", ".join(str(writeKey) for writeKey in writeKeys[:maxKeys])
+    if len(writeKeys) > maxKeys:
+        writeKeysString += f" and {len(writeKeys) - maxKeys} more"
+    return writeKeysString
+
+
+def _getWriteArgs(methodName, args):
+    if methodName == backendSetterNames["glyphMap"]:
+        # The glyphMap is modified in place, so take a snapshot for the writer,
+        # once per write instead of once per edit
+        (glyphMap,) = args
+        return (dict(glyphMap),)
+    return args
+
+
+def _getWrittenValue(methodName, args):
+    if methodName == "putGlyph":
+        _, glyph, _ = args
+        return toDict(glyph)
+    elif methodName == "deleteGlyph":
+        return None
+    (value,) = args
+    if isinstance(value, list):
+        return [toDict(item) if is_dataclass(item) else item for item in value]
+    return value
+
+
 def popFirstItem(d):
     key = next(iter(d))
     return (key, d.pop(key))
@@ -473,6 +1123,14 @@ def taskDoneHelper(task):
         )
 
 
+def _targetToWriteKey(targetPath):
+    if not targetPath:
+        return None
+    if targetPath[0] == "glyphs" and len(targetPath) > 1:
+        return tuple(targetPath[:2])
+    return targetPath[0]
+
+
 def _writeKeyToPattern(writeKey):
     if not isinstance(writeKey, tuple):
         writeKey = (writeKey,)
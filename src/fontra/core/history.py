@@ -0,0 +1,231 @@
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .changes import collectChangePaths
+from .lrucache import estimateSize
+
+
+@dataclass
+class HistoryRecord:
+    change: dict
+    rollbackChange: dict
+    editLabel: str
+    clientUUID: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+    size: int = field(default=0, compare=False)
+
+    def reversed(self):
+        return HistoryRecord(
+            change=self.rollbackChange,
+            rollbackChange=self.change,
+            editLabel=self.editLabel,
+            clientUUID=self.clientUUID,
+            timestamp=self.timestamp,
+            size=self.size,
+        )
+
+    def getInfo(self):
+        return dict(
+            label=self.editLabel, clientUUID=self.clientUUID, timestamp=self.timestamp
+        )
+
+
+@dataclass
+class _HistoryStack:
+    undoRecords: deque = field(default_factory=deque)
+    redoRecords: list = field(default_factory=list)
+    spilledOffsets: list = field(default_factory=list)  # undo records on disk
+
+
+def getHistoryKey(change):
+    """Return the history key for `change`: the glyph name if the change only
+    affects a single glyph, else None.
+    """
+    glyphNames = {
+        path[1] for path in collectChangePaths(change, 2) if path[0] == "glyphs"
+    }
+    rootKeys = {path[0] for path in collectChangePaths(change, 1)}
+    if len(glyphNames) == 1 and rootKeys == {"glyphs"}:
+        return next(iter(glyphNames))
+    return None
+
+
+class EditHistory:
+    """Undo and redo stacks for the edits to a font, keyed by glyph name. Edits
+    that don't affect exactly one glyph use the None key. Each client has its
+    own stacks, as given by the clientUUID of the records: a client can only
+    undo its own edits.
+
+    The estimated size of all records is bounded by `maxSize`: when it is
+    exceeded, records are evicted from the bottom of the stacks of the least
+    recently used keys. If `logPath` is given, evicted undo records are
+    appended to a log file at that location, from which they are read back
+    when they are needed for undo. The log file is removed by close().
+    """
+
+    def __init__(self, maxSize=20 * 1024 * 1024, logPath=None):
+        self.maxSize = maxSize
+        self.logPath = logPath
+        self.totalSize = 0
+        # The stacks are keyed by (clientUUID, key) tuples: stack keys
+        self._stacks = {}
+        self._stackKeys = {}  # key -> {stackKey: None}
+        self._records = {}  # id(record) -> (stackKey, record)
+        # The stack keys that have records in memory, least recently used
+        # first (using a dict as an order-preserving set)
+        self._keyOrder = {}
+        self._logFile = None
+
+    def close(self):
+        self._stacks.clear()
+        self._stackKeys.clear()
+        self._records.clear()
+        self._keyOrder.clear()
+        self.totalSize = 0
+        if self._logFile is not None:
+            self._logFile.close()
+            self._logFile = None
+            os.remove(self.logPath)
+
+    def pushRecord(self, key, record):
+        stackKey = (record.clientUUID, key)
+        stack = self._stacks.get(stackKey)
+        if stack is None:
+            stack = self._stacks[stackKey] = _HistoryStack()
+            self._stackKeys.setdefault(key, {})[stackKey] = None
+        for redoRecord in stack.redoRecords:
+            self._forgetRecord(redoRecord)
+        stack.redoRecords = []
+        if not record.size:
+            record.size = estimateSize(record.change) + estimateSize(
+                record.rollbackChange
+            )
+        stack.undoRecords.append(record)
+        self._records[id(record)] = (stackKey, record)
+        self.totalSize += record.size
+        self._touchKey(stackKey)
+        self._evictRecords()
+
+    def clear(self, key):
+        """Clear the stacks for `key`, of all clients."""
+        for stackKey in self._stackKeys.pop(key, ()):
+            stack = self._stacks.pop(stackKey)
+            self._keyOrder.pop(stackKey, None)
+            for record in [*stack.undoRecords, *stack.redoRecords]:
+                self._forgetRecord(record)
+
+    def getTopRecord(self, key, isRedo, clientUUID=None):
+        stackKey = (clientUUID, key)
+        stack = self._stacks.get(stackKey)
+        if stack is None:
+            return None
+        if isRedo:
+            return stack.redoRecords[-1] if stack.redoRecords else None
+        if not stack.undoRecords and stack.spilledOffsets:
+            self._restoreSpilledRecord(stackKey, stack)
+        return stack.undoRecords[-1] if stack.undoRecords else None
+
+    def popRecord(self, key, isRedo, clientUUID=None):
+        """Pop the top record from the undo stack of the client with
+        `clientUUID` and push it onto its redo stack, or vice versa if `isRedo`
+        is true. Return the record, or None if the stack is empty. The returned
+        record is reversed for redo, so its rollbackChange is the change to
+        apply.
+        """
+        record = self.getTopRecord(key, isRedo, clientUUID)
+        if record is None:
+            return None
+        stackKey = (clientUUID, key)
+        stack = self._stacks[stackKey]
+        self._touchKey(stackKey)
+        if isRedo:
+            stack.undoRecords.append(stack.redoRecords.pop())
+            return record.reversed()
+        else:
+            stack.redoRecords.append(stack.undoRecords.pop())
+            return record
+
+    def _touchKey(self, stackKey):
+        # Move the stack key to the end: most recently used
+        self._keyOrder.pop(stackKey, None)
+        self._keyOrder[stackKey] = None
+
+    def _forgetRecord(self, record):
+        if self._records.pop(id(record), None) is not None:
+            self.totalSize -= record.size
+
+    def _evictRecords(self):
+        # Always keep the newest record, even if it exceeds the size limit
+        while self.totalSize > self.maxSize and len(self._records) > 1:
+            stackKey = next(iter(self._keyOrder))
+            stack = self._stacks[stackKey]
+            # The bottom of a stack is the bottom of the undo stack, or if
+            # that is empty, the top of the redo stack
+            if stack.undoRecords:
+                record = stack.undoRecords.popleft()
+                self._forgetRecord(record)
+                if self.logPath is not None:
+                    stack.spilledOffsets.append(self._spillRecord(stackKey, record))
+            else:
+                # The records above the top of the redo stack can't be redone
+                # without it
+                for redoRecord in stack.redoRecords:
+                    self._forgetRecord(redoRecord)
+                stack.redoRecords = []
+            if not stack.undoRecords and not stack.redoRecords:
+                del self._keyOrder[stackKey]
+                if not stack.spilledOffsets:
+                    del self._stacks[stackKey]
+                    _, key = stackKey
+                    stackKeys = self._stackKeys[key]
+                    del stackKeys[stackKey]
+                    if not stackKeys:
+                        del self._stackKeys[key]
+
+    def _spillRecord(self, stackKey, record):
+        if self._logFile is None:
+            self._logFile = open(self.logPath, "a+b")
+        self._logFile.seek(0, os.SEEK_END)
+        offset = self._logFile.tell()
+        line = json.dumps(
+            dict(
+                key=stackKey,
+                change=record.change,
+                rollbackChange=record.rollbackChange,
+                editLabel=record.editLabel,
+                clientUUID=record.clientUUID,
+                timestamp=record.timestamp,
+            ),
+            separators=(",", ":"),
+        )
+        self._logFile.write(line.encode("utf-8") + b"\n")
+        self._logFile.flush()
+        return offset
+
+    def _restoreSpilledRecord(self, stackKey, stack):
+        offset = stack.spilledOffsets.pop()
+        self._logFile.seek(offset)
+        data = json.loads(self._logFile.readline())
+        assert tuple(data.pop("key")) == stackKey
+        record = HistoryRecord(**data)
+        stack.undoRecords.append(record)
+        record.size = estimateSize(record.change) + estimateSize(record.rollbackChange)
+        self._records[id(record)] = (stackKey, record)
+        self.totalSize += record.size
+        # The restored record is about to be used: it is not evicted until the
+        # next push, so the size limit may be exceeded until then
+        self._touchKey(stackKey)
+
+    def getStatistics(self):
+        return dict(
+            numRecords=len(self._records),
+            numSpilledRecords=sum(
+                len(stack.spilledOffsets) for stack in self._stacks.values()
+            ),
+            totalSize=self.totalSize,
+            maxSize=self.maxSize,
+        )
@@ -0,0 +1,310 @@
+import logging
+import operator
+from array import array
+from dataclasses import fields
+from functools import lru_cache
+
+from fontTools.varLib.models import (
+    VariationModel,
+    VariationModelError,
+    normalizeValue,
+    piecewiseLinearMap,
+)
+
+from .classes import Component, StaticGlyph, Transformation
+from .packedpath import ContourInfo, PackedPath, PointType
+
+logger = logging.getLogger(__name__)
+
+
+class InterpolationError(Exception):
+    pass
+
+
+class GlyphInstancer:
+    """Instantiate a VariableGlyph at any location of the designspace, in the
+    same way the client's VariableGlyphController does.
+
+    Locations passed to instantiate() use the global axes in user space (before
+    the axis mapping is applied), plus any local axes of the glyph. The sources
+    are interpolated as flat coordinate arrays: all numbers of a source layer
+    glyph (path coordinates, component transformations and locations, advance
+    widths) are packed into a single array("d"), so the deltas and instances
+    are computed with a few whole-array operations.
+    """
+
+    def __init__(self, glyph, globalAxes):
+        self.glyph = glyph
+        self.globalAxes = globalAxes
+        self._setupAxes()
+        self.sources = [
+            source
+            for source in glyph.sources
+            if not source.inactive and source.layerName in glyph.layers
+        ]
+        self.sourceLocations = [
+            self._normalizeLocation(source.location) for source in self.sources
+        ]
+        self._model = None
+        self._deltas = None
+        self._glyphStructure = None
+
+    def _setupAxes(self):
+        # The combined axes are the glyph's local axes, plus the global axes
+        # that are not redefined locally, in designspace coordinates
+        localAxisNames = {axis.name for axis in self.glyph.axes}
+        self.combinedAxes = [
+            (axis.name, axis.minValue, axis.defaultValue, axis.maxValue)
+            for axis in self.glyph.axes
+        ]
+        self._globalAxisMappings = []
+        self._globalToLocalMappings = []
+        localAxes = {axis.name: axis for axis in self.glyph.axes}
+        for globalAxis in self.globalAxes:
+            mapping = {a: b for a, b in globalAxis.mapping}
+            if mapping:
+                self._globalAxisMappings.append((globalAxis.name, mapping))
+            minValue, defaultValue, maxValue = (
+                piecewiseLinearMap(value, mapping) if mapping else value
+                for value in (
+                    globalAxis.minValue,
+                    globalAxis.defaultValue,
+                    globalAxis.maxValue,
+                )
+            )
+            if globalAxis.name in localAxisNames:
+                localAxis = localAxes[globalAxis.name]
+                self._globalToLocalMappings.append(
+                    (
+                        globalAxis.name,
+                        {
+                            minValue: localAxis.minValue,
+                            defaultValue: localAxis.defaultValue,
+                            maxValue: localAxis.maxValue,
+                        },
+                    )
+                )
+            else:
+                self.combinedAxes.append(
+                    (globalAxis.name, minValue, defaultValue, maxValue)
+                )
+        # Local axes named "name*suffix" are controlled by the "name" axis
+        self._nliAxes = {}
+        for axis in self.glyph.axes:
+            baseName = axis.name.split("*", 1)[0]
+            if baseName != axis.name:
+                self._nliAxes.setdefault(baseName, []).append(axis.name)
+
+    def mapLocationGlobalToLocal(self, location):
+        location = dict(location)
+        for mappings in [self._globalAxisMappings, self._globalToLocalMappings]:
+            for axisName, mapping in mappings:
+                if axisName in location:
+                    location[axisName] = piecewiseLinearMap(location[axisName], mapping)
+        return {
+            realName: value
+            for baseName, value in location.items()
+            for realName in self._nliAxes.get(baseName, [baseName])
+        }
+
+    def _normalizeLocation(self, location):
+        normalizedLocation = {}
+        for axisName, minValue, defaultValue, maxValue in self.combinedAxes:
+            value = normalizeValue(
+                location.get(axisName, defaultValue), (minValue, defaultValue, maxValue)
+            )
+            if value:
+                normalizedLocation[axisName] = value
+        return tuple(sorted(normalizedLocation.items()))
+
+    def getNormalizedLocation(self, location):
+        """Return the normalized location for `location`, as a sorted tuple of
+        (axisName, value) pairs, leaving out the axes at their default.
+        """
+        return self._normalizeLocation(self.mapLocationGlobalToLocal(location))
+
+    def instantiate(self, location):
+        return self.instantiateNormalized(self.getNormalizedLocation(location))
+
+    def instantiateNormalized(self, normalizedLocation):
+        """Return a StaticGlyph for the normalized location, or None if the
+        glyph has no sources. If the sources can't be interpolated, the glyph
+        of the nearest source is returned.
+        """
+        if not self.sources:
+            return None
+        normalizedLocation = tuple(sorted(dict(normalizedLocation).items()))
+        if normalizedLocation in self.sourceLocations:
+            return self._getSourceGlyph(self.sourceLocations.index(normalizedLocation))
+        try:
+            model, deltas = self._getModelAndDeltas()
+        except (InterpolationError, VariationModelError) as e:
+            logger.warning(
+                f"Interpolation error while instantiating glyph {self.glyph.name} "
+                f"({e})"
+            )
+            return self._getSourceGlyph(self._findNearestSource(normalizedLocation))
+        scalars = model.getScalars(dict(normalizedLocation))
+        return self._unflattenGlyph(_interpolateFromDeltas(deltas, scalars))
+
+    def _getSourceGlyph(self, sourceIndex):
+        return self.glyph.layers[self.sources[sourceIndex].layerName].glyph
+
+    def _findNearestSource(self, normalizedLocation):
+        location = dict(normalizedLocation)
+        distances = []
+        for sourceIndex, sourceLocation in enumerate(self.sourceLocations):
+            sourceLocation = dict(sourceLocation)
+            distanceSquared = sum(
+                (sourceLocation.get(axisName, 0) - location.get(axisName, 0)) ** 2
+                for axisName in sourceLocation.keys() | location.keys()
+            )
+            distances.append((distanceSquared, sourceIndex))
+        return min(distances)[1]
+
+    def _getModelAndDeltas(self):
+        if self._deltas is None:
+            model = getVariationModel(self.sourceLocations, self.combinedAxes)
+            masterValues = self._flattenSourceGlyphs()
+            self._model, self._deltas = model, _getDeltas(model, masterValues)
+        return self._model, self._deltas
+
+    def _flattenSourceGlyphs(self):
+        sourceGlyphs = [
+            self._getSourceGlyph(sourceIndex)
+            for sourceIndex in range(len(self.sources))
+        ]
+        structures = [_getGlyphStructure(glyph) for glyph in sourceGlyphs]
+        for source, structure in zip(self.sources, structures):
+            if structure != structures[0]:
+                raise InterpolationError(
+                    f"source '{source.name}' is not compatible with "
+                    f"source '{self.sources[0].name}'"
+                )
+        self._glyphStructure = structures[0]
+        # Take the point types, including the smooth flags, from the default
+        defaultIndex = self.sourceLocations.index(())
+        self._pointTypes = sourceGlyphs[defaultIndex].path.pointTypes
+        return [_flattenGlyph(glyph) for glyph in sourceGlyphs]
+
+    def _unflattenGlyph(self, values):
+        contourInfo, _, components, hasAdvances = self._glyphStructure
+        numCoordinates = len(self._pointTypes) * 2
+        path = PackedPath(
+            coordinates=values[:numCoordinates],
+            pointTypes=array("B", self._pointTypes),
+            contourInfo=[
+                ContourInfo(endPoint=endPoint, isClosed=isClosed)
+                for endPoint, isClosed in contourInfo
+            ],
+        )
+        index = numCoordinates
+        instanceComponents = []
+        for componentName, axisNames in components:
+            numValues = len(_transformationFieldNames)
+            transformation = Transformation(
+                **dict(
+                    zip(_transformationFieldNames, values[index : index + numValues])
+                )
+            )
+            index += numValues
+            location = dict(zip(axisNames, values[index : index + len(axisNames)]))
+            index += len(axisNames)
+            instanceComponents.append(
+                Component(componentName, transformation, location)
+            )
+        advances = {}
+        for fieldName, hasValue in zip(_advanceFieldNames, hasAdvances):
+            if hasValue:
+                advances[fieldName] = values[index]
+                index += 1
+        assert index == len(values)
+        return StaticGlyph(path=path, components=instanceComponents, **advances)
+
+
+def getVariationModel(locations, axes):
+    """Return a VariationModel for `locations`, a sequence of normalized
+    locations in the form returned by GlyphInstancer.getNormalizedLocation(),
+    and `axes`, a sequence of (name, minValue, defaultValue, maxValue) tuples.
+
+    Most glyphs of a font share the same source locations, so the models are
+    cached process-wide: a model is only built once per distinct combination
+    of source locations and axes. The returned model must not be modified.
+    """
+    return _getVariationModel(tuple(locations), tuple(axes))
+
+
+@lru_cache(maxsize=256)
+def _getVariationModel(locations, axes):
+    return VariationModel(
+        [dict(location) for location in locations],
+        axisOrder=[axisName for axisName, *_ in axes],
+    )
+
+
+_transformationFieldNames = [field.name for field in fields(Transformation)]
+_advanceFieldNames = ["xAdvance", "yAdvance", "verticalOrigin"]
+
+# Smooth and non-smooth on-curve points are compatible
+_pointTypeCompatibilityTable = bytes(
+    PointType.ON_CURVE if pointType == PointType.ON_CURVE_SMOOTH else pointType
+    for pointType in range(256)
+)
+
+
+def _getGlyphStructure(glyph):
+    # Source glyphs with equal structures can be interpolated
+    path = glyph.path
+    return (
+        tuple((info.endPoint, info.isClosed) for info in path.contourInfo),
+        path.pointTypes.tobytes().translate(_pointTypeCompatibilityTable),
+        tuple(
+            (component.name, tuple(sorted(component.location)))
+            for component in glyph.components
+        ),
+        tuple(
+            getattr(glyph, fieldName) is not None for fieldName in _advanceFieldNames
+        ),
+    )
+
+
+def _flattenGlyph(glyph):
+    values = array("d", glyph.path.coordinates)
+    for component in glyph.components:
+        transformation = component.transformation
+        values.extend(
+            getattr(transformation, fieldName)
+            for fieldName in _transformationFieldNames
+        )
+        location = component.location
+        values.extend(location[axisName] for axisName in sorted(location))
+    values.extend(
+        value
+        for value in (getattr(glyph, fieldName) for fieldName in _advanceFieldNames)
+        if value is not None
+    )
+    return values
+
+
+def _getDeltas(model, masterValues):
+    # The same as VariationModel.getDeltas(), with whole-array operations
+    deltas = []
+    for i, weights in enumerate(model.deltaWeights):
+        delta = masterValues[model.reverseMapping[i]]
+        for j, weight in weights.items():
+            delta = map(operator.sub, delta, map(float(weight).__mul__, deltas[j]))
+        deltas.append(array("d", delta))
+    return deltas
+
+
+def _interpolateFromDeltas(deltas, scalars):
+    # Chain the lazy map() iterators, so the values are computed in one pass
+    values = None
+    for delta, scalar in zip(deltas, scalars):
+        if not scalar:
+            continue
+        contribution = map(float(scalar).__mul__, delta) if scalar != 1 else delta
+        values = (
+            contribution if values is None else map(operator.add, values, contribution)
+        )
+    return array("d", values)
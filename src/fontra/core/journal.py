@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import pathlib
+
+from .packedpath import jsonDefault
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeJournal:
+    """An append-only log of the changes made to a font, so edits that have not
+    yet been written to the backend can be recovered after a crash.
+
+    Each line of the journal file is a JSON object. A change entry looks like
+    {"s": seq, "c": change}, where `seq` is an increasing sequence number. A
+    written entry looks like {"s": seq, "w": writeKey}: it records that the
+    data for `writeKey` has been written to the backend, including all changes
+    up to and including `seq`. A snapshot entry looks like
+    {"s": seq, "k": writeKey, "v": value}: it is appended right before the
+    data for `writeKey` is written, and records the `value` being written. As
+    the write may or may not have happened after a crash, replaying changes
+    that aren't idempotent, such as list insertions, must start from the
+    snapshot instead.
+
+    Appended entries are flushed to the OS right away, but only synced to disk
+    by sync(), so several entries can share one fsync.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.seq = 0
+        self._file = None
+        self._needsSync = False
+
+    def read(self):
+        """Read the journal file, and return a list of (seq, change) tuples, a
+        dict mapping write keys to the last seq that has been written, and a
+        dict mapping write keys to the last (seq, value) snapshot.
+        """
+        changes = []
+        writtenSeqs = {}
+        snapshots = {}
+        if not self.path.exists():
+            return changes, writtenSeqs, snapshots
+        with open(self.path, "rb") as f:
+            for lineNumber, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line that was being written during a crash
+                    logger.warning(f"skipping invalid journal line {lineNumber}")
+                    continue
+                seq = entry["s"]
+                self.seq = max(self.seq, seq)
+                if "c" in entry:
+                    changes.append((seq, entry["c"]))
+                elif "k" in entry:
+                    writeKey = _readWriteKey(entry["k"])
+                    if seq >= snapshots.get(writeKey, (0, None))[0]:
+                        snapshots[writeKey] = (seq, entry["v"])
+                else:
+                    writeKey = _readWriteKey(entry["w"])
+                    writtenSeqs[writeKey] = max(writtenSeqs.get(writeKey, 0), seq)
+        return changes, writtenSeqs, snapshots
+
+    def appendChange(self, change):
+        """Append `change` to the journal, and return its sequence number."""
+        self.seq += 1
+        self._appendEntry({"s": self.seq, "c": change})
+        return self.seq
+
+    def appendWritten(self, writeKey, seq):
+        self._appendEntry({"s": seq, "w": writeKey})
+
+    def appendSnapshot(self, writeKey, seq, value):
+        """Append a snapshot of the data for `writeKey` including all changes up
+        to and including `seq`. `value` must be JSON serializable, except for
+        arrays, such as those of PackedPath.
+        """
+        self._appendEntry({"s": seq, "k": writeKey, "v": value})
+
+    def _appendEntry(self, entry):
+        if self._file is None:
+            self._open()
+        line = json.dumps(entry, separators=(",", ":"), default=jsonDefault)
+        self._file.write(line.encode("utf-8") + b"\n")
+        self._file.flush()
+        self._needsSync = True
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        if self._file.tell():
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a partially written line
+                    self._file.write(b"\n")
+
+    @property
+    def needsSync(self):
+        return self._needsSync
+
+    def sync(self):
+        """Make sure the appended entries are written to disk. This blocks, and
+        can be called from another thread.
+        """
+        if self._file is not None and self._needsSync:
+            self._needsSync = False
+            os.fsync(self._file.fileno())
+
+    def truncate(self):
+        """Remove all entries: to be called when all changes have been written."""
+        if self._file is not None:
+            self._file.truncate(0)
+            self._needsSync = True
+        elif self.path.exists():
+            self.path.write_bytes(b"")
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+def _readWriteKey(writeKey):
+    return tuple(writeKey) if isinstance(writeKey, list) else writeKey
@@ -1,3 +1,8 @@
+import sys
+from dataclasses import fields, is_dataclass
+from itertools import chain
+
+
 class LRUCache(dict):
     """A quick and dirty Least Recently Used cache, which leverages the fact
     that dictionaries keep their insertion order.
@@ -30,3 +35,149 @@ class LRUCache(dict):
         super().__setitem__(key, value)
         while len(self) > self._maxSize:
             del self[next(iter(self))]
+
+
+class SizedLRUCache:
+    """A Least Recently Used cache that is bounded by the estimated size in
+    bytes of its values, rather than by the number of items.
+
+    Items for which `isPinned(key)` returns True are stored separately: they
+    are never evicted and don't count towards the size limit.
+
+    The `hits`, `misses` and `evictions` attributes count cache lookups and
+    evicted items.
+    """
+
+    def __init__(self, maxSize, sizeFunc=None, isPinned=None):
+        assert isinstance(maxSize, int)
+        assert maxSize > 0
+        self._maxSize = maxSize
+        self._sizeFunc = sizeFunc if sizeFunc is not None else estimateSize
+        self._isPinned = isPinned if isPinned is not None else _neverPinned
+        self._items = {}  # key -> (value, size), in LRU order
+        self._pinnedItems = {}
+        self.totalSize = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def maxSize(self):
+        return self._maxSize
+
+    def __len__(self):
+        return len(self._items) + len(self._pinnedItems)
+
+    def __iter__(self):
+        yield from self._pinnedItems
+        yield from self._items
+
+    def keys(self):
+        return list(self)
+
+    def __contains__(self, key):
+        return key in self._pinnedItems or key in self._items
+
+    def __getitem__(self, key):
+        if key in self._pinnedItems:
+            self.hits += 1
+            return self._pinnedItems[key]
+        try:
+            item = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        # Move key/value to the end
+        self._items[key] = item
+        return item[0]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self._discard(key)
+        if self._isPinned(key):
+            self._pinnedItems[key] = value
+            return
+        size = self._sizeFunc(value)
+        self._items[key] = (value, size)
+        self.totalSize += size
+        # Evict least recently used items, but always keep the newest item,
+        # even if it exceeds the size limit by itself
+        while self.totalSize > self._maxSize and len(self._items) > 1:
+            _, evictedSize = self._items.pop(next(iter(self._items)))
+            self.totalSize -= evictedSize
+            self.evictions += 1
+
+    def __delitem__(self, key):
+        if not self._discard(key):
+            raise KeyError(key)
+
+    def pop(self, key, *default):
+        if key in self._pinnedItems:
+            return self._pinnedItems.pop(key)
+        if key in self._items:
+            value, size = self._items.pop(key)
+            self.totalSize -= size
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def _discard(self, key):
+        if key in self._pinnedItems:
+            del self._pinnedItems[key]
+            return True
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.totalSize -= item[1]
+            return True
+        return False
+
+    def getStatistics(self):
+        return dict(
+            numItems=len(self),
+            numPinnedItems=len(self._pinnedItems),
+            totalSize=self.totalSize,
+            maxSize=self._maxSize,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+
+def _neverPinned(key):
+    return False
+
+
+_atomicTypes = (str, bytes, int, float, bool, type(None))
+
+
+def estimateSize(obj):
+    """Return a rough estimate of the memory used by `obj` in bytes, including
+    the objects it contains.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, _atomicTypes):
+        return size
+    if isinstance(obj, dict):
+        items = chain(obj.keys(), obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        if obj and isinstance(next(iter(obj)), (int, float)):
+            # Fast path for coordinate lists and the like: assume homogeneous
+            return size + len(obj) * sys.getsizeof(next(iter(obj)))
+        items = obj
+    elif is_dataclass(obj):
+        items = (getattr(obj, field.name) for field in fields(obj))
+        if hasattr(obj, "__dict__"):
+            # Instances of classes without slots
+            size += sys.getsizeof(obj.__dict__)
+    elif hasattr(obj, "__dict__"):
+        items = vars(obj).values()
+    else:
+        return size
+    return size + sum(estimateSize(item) for item in items)
@@ -1,12 +1,15 @@
 import logging
 import math
+import operator
+from array import array
 from dataclasses import asdict, dataclass, field
 from enum import IntEnum
+from itertools import compress
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class ContourInfo:
     endPoint: int
     isClosed: bool = False
@@ -19,12 +22,31 @@ class PointType(IntEnum):
     ON_CURVE_SMOOTH = 0x08
 
 
-@dataclass
-class PackedPath:
+class _PackedPathBase:
+    # A slot that is not a dataclass field, so it is not part of the class
+    # schema, the serialized data, or equality
+    __slots__ = ("_integralFloats",)
+
+
+@dataclass(slots=True)
+class PackedPath(_PackedPathBase):
+    # The coordinates and point types are stored compactly as array("d") and
+    # array("B"). Lists are accepted, and converted by __post_init__(). The
+    # list annotations are what the class schema, and therefore the client,
+    # sees.
     coordinates: list[float] = field(default_factory=list)
     pointTypes: list[PointType] = field(default_factory=list)
     contourInfo: list[ContourInfo] = field(default_factory=list)
 
+    def __post_init__(self):
+        self.coordinates = _asArray("d", self.coordinates)
+        self.pointTypes = _asArray("B", self.pointTypes)
+        # The array can't tell 364.0 from 364. For paths read from source
+        # files, this maps the indices of coordinates that were integral
+        # floats to their values, so they are written back as they were read,
+        # as long as they are not changed. See PackedPathPointPen.
+        self._integralFloats = None
+
     @classmethod
     def fromUnpackedContours(cls, unpackedContours):
         coordinates = []
@@ -45,7 +67,7 @@ class PackedPath:
 
     def unpackedContours(self):
         unpackedContours = []
-        coordinates = self.coordinates
+        coordinates = self._coordinatesToList(0, len(self.coordinates))
         pointTypes = self.pointTypes
         startIndex = 0
         for contourInfo in self.contourInfo:
@@ -55,11 +77,161 @@ class PackedPath:
             startIndex = endIndex
         return unpackedContours
 
+    def copy(self):
+        path = PackedPath(
+            coordinates=array("d", self.coordinates),
+            pointTypes=array("B", self.pointTypes),
+            contourInfo=[
+                ContourInfo(endPoint=info.endPoint, isClosed=info.isClosed)
+                for info in self.contourInfo
+            ],
+        )
+        # Shared, as it is replaced rather than modified when points move
+        path._integralFloats = self._integralFloats
+        return path
+
+    def _coordinatesToList(self, start, stop):
+        values = coordinatesToList(self.coordinates[start:stop])
+        if self._integralFloats:
+            for index, value in self._integralFloats.items():
+                # An edited coordinate no longer matches its recorded value
+                if start <= index < stop and values[index - start] == value:
+                    values[index - start] = value
+        return values
+
+    # The geometry methods below work on whole coordinate arrays. Without
+    # NumPy, map() with operator functions and bound float methods, array slices
+    # and itertools.compress() keep the per-point work out of the Python
+    # interpreter loop.
+
+    def getControlBounds(self):
+        """Return (xMin, yMin, xMax, yMax) of all points, including off-curve
+        points, or None if the path is empty.
+        """
+        return _getBounds(self.coordinates[0::2], self.coordinates[1::2])
+
+    def getBounds(self):
+        """Return the exact bounds (xMin, yMin, xMax, yMax) of the outline, or
+        None if the path is empty.
+        """
+        if not self.coordinates:
+            return None
+        onCurveMask = self.pointTypes.tobytes().translate(_onCurveMaskTable)
+        offCurveMask = self.pointTypes.tobytes().translate(_offCurveMaskTable)
+        xs = self.coordinates[0::2]
+        ys = self.coordinates[1::2]
+        bounds = _getBounds(compress(xs, onCurveMask), compress(ys, onCurveMask))
+        if bounds is not None:
+            xMin, yMin, xMax, yMax = bounds
+            offCurveBounds = _getBounds(
+                compress(xs, offCurveMask), compress(ys, offCurveMask)
+            )
+            if offCurveBounds is None:
+                return bounds
+            oxMin, oyMin, oxMax, oyMax = offCurveBounds
+            if xMin <= oxMin and yMin <= oyMin and oxMax <= xMax and oyMax <= yMax:
+                # The curves can't extend beyond their control points
+                return bounds
+        # Some curve may extend beyond the on-curve points: compute the curve
+        # extrema
+        from fontTools.pens.boundsPen import BoundsPen
+        from fontTools.pens.pointPen import PointToSegmentPen
+
+        boundsPen = BoundsPen(None)
+        self.drawPoints(PointToSegmentPen(boundsPen))
+        return boundsPen.bounds
+
+    def transformed(self, transformation):
+        """Return a new path with all points transformed by `transformation`,
+        a fontTools Transform, or any (xx, xy, yx, yy, dx, dy) sequence.
+        """
+        xx, xy, yx, yy, dx, dy = (float(v) for v in transformation)
+        xs = self.coordinates[0::2]
+        ys = self.coordinates[1::2]
+        coordinates = array("d", self.coordinates)
+        coordinates[0::2] = array(
+            "d",
+            map(
+                dx.__add__, map(operator.add, map(xx.__mul__, xs), map(yx.__mul__, ys))
+            ),
+        )
+        coordinates[1::2] = array(
+            "d",
+            map(
+                dy.__add__, map(operator.add, map(xy.__mul__, xs), map(yy.__mul__, ys))
+            ),
+        )
+        return self._withCoordinates(coordinates)
+
+    def isCompatible(self, other):
+        """Return True if `self` and `other` have the same structure, so they
+        can be interpolated. Smooth flags may differ.
+        """
+        return (
+            len(self.coordinates) == len(other.coordinates)
+            and self.pointTypes.tobytes().translate(_pointTypeMaskTable)
+            == other.pointTypes.tobytes().translate(_pointTypeMaskTable)
+            and self.contourInfo == other.contourInfo
+        )
+
+    def addItemwise(self, other):
+        self._ensureCompatibility(other)
+        return self._withCoordinates(
+            array("d", map(operator.add, self.coordinates, other.coordinates))
+        )
+
+    def subItemwise(self, other):
+        self._ensureCompatibility(other)
+        return self._withCoordinates(
+            array("d", map(operator.sub, self.coordinates, other.coordinates))
+        )
+
+    def mulScalar(self, scalar):
+        return self._withCoordinates(
+            array("d", map(float(scalar).__mul__, self.coordinates))
+        )
+
+    # The operators allow PackedPath to be used with fontTools.varLib.models
+    __add__ = addItemwise
+    __sub__ = subItemwise
+    __mul__ = mulScalar
+    __rmul__ = mulScalar
+
+    def interpolate(self, other, t):
+        """Return the linear interpolation between `self` (t == 0) and `other`
+        (t == 1).
+        """
+        self._ensureCompatibility(other)
+        t = float(t)
+        coordinates = array(
+            "d",
+            map(
+                operator.add,
+                self.coordinates,
+                map(t.__mul__, map(operator.sub, other.coordinates, self.coordinates)),
+            ),
+        )
+        return self._withCoordinates(coordinates)
+
+    def _ensureCompatibility(self, other):
+        if not self.isCompatible(other):
+            raise VariationError("paths are not compatible")
+
+    def _withCoordinates(self, coordinates):
+        return PackedPath(
+            coordinates=coordinates,
+            pointTypes=array("B", self.pointTypes),
+            contourInfo=[
+                ContourInfo(endPoint=info.endPoint, isClosed=info.isClosed)
+                for info in self.contourInfo
+            ],
+        )
+
     def drawPoints(self, pen):
         startPoint = 0
         for contourInfo in self.contourInfo:
             endIndex = contourInfo.endPoint + 1
-            coordinates = self.coordinates[startPoint * 2 : endIndex * 2]
+            coordinates = self._coordinatesToList(startPoint * 2, endIndex * 2)
             points = list(pairwise(coordinates))
             pointTypes = self.pointTypes[startPoint:endIndex]
             if not contourInfo.isClosed:
@@ -105,6 +277,16 @@ class PackedPath:
         coords[i] = x
         coords[i + 1] = y
 
+    def setPointPositions(self, pointPositions):
+        """Set the positions of multiple points. `pointPositions` is a sequence
+        of (pointIndex, x, y) items.
+        """
+        coords = self.coordinates
+        for pointIndex, x, y in pointPositions:
+            i = pointIndex * 2
+            coords[i] = x
+            coords[i + 1] = y
+
     def deleteContour(self, contourIndex):
         contourIndex = self._normalizeContourIndex(contourIndex)
         contour = self.contourInfo[contourIndex]
@@ -169,8 +351,25 @@ class PackedPath:
 
     def _replacePoints(self, startPoint, numPoints, coordinates, pointTypes):
         dblIndex = startPoint * 2
-        self.coordinates[dblIndex : dblIndex + numPoints * 2] = coordinates
-        self.pointTypes[startPoint : startPoint + numPoints] = pointTypes
+        self.coordinates[dblIndex : dblIndex + numPoints * 2] = _asArray(
+            "d", coordinates
+        )
+        self.pointTypes[startPoint : startPoint + numPoints] = _asArray("B", pointTypes)
+        if self._integralFloats:
+            self._shiftIntegralFloats(dblIndex, numPoints * 2, len(coordinates))
+
+    def _shiftIntegralFloats(self, start, numRemoved, numInserted):
+        # Inserting or deleting points moves the coordinates after them. Build
+        # a new dict, as copies of this path share the old one.
+        stop = start + numRemoved
+        offset = numInserted - numRemoved
+        integralFloats = {}
+        for index, value in self._integralFloats.items():
+            if index < start:
+                integralFloats[index] = value
+            elif index >= stop:
+                integralFloats[index + offset] = value
+        self._integralFloats = integralFloats or None
 
     def _moveEndPoints(self, fromContourIndex, offset):
         for contourInfo in self.contourInfo[fromContourIndex:]:
@@ -178,19 +377,29 @@ class PackedPath:
 
 
 class PackedPathPointPen:
-    def __init__(self):
+    """A point pen that builds a PackedPath. If `keepIntegralFloats` is true,
+    the path remembers which coordinates were given as integral floats, such
+    as 364.0, so drawPoints() draws them as floats, and not as ints. This is
+    for backends that write the path back to the file it was read from.
+    """
+
+    def __init__(self, keepIntegralFloats=False):
         self.coordinates = []
         self.pointTypes = []
         self.contourInfo = []
         self.components = []
+        self.keepIntegralFloats = keepIntegralFloats
         self._currentContour = None
 
     def getPath(self):
-        return PackedPath(
-            self.coordinates,
-            [PointType(tp) for tp in self.pointTypes],
-            self.contourInfo,
-        )
+        path = PackedPath(self.coordinates, self.pointTypes, self.contourInfo)
+        if self.keepIntegralFloats:
+            path._integralFloats = {
+                index: value
+                for index, value in enumerate(self.coordinates)
+                if type(value) is float and value.is_integer()
+            } or None
+        return path
 
     def beginPath(self, **kwargs):
         self._currentContour = []
@@ -319,6 +528,44 @@ def pairwise(iterable):
     return zip(it, it)
 
 
+class VariationError(ValueError):
+    pass
+
+
+_pointTypeMask = 0x07  # strips the smooth flag
+_pointTypeMaskTable = bytes(i & _pointTypeMask for i in range(256))
+_onCurveMaskTable = bytes(int(not i & _pointTypeMask) for i in range(256))
+_offCurveMaskTable = bytes(int(bool(i & _pointTypeMask)) for i in range(256))
+
+
+def _getBounds(xs, ys):
+    xs = array("d", xs)
+    if not xs:
+        return None
+    ys = array("d", ys)
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def coordinatesToList(coordinates):
+    """Return the coordinates as a list, with integral values as int."""
+    return [int(v) if v.is_integer() else v for v in coordinates]
+
+
+def jsonDefault(obj):
+    """`default` function for json.dumps(), for data that contains PackedPath
+    arrays.
+    """
+    if isinstance(obj, array):
+        return coordinatesToList(obj) if obj.typecode == "d" else obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _asArray(typeCode, values):
+    if isinstance(values, array) and values.typecode == typeCode:
+        return values
+    return array(typeCode, values)
+
+
 def _iterPoints(coordinates, pointTypes, startIndex, endIndex):
     for i in range(startIndex, endIndex):
         point = dict(x=coordinates[i * 2], y=coordinates[i * 2 + 1])
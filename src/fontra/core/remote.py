@@ -1,10 +1,23 @@
 import asyncio
+import json
 import logging
 import traceback
-from dataclasses import asdict, is_dataclass
+from collections import Counter
+from dataclasses import is_dataclass
 
 from aiohttp import WSMsgType
 
+from .binarymessage import (
+    BINARY_ENCODING,
+    decodeBinaryMessage,
+    encodeBinaryDict,
+    encodeBinaryMessage,
+    encodeBinaryMessageWithValue,
+    encodeBinaryValue,
+)
+from .classes import toDict
+from .packedpath import jsonDefault
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,15 +25,88 @@ class RemoteObjectConnectionException(Exception):
     pass
 
 
+class PreEncodedValue:
+    """A return value for remote methods, that is encoded at most once per
+    message encoding, no matter how often it is sent. The value must not be
+    modified after it has been wrapped.
+    """
+
+    __slots__ = ("value", "_json", "_binary")
+
+    def __init__(self, value):
+        self.value = value
+        self._json = None
+        self._binary = None
+
+    def getJSON(self):
+        if self._json is None:
+            value = self.value
+            if is_dataclass(value):
+                value = toDict(value)
+            self._json = json.dumps(value, default=jsonDefault)
+        return self._json
+
+    def getBinary(self):
+        if self._binary is None:
+            self._binary = encodeBinaryValue(self.value)
+        return self._binary
+
+
+class PreEncodedDict(PreEncodedValue):
+    """A pre-encoded dict, whose values may be PreEncodedValue instances: their
+    encodings are spliced into the encoding of the dict, so for example a
+    batch of cached glyphs doesn't get encoded again.
+    """
+
+    __slots__ = ()
+
+    def getJSON(self):
+        if self._json is None:
+            itemsJSON = ", ".join(
+                f"{json.dumps(key)}: {_preEncode(item).getJSON()}"
+                for key, item in self.value.items()
+            )
+            self._json = f"{{{itemsJSON}}}"
+        return self._json
+
+    def getBinary(self):
+        if self._binary is None:
+            self._binary = encodeBinaryDict(
+                {key: _preEncode(item).getBinary() for key, item in self.value.items()}
+            )
+        return self._binary
+
+
+def _preEncode(value):
+    return value if isinstance(value, PreEncodedValue) else PreEncodedValue(value)
+
+
 class RemoteObjectConnection:
-    def __init__(self, websocket, path, subject, verboseErrors):
+    def __init__(
+        self,
+        websocket,
+        path,
+        subject,
+        verboseErrors,
+        *,
+        compressionThreshold=0,
+        callStatistics=None,
+    ):
         self.websocket = websocket
         self.path = path
         self.subject = subject
         self.verboseErrors = verboseErrors
+        self.compressionThreshold = compressionThreshold
+        self.callStatistics = (
+            callStatistics if callStatistics is not None else RemoteCallStatistics()
+        )
         self.clientUUID = None
+        self.useBinaryEncoding = False
         self.callReturnFutures = {}
+        self.serverCallMethodNames = {}
         self.getNextServerCallID = _genNextServerCallID()
+        # Frames are sent one at a time, see _sendUncompressed()
+        self._sendLock = asyncio.Lock()
 
     @property
     def proxy(self):
@@ -32,6 +118,9 @@ class RemoteObjectConnection:
         self.clientUUID = message.get("client-uuid")
         if self.clientUUID is None:
             raise RemoteObjectConnectionException("unrecognized message")
+        # Clients that can decode binary messages say so in the handshake,
+        # others keep getting JSON
+        self.useBinaryEncoding = BINARY_ENCODING in message.get("encodings", [])
         try:
             await self._handleConnection()
         # except websockets.exceptions.ConnectionClosedError as e:
@@ -50,7 +139,12 @@ class RemoteObjectConnection:
                 # message.json() will fail with a TypeError.
                 # https://github.com/aio-libs/aiohttp/issues/7313#issuecomment-1586150267
                 raise message.data
-            message = message.json()
+            messageSize = len(message.data)
+            if message.type == WSMsgType.BINARY:
+                message = decodeBinaryMessage(message.data)
+            else:
+                messageSize = len(message.data.encode("utf-8"))
+                message = message.json()
 
             if message.get("connection") == "close":
                 logger.info("client requested connection close")
@@ -58,12 +152,20 @@ class RemoteObjectConnection:
             tasks = [task for task in tasks if not task.done()]
             if "client-call-id" in message:
                 # this is an incoming client -> server call
+                self.callStatistics.recordCall(
+                    message.get("method-name"), bytesIn=messageSize
+                )
                 tasks.append(
                     asyncio.create_task(self._performCall(message, self.subject))
                 )
             elif "server-call-id" in message:
                 # this is a response to a server -> client call
-                fut = self.callReturnFutures[message["server-call-id"]]
+                serverCallID = message["server-call-id"]
+                self.callStatistics.recordBytes(
+                    self.serverCallMethodNames.pop(serverCallID, None),
+                    bytesIn=messageSize,
+                )
+                fut = self.callReturnFutures.pop(serverCallID)
                 returnValue = message.get("return-value")
                 error = message.get("error")
                 if error is None:
@@ -76,6 +178,7 @@ class RemoteObjectConnection:
 
     async def _performCall(self, message, subject):
         clientCallID = "unknown-client-call-id"
+        methodName = None
         try:
             clientCallID = message["client-call-id"]
             methodName = message["method-name"]
@@ -83,14 +186,25 @@ class RemoteObjectConnection:
             methodHandler = getattr(subject, methodName, None)
             if getattr(methodHandler, "fontraRemoteMethod", False):
                 returnValue = await methodHandler(*arguments, connection=self)
-                if is_dataclass(returnValue):
-                    returnValue = asdict(returnValue)
+                if self.useBinaryEncoding or isinstance(returnValue, PreEncodedValue):
+                    # encodeBinaryMessage() deals with dataclasses itself, and
+                    # pre-encoded values are dealt with by sendMessage()
+                    pass
+                elif is_dataclass(returnValue):
+                    returnValue = toDict(returnValue)
                 elif (
                     isinstance(returnValue, list)
                     and returnValue
                     and is_dataclass(returnValue[0])
                 ):
-                    returnValue = [asdict(item) for item in returnValue]
+                    returnValue = [toDict(item) for item in returnValue]
+                elif isinstance(returnValue, dict) and any(
+                    is_dataclass(value) for value in returnValue.values()
+                ):
+                    returnValue = {
+                        key: toDict(value) if is_dataclass(value) else value
+                        for key, value in returnValue.items()
+                    }
                 response = {"client-call-id": clientCallID, "return-value": returnValue}
             else:
                 response = {
@@ -102,10 +216,53 @@ class RemoteObjectConnection:
             if self.verboseErrors:
                 traceback.print_exc()
             response = {"client-call-id": clientCallID, "exception": repr(e)}
-        await self.sendMessage(response)
+        await self.sendMessage(response, methodName)
+
+    async def sendMessage(self, message, methodName=None):
+        returnValue = message.get("return-value")
+        if isinstance(returnValue, PreEncodedValue):
+            message = {k: v for k, v in message.items() if k != "return-value"}
+        else:
+            returnValue = None
+        if self.useBinaryEncoding:
+            if returnValue is not None:
+                data = encodeBinaryMessageWithValue(
+                    message, "return-value", returnValue.getBinary()
+                )
+            else:
+                data = encodeBinaryMessage(message)
+            send = self.websocket.send_bytes
+        else:
+            # ensure_ascii: len(data) is the byte size
+            data = json.dumps(message, default=jsonDefault)
+            if returnValue is not None:
+                data = f'{data[:-1]}, "return-value": {returnValue.getJSON()}}}'
+            send = self.websocket.send_str
+        self.callStatistics.recordBytes(methodName, bytesOut=len(data))
+        async with self._sendLock:
+            if len(data) >= self.compressionThreshold or not self.websocket.compress:
+                await send(data)
+            else:
+                await self._sendUncompressed(send, data)
 
-    async def sendMessage(self, message):
-        await self.websocket.send_json(message)
+    async def _sendUncompressed(self, send, data):
+        # aiohttp compresses every frame once permessage-deflate has been
+        # negotiated, and only offers a way to force compression per frame, not
+        # to skip it: send_str(data, compress=0) uses the default compression.
+        # Uncompressed frames are allowed by the extension though, so
+        # temporarily switch off compression on the frame writer. This is only
+        # done while holding _sendLock, so no other frames are sent meanwhile.
+        # If the frame writer doesn't have the attribute, as it's private to
+        # aiohttp, the frame is just compressed.
+        writer = getattr(self.websocket, "_writer", None)
+        if not hasattr(writer, "compress"):
+            await send(data)
+            return
+        writer.compress = 0
+        try:
+            await send(data)
+        finally:
+            writer.compress = self.websocket.compress
 
 
 class RemoteClientProxy:
@@ -125,12 +282,57 @@ class RemoteClientProxy:
             }
             returnFuture = asyncio.get_running_loop().create_future()
             self._connection.callReturnFutures[serverCallID] = returnFuture
-            await self._connection.sendMessage(message)
+            self._connection.serverCallMethodNames[serverCallID] = methodName
+            self._connection.callStatistics.recordCall(methodName)
+            await self._connection.sendMessage(message, methodName)
             return await returnFuture
 
         return methodWrapper
 
 
+class RemoteCallStatistics:
+    """Call counts and message payload sizes per remote method name, before
+    compression. Incoming and outgoing bytes are attributed to the method of
+    the call, for both client -> server and server -> client calls.
+    """
+
+    def __init__(self):
+        self.callCounts = Counter()
+        self.bytesIn = Counter()
+        self.bytesOut = Counter()
+
+    def recordCall(self, methodName, bytesIn=0):
+        self.callCounts[methodName] += 1
+        self.recordBytes(methodName, bytesIn=bytesIn)
+
+    def recordBytes(self, methodName, bytesIn=0, bytesOut=0):
+        if bytesIn:
+            self.bytesIn[methodName] += bytesIn
+        if bytesOut:
+            self.bytesOut[methodName] += bytesOut
+
+    def getSummary(self):
+        """Return a dict with per-method statistics, ordered by the total
+        number of bytes, largest first.
+        """
+        methodNames = set(self.callCounts) | set(self.bytesIn) | set(self.bytesOut)
+        summary = {
+            str(methodName): {
+                "calls": self.callCounts[methodName],
+                "bytesIn": self.bytesIn[methodName],
+                "bytesOut": self.bytesOut[methodName],
+            }
+            for methodName in methodNames
+        }
+        return dict(
+            sorted(
+                summary.items(),
+                key=lambda item: item[1]["bytesIn"] + item[1]["bytesOut"],
+                reverse=True,
+            )
+        )
+
+
 def _genNextServerCallID():
     serverCallID = 0
     while True:
@@ -17,7 +17,11 @@ from urllib.parse import quote
 
 from aiohttp import WSCloseCode, web
 
-from .remote import RemoteObjectConnection, RemoteObjectConnectionException
+from .remote import (
+    RemoteCallStatistics,
+    RemoteObjectConnection,
+    RemoteObjectConnectionException,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,12 +34,15 @@ class FontraServer:
     launchWebBrowser: bool = False
     versionToken: Optional[str] = None
     cookieMaxAge: int = 7 * 24 * 60 * 60
+    websocketCompression: bool = True
+    compressionThreshold: int = 1024  # messages smaller than this aren't compressed
     allowedFileExtensions: frozenset[str] = frozenset(
         ["css", "html", "ico", "js", "json", "svg", "woff2"]
     )
 
     def setup(self):
         self.startupTime = datetime.now(timezone.utc).replace(microsecond=0)
+        self.remoteCallStatistics = RemoteCallStatistics()
         self.httpApp = web.Application()
         self.viewEntryPoints = {
             ep.name: ep.value for ep in entry_points(group="fontra.views")
@@ -47,6 +54,7 @@ class FontraServer:
         routes.append(web.get("/websocket/{path:.*}", self.websocketHandler))
         routes.append(web.get("/projectlist", self.projectListHandler))
         routes.append(web.get("/serverinfo", self.serverInfoHandler))
+        routes.append(web.get("/websocketstats", self.websocketStatsHandler))
         for ep in entry_points(group="fontra.webcontent"):
             routes.append(
                 web.get(
@@ -125,7 +133,9 @@ class FontraServer:
         cookies = {k: v.value for k, v in cookies.items()}
         token = cookies.get("fontra-authorization-token")
 
-        websocket = web.WebSocketResponse(heartbeat=55, max_msg_size=0x2000000)
+        websocket = web.WebSocketResponse(
+            heartbeat=55, max_msg_size=0x2000000, compress=self.websocketCompression
+        )
         await websocket.prepare(request)
         self._activeWebsockets.add(websocket)
         try:
@@ -138,7 +148,14 @@ class FontraServer:
             traceback.print_exc()
             await websocket.close()
         else:
-            connection = RemoteObjectConnection(websocket, path, subject, True)
+            connection = RemoteObjectConnection(
+                websocket,
+                path,
+                subject,
+                True,
+                compressionThreshold=self.compressionThreshold,
+                callStatistics=self.remoteCallStatistics,
+            )
             with subject.useConnection(connection):
                 await connection.handleConnection()
         finally:
@@ -187,6 +204,15 @@ class FontraServer:
             text=json.dumps(serverInfo), content_type="application/json"
         )
 
+    async def websocketStatsHandler(self, request):
+        authToken = await self.projectManager.authorize(request)
+        if not authToken:
+            raise web.HTTPUnauthorized()
+        return web.Response(
+            text=json.dumps(self.remoteCallStatistics.getSummary()),
+            content_type="application/json",
+        )
+
     async def staticContentHandler(self, packageName, request):
         ifModSince = request.if_modified_since
         if ifModSince is not None and ifModSince >= self.startupTime:
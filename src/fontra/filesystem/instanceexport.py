@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import plistlib
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from fontTools.ufoLib.filenames import userNameToFileName
+from fontTools.ufoLib.glifLib import writeGlyphToString
+
+from ..backends.designspace import buildUFOLayerGlyph, infoAttrsToCopy
+from ..core.instancer import GlyphInstancer
+
+logger = logging.getLogger(__name__)
+
+
+async def getExportLocation(fontHandler, query):
+    """Return a (location, styleName) tuple for the export request parameters
+    in `query`: either "instance", the name or style name of an instance in
+    the designspace, or "location", a JSON object mapping axis names to user
+    space values, optionally with "styleName". Raise ValueError if the
+    parameters are invalid.
+    """
+    instanceName = query.get("instance")
+    if instanceName is not None:
+        dsDoc = getattr(fontHandler.backend, "dsDoc", None)
+        for instance in dsDoc.instances if dsDoc is not None else ():
+            if instanceName in (instance.name, instance.styleName):
+                location = instance.getFullUserLocation(dsDoc)
+                return location, instance.styleName or instanceName
+        raise ValueError(f"instance not found: {instanceName!r}")
+    try:
+        location = json.loads(query.get("location", "{}"))
+    except ValueError:
+        raise ValueError("location must be a JSON object")
+    if not isinstance(location, dict) or not all(
+        isinstance(value, (int, float)) for value in location.values()
+    ):
+        raise ValueError("location must map axis names to numbers")
+    axisNames = {axis.name for axis in await fontHandler.getData("axes")}
+    unknownAxisNames = sorted(location.keys() - axisNames)
+    if unknownAxisNames:
+        raise ValueError(f"unknown axes: {', '.join(unknownAxisNames)}")
+    styleName = query.get("styleName") or "-".join(
+        f"{axisName}{value:g}" for axisName, value in sorted(location.items())
+    )
+    return location, styleName or "Default"
+
+
+async def exportInstanceAsUFOZip(
+    fontHandler,
+    projectPath,
+    openBackend,
+    location,
+    styleName,
+    write,
+    maxWorkers=None,
+    chunkSize=200,
+):
+    """Instantiate all glyphs of the font at `location`, and write a zipped
+    UFO to `write`, an async function that is called with successive pieces
+    of the zip file.
+
+    The glyphs are instantiated in a process pool, in chunks of `chunkSize`
+    glyphs. Each worker process opens the font at `projectPath` with
+    `openBackend`, which must be a picklable function. At most two chunks per
+    worker are in flight, and each chunk is written as soon as it's done, so
+    the memory use does not depend on the size of the font. Nothing is
+    written before the first chunk is done, so errors opening or
+    instantiating the font are raised before `write` is first called.
+    """
+    # The workers read the font files, so write any pending edits first
+    await fontHandler.finishWriting()
+    glyphMap = await fontHandler.getData("glyphMap")
+    glyphNames = list(glyphMap)
+    chunks = [
+        glyphNames[i : i + chunkSize] for i in range(0, len(glyphNames), chunkSize)
+    ]
+    ufoName = f"{projectPath.stem}-{styleName}.ufo"
+    stream = _ZipStream()
+    zipFile = zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def writeFile(fileName, data):
+        zipFile.writestr(f"{ufoName}/{fileName}", data)
+
+    writeFile(
+        "metainfo.plist", _dumpPlist({"creator": "xyz.fontra", "formatVersion": 3})
+    )
+    writeFile("fontinfo.plist", _dumpPlist(await _getFontInfo(fontHandler, styleName)))
+    writeFile("lib.plist", _dumpPlist({"public.glyphOrder": glyphNames}))
+    writeFile("layercontents.plist", _dumpPlist([["public.default", "glyphs"]]))
+
+    contents = {}
+    existingFileNames = set()
+    loop = asyncio.get_running_loop()
+    numWorkers = min(maxWorkers or os.cpu_count() or 1, len(chunks))
+    # Forking a process that runs an event loop and threads isn't safe
+    with ProcessPoolExecutor(
+        max_workers=max(numWorkers, 1),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initWorker,
+        initargs=(openBackend, projectPath),
+    ) as executor:
+        pendingChunks = deque()
+        chunkIterator = iter(chunks)
+        while True:
+            while len(pendingChunks) < 2 * numWorkers:
+                chunk = next(chunkIterator, None)
+                if chunk is None:
+                    break
+                pendingChunks.append(
+                    loop.run_in_executor(executor, _buildInstanceGlifs, chunk, location)
+                )
+            if not pendingChunks:
+                break
+            # Write the chunks in glyph order
+            for glyphName, glifData in await pendingChunks.popleft():
+                fileName = userNameToFileName(
+                    glyphName, existingFileNames, suffix=".glif"
+                )
+                existingFileNames.add(fileName.lower())
+                contents[glyphName] = fileName
+                writeFile(f"glyphs/{fileName}", glifData)
+            await write(stream.popData())
+
+    writeFile("glyphs/contents.plist", _dumpPlist(contents))
+    zipFile.close()
+    await write(stream.popData())
+    logger.info(f"exported {len(contents)} glyphs to {ufoName}")
+
+
+async def _getFontInfo(fontHandler, styleName):
+    fontInfo = {}
+    # Copy the font info of the default source, if the backend has it
+    defaultFontInfo = getattr(fontHandler.backend, "defaultFontInfo", None)
+    for infoAttr in infoAttrsToCopy:
+        value = getattr(defaultFontInfo, infoAttr, None)
+        if value is not None:
+            fontInfo[infoAttr] = value
+    fontInfo["unitsPerEm"] = await fontHandler.getData("unitsPerEm")
+    fontInfo["styleName"] = styleName
+    return fontInfo
+
+
+def _dumpPlist(value):
+    return plistlib.dumps(value, sort_keys=False)
+
+
+class _ZipStream:
+    # A write-only file object for zipfile.ZipFile, which supports writing to
+    # unseekable streams. The written data is collected until popData().
+
+    def __init__(self):
+        self._data = []
+
+    def write(self, data):
+        self._data.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def popData(self):
+        data = b"".join(self._data)
+        self._data = []
+        return data
+
+
+_workerBackend = None
+
+
+def _initWorker(openBackend, projectPath):
+    global _workerBackend
+    _workerBackend = openBackend(projectPath)
+
+
+def _buildInstanceGlifs(glyphNames, location):
+    return asyncio.run(_buildInstanceGlifsAsync(_workerBackend, glyphNames, location))
+
+
+async def _buildInstanceGlifsAsync(backend, glyphNames, location):
+    globalAxes = await backend.getGlobalAxes()
+    glyphMap = await backend.getGlyphMap()
+    results = []
+    for glyphName in glyphNames:
+        glyph = await backend.getGlyph(glyphName)
+        if glyph is None:
+            continue
+        instance = GlyphInstancer(glyph, globalAxes).instantiate(location)
+        if instance is None:
+            continue
+        layerGlyph, drawPointsFunc = buildUFOLayerGlyph(
+            {}, glyphName, instance, glyphMap.get(glyphName, [])
+        )
+        glifData = writeGlyphToString(glyphName, layerGlyph, drawPointsFunc)
+        results.append((glyphName, glifData.encode("utf-8")))
+    return results
@@ -1,15 +1,27 @@
 import argparse
+import asyncio
+import inspect
 import logging
+import os
 import pathlib
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from importlib import resources
 from importlib.metadata import entry_points
 
 from aiohttp import web
 
+from ..core.cachedir import getCachePath
 from ..core.fonthandler import FontHandler
+from .instanceexport import exportInstanceAsUFOZip, getExportLocation
 
 logger = logging.getLogger(__name__)
 
+# With a journal, edits are safe before they are written to the font files, so
+# writes can be delayed more, to coalesce more edits into a single write
+JOURNALED_WRITE_DELAY = 2.0  # seconds
+
 
 fileExtensions = {
     f".{ep.name}" for ep in entry_points(group="fontra.filesystem.backends")
@@ -29,6 +41,48 @@ class FileSystemProjectManagerFactory:
         )
         parser.add_argument("--max-folder-depth", type=int, default=3)
         parser.add_argument("--read-only", action="store_true")
+        parser.add_argument(
+            "--backend-threads",
+            type=int,
+            default=None,
+            help="The maximum number of threads used for reading and writing font "
+            "data. Defaults to a number based on the number of CPU cores.",
+        )
+        parser.add_argument(
+            "--cache-size",
+            type=int,
+            default=100,
+            help="The approximate maximum amount of memory in megabytes used for "
+            "caching glyphs, per font. (default: 100)",
+        )
+        parser.add_argument(
+            "--history-size",
+            type=int,
+            default=20,
+            help="The approximate maximum amount of memory in megabytes used for "
+            "the undo history, per font. (default: 20)",
+        )
+        parser.add_argument(
+            "--history-log",
+            action="store_true",
+            help="Write undo history that exceeds the history size to a log file "
+            "in the cache folder, instead of discarding it.",
+        )
+        parser.add_argument(
+            "--journal",
+            action="store_true",
+            help="Append edits to a journal file in the cache folder, from which "
+            "unsaved edits are recovered after a crash. Font files are then "
+            "written less eagerly. Don't run multiple servers with this option "
+            "on the same fonts.",
+        )
+        parser.add_argument(
+            "--export-workers",
+            type=int,
+            default=None,
+            help="The maximum number of processes used for exporting static "
+            "instances. Defaults to the number of CPU cores.",
+        )
 
     @staticmethod
     def getProjectManager(arguments):
@@ -36,6 +90,12 @@ class FileSystemProjectManagerFactory:
             rootPath=arguments.path,
             maxFolderDepth=arguments.max_folder_depth,
             readOnly=arguments.read_only,
+            backendThreads=arguments.backend_threads,
+            cacheSize=arguments.cache_size * 1024 * 1024,
+            historySize=arguments.history_size * 1024 * 1024,
+            historyLog=arguments.history_log,
+            journal=arguments.journal,
+            exportWorkers=arguments.export_workers,
         )
 
 
@@ -49,7 +109,7 @@ def existingFolderOrFontFile(path):
     return path
 
 
-def getFileSystemBackend(path):
+def getFileSystemBackend(path, progressCallback=None):
     path = pathlib.Path(path)
     if not path.exists():
         raise FileNotFoundError(path)
@@ -59,29 +119,127 @@ def getFileSystemBackend(path):
     entryPoint = backendEntryPoints[fileType]
     backendClass = entryPoint.load()
 
-    backend = backendClass.fromPath(path)
+    if progressCallback is not None and _acceptsKeywordArgument(
+        backendClass.fromPath, "progressCallback"
+    ):
+        backend = backendClass.fromPath(path, progressCallback=progressCallback)
+    else:
+        # Third-party backends may not support progress reporting
+        backend = backendClass.fromPath(path)
     logger.info(f"done loading {path.name}")
     return backend
 
 
+def _acceptsKeywordArgument(func, argName):
+    try:
+        parameters = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+    parameter = parameters.get(argName)
+    if parameter is not None:
+        return parameter.kind in (
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            inspect.Parameter.KEYWORD_ONLY,
+        )
+    return any(
+        parameter.kind == inspect.Parameter.VAR_KEYWORD
+        for parameter in parameters.values()
+    )
+
+
 class FileSystemProjectManager:
-    def __init__(self, rootPath, maxFolderDepth=3, readOnly=False):
+    def __init__(
+        self,
+        rootPath,
+        maxFolderDepth=3,
+        readOnly=False,
+        backendThreads=None,
+        cacheSize=FontHandler.cacheSize,
+        historySize=FontHandler.historySize,
+        historyLog=False,
+        journal=False,
+        exportWorkers=None,
+    ):
         self.rootPath = rootPath
         self.singleFilePath = None
         self.maxFolderDepth = maxFolderDepth
         self.readOnly = readOnly
+        self.cacheSize = cacheSize
+        self.historySize = historySize
+        self.historyLog = historyLog
+        self.journal = journal
+        self.exportWorkers = exportWorkers
         if self.rootPath is not None and self.rootPath.suffix.lower() in fileExtensions:
             self.singleFilePath = self.rootPath
             self.rootPath = self.rootPath.parent
         self.fontHandlers = {}
+        self._fontHandlerLocks = defaultdict(asyncio.Lock)
+        self.backendExecutor = ThreadPoolExecutor(
+            max_workers=backendThreads, thread_name_prefix="fontra-backend"
+        )
 
     async def close(self):
         for fontHandler in self.fontHandlers.values():
             await fontHandler.close()
+        self.backendExecutor.shutdown()
 
     async def authorize(self, request):
         return "yes"  # arbitrary non-false string token
 
+    def setupWebRoutes(self, server):
+        server.httpApp.add_routes(
+            [web.get("/exportinstance/{path:.*}", self.exportInstanceHandler)]
+        )
+
+    async def exportInstanceHandler(self, request):
+        """Stream a static instance of a project as a zipped UFO. The instance
+        is given by the "instance" or "location" query parameters, see
+        getExportLocation().
+        """
+        authToken = await self.authorize(request)
+        if not authToken:
+            raise web.HTTPUnauthorized()
+        path = request.match_info["path"]
+        projectPath = self._getProjectPath(path)
+        if projectPath is None:
+            raise web.HTTPNotFound()
+        fontHandler = await self.getRemoteSubject("/" + path, authToken)
+        try:
+            location, styleName = await getExportLocation(fontHandler, request.query)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+        fileName = f"{projectPath.stem}-{styleName}.ufo.zip"
+        response = web.StreamResponse(
+            headers={"Content-Disposition": f'attachment; filename="{fileName}"'}
+        )
+        response.content_type = "application/zip"
+
+        async def write(data):
+            # Send the headers only once the export produced its first data,
+            # so that earlier errors result in an error status
+            if not response.prepared:
+                await response.prepare(request)
+            await response.write(data)
+
+        try:
+            await exportInstanceAsUFOZip(
+                fontHandler,
+                projectPath,
+                getFileSystemBackend,
+                location,
+                styleName,
+                write,
+                maxWorkers=self.exportWorkers,
+            )
+        except Exception:
+            if response.prepared and request.transport is not None:
+                # Too late for an error status: abort the connection, so the
+                # client doesn't take the truncated zip file for a complete one
+                request.transport.close()
+            raise
+        await response.write_eof()
+        return response
+
     async def projectPageHandler(self, request, filterContent=None):
         html = resources.read_text("fontra.filesystem", "landing.html")
         if filterContent is not None:
@@ -94,17 +252,49 @@ class FileSystemProjectManager:
     async def getRemoteSubject(self, path, token):
         assert path[0] == "/"
         path = path[1:]
-        fontHandler = self.fontHandlers.get(path)
-        if fontHandler is None:
-            projectPath = self._getProjectPath(path)
-            if projectPath is None:
-                raise FileNotFoundError(projectPath)
-            backend = getFileSystemBackend(projectPath)
-            fontHandler = FontHandler(backend, readOnly=self.readOnly)
-            await fontHandler.startTasks()
-            self.fontHandlers[path] = fontHandler
+        # Opening a large project can take a while: make sure concurrent
+        # requests for the same project wait for the first one to finish
+        async with self._fontHandlerLocks[path]:
+            fontHandler = self.fontHandlers.get(path)
+            if fontHandler is None:
+                projectPath = self._getProjectPath(path)
+                if projectPath is None:
+                    raise FileNotFoundError(projectPath)
+                # Load the backend in a thread, so we don't block the event loop
+                backend = await asyncio.to_thread(
+                    getFileSystemBackend,
+                    projectPath,
+                    progressCallback=makeLoadingProgressLogger(projectPath.name),
+                )
+                fontHandler = FontHandler(
+                    backend,
+                    readOnly=self.readOnly,
+                    backendExecutor=self.backendExecutor,
+                    cacheSize=self.cacheSize,
+                    historySize=self.historySize,
+                    historyLogPath=self._getHistoryLogPath(projectPath),
+                    **self._getJournalOptions(projectPath),
+                )
+                await fontHandler.startTasks()
+                self.fontHandlers[path] = fontHandler
         return fontHandler
 
+    def _getHistoryLogPath(self, projectPath):
+        if not self.historyLog:
+            return None
+        # Include the process ID, so multiple servers don't share a log
+        logPath = getCachePath("history", projectPath, f"-{os.getpid()}.jsonl")
+        logPath.parent.mkdir(parents=True, exist_ok=True)
+        return logPath
+
+    def _getJournalOptions(self, projectPath):
+        if not self.journal:
+            return {}
+        return dict(
+            journalPath=getCachePath("journal", projectPath, ".jsonl"),
+            writeDelay=JOURNALED_WRITE_DELAY,
+        )
+
     def _getProjectPath(self, path):
         if self.rootPath is None:
             projectPath = pathlib.Path(path)
@@ -135,6 +325,20 @@ class FileSystemProjectManager:
         return projectPaths
 
 
+def makeLoadingProgressLogger(projectName, minInterval=1.0):
+    lastReportTime = time.monotonic()
+
+    def progressCallback(numScanned, numTotal):
+        nonlocal lastReportTime
+        now = time.monotonic()
+        if now - lastReportTime < minInterval and numScanned != numTotal:
+            return
+        lastReportTime = now
+        logger.info(f"loading {projectName}: scanned {numScanned}/{numTotal} glyphs")
+
+    return progressCallback
+
+
 def _iterFolder(folderPath, extensions, maxDepth=3):
     if maxDepth is not None and maxDepth <= 0:
         return
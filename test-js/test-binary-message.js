@@ -0,0 +1,41 @@
+import chai from "chai";
+const expect = chai.expect;
+import fs from "fs";
+
+import { decodeBinaryMessage } from "../src/fontra/client/core/binary-message.js";
+
+import { fileURLToPath } from "url";
+import { dirname, join } from "path";
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+function getTestData(fileName) {
+  const path = join(dirname(__dirname), "test-common", fileName);
+  return JSON.parse(fs.readFileSync(path, "utf8"));
+}
+
+function base64ToArrayBuffer(encoded) {
+  const data = Buffer.from(encoded, "base64");
+  return data.buffer.slice(data.byteOffset, data.byteOffset + data.byteLength);
+}
+
+function typedArraysToArrays(value) {
+  return JSON.parse(
+    JSON.stringify(value, (key, item) =>
+      ArrayBuffer.isView(item) ? Array.from(item) : item
+    )
+  );
+}
+
+describe("decodeBinaryMessage Tests", () => {
+  const testData = getTestData("binary-message-test-data.json");
+  for (const testCase of testData) {
+    it(testCase.testName, () => {
+      const message = decodeBinaryMessage(base64ToArrayBuffer(testCase.encoded));
+      expect(typedArraysToArrays(message)).to.deep.equal(testCase.message);
+      const path = message["return-value"].path;
+      expect(ArrayBuffer.isView(path.coordinates)).to.equal(true);
+      expect(ArrayBuffer.isView(path.pointTypes)).to.equal(true);
+    });
+  }
+});
@@ -0,0 +1,9 @@
+import pytest
+
+from fontra.core.cachedir import CACHE_DIR_ENV_VAR
+
+
+@pytest.fixture(autouse=True)
+def isolatedCacheDir(tmp_path, monkeypatch):
+    # Make sure tests never read or write the user's actual cache folder
+    monkeypatch.setenv(CACHE_DIR_ENV_VAR, str(tmp_path / "fontra-cache"))
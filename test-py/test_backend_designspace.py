@@ -1,10 +1,12 @@
 import pathlib
+import plistlib
 import shutil
 
 import pytest
 from fontTools.designspaceLib import DesignSpaceDocument
 
 from fontra.backends.designspace import DesignspaceBackend, UFOBackend
+from fontra.backends.ufo_utils import scanGLIFFiles
 from fontra.core.classes import Layer, Source, StaticGlyph
 
 dataDir = pathlib.Path(__file__).resolve().parent / "data"
@@ -128,3 +130,102 @@ def unpackSources(sources):
         {k: getattr(s, k) for k in ["location", "styleName", "filename", "layerName"]}
         for s in sources
     ]
+
+
+async def test_glyphMapIndex(writableTestFont):
+    glyphMap = await writableTestFont.getGlyphMap()
+    glyphMapIndex = writableTestFont.glyphMapIndex
+    assert glyphMapIndex.path.exists()
+    assert not glyphMapIndex.dirty
+    assert len(glyphMapIndex.entries) == len(glyphMap)
+
+    reopenedFont = DesignspaceBackend(writableTestFont.dsDoc)
+    assert glyphMap == await reopenedFont.getGlyphMap()
+    # A valid index means no .glif file needed to be parsed
+    assert not reopenedFont.glyphMapIndex.dirty
+    assert glyphMapIndex.entries == reopenedFont.glyphMapIndex.entries
+
+
+async def test_glyphMapIndexStaleEntry(writableTestFont):
+    glyphSet = writableTestFont.defaultUFOLayer.glyphSet
+    glifPath = pathlib.Path(glyphSet.fs.getsyspath(glyphSet.contents["A"]))
+    glifData = glifPath.read_text()
+    glifPath.write_text(glifData.replace('<unicode hex="0061"/>', ""))
+
+    reopenedFont = DesignspaceBackend(writableTestFont.dsDoc)
+    glyphMap = await reopenedFont.getGlyphMap()
+    assert glyphMap["A"] == [0x41]
+
+
+async def test_glyphMapIndexPutGlyph(writableTestFont):
+    glyph = await writableTestFont.getGlyph("A")
+    await writableTestFont.putGlyph("A", glyph, [0x41])
+    fileName = writableTestFont.defaultUFOLayer.glyphSet.contents["A"]
+    assert writableTestFont.glyphMapIndex.entries[fileName][2:] == ["A", [0x41]]
+    writableTestFont.close()
+
+    reopenedFont = DesignspaceBackend(writableTestFont.dsDoc)
+    glyphMap = await reopenedFont.getGlyphMap()
+    assert glyphMap["A"] == [0x41]
+
+
+def readDefaultContents(backend):
+    contentsPath = (
+        pathlib.Path(backend.defaultUFOLayer.path) / "glyphs" / "contents.plist"
+    )
+    with open(contentsPath, "rb") as f:
+        return plistlib.load(f)
+
+
+async def test_putGlyphsPartialFailure(writableTestFont):
+    glyph = await writableTestFont.getGlyph("A")
+    with pytest.raises(AttributeError):
+        await writableTestFont.putGlyphs(
+            [("newGlyph", glyph, []), ("brokenGlyph", None, [])]
+        )
+    # The glyph that was written before the failure is in contents.plist
+    assert "newGlyph" in readDefaultContents(writableTestFont)
+
+
+async def test_deleteGlyphsPartialFailure(writableTestFont):
+    with pytest.raises(KeyError):
+        await writableTestFont.deleteGlyphs(["A", "nonexistent"])
+    # The glyph that was deleted before the failure is gone from contents.plist
+    assert "A" not in readDefaultContents(writableTestFont)
+
+
+def test_scanGLIFFiles(writableTestFont):
+    glyphSet = writableTestFont.defaultUFOLayer.glyphSet
+    glyphSetPath = glyphSet.fs.getsyspath("/")
+    fileNames = sorted(glyphSet.contents.values())
+    progress = []
+    results = scanGLIFFiles(
+        glyphSetPath,
+        fileNames,
+        lambda numScanned, numTotal: progress.append((numScanned, numTotal)),
+        chunkSize=10,
+    )
+    assert sorted(results) == fileNames
+    assert results["A_.glif"][:2] == ("A", [0x41, 0x61])
+    assert progress[-1] == (len(fileNames), len(fileNames))
+    assert len(progress) == (len(fileNames) + 9) // 10
+
+
+async def test_getComponentNames(writableTestFont):
+    componentNames = await writableTestFont.getComponentNames()
+    assert sorted(componentNames) == sorted(writableTestFont.glyphMap)
+    for glyphName, names in componentNames.items():
+        glyph = await writableTestFont.getGlyph(glyphName)
+        assert names == sorted(
+            {
+                component.name
+                for layer in glyph.layers.values()
+                for component in layer.glyph.components
+            }
+        )
+    assert componentNames["Adieresis"] == ["A", "dieresis"]
+    # A variable component
+    assert componentNames["varcotest1"] == ["A", "varcotest2"]
+    assert await writableTestFont.getComponentNames(["colon", "nonexistent"]) == {
+        "colon": ["period"]
+    }
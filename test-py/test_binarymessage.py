@@ -0,0 +1,63 @@
+import base64
+import json
+import pathlib
+
+import pytest
+
+from fontra.core.binarymessage import (
+    decodeBinaryMessage,
+    encodeBinaryDict,
+    encodeBinaryMessage,
+    encodeBinaryMessageWithValue,
+    encodeBinaryValue,
+)
+from fontra.core.classes import StaticGlyph, from_dict
+from fontra.core.packedpath import PackedPath
+
+testDataPath = (
+    pathlib.Path(__file__).parent.parent
+    / "test-common"
+    / "binary-message-test-data.json"
+)
+
+binaryMessageTestData = [
+    (testCase["testName"], testCase["message"], testCase["encoded"])
+    for testCase in json.loads(testDataPath.read_text(encoding="utf-8"))
+]
+
+
+@pytest.mark.parametrize("testName, message, encoded", binaryMessageTestData)
+def test_encodeBinaryMessage(testName, message, encoded):
+    glyph = from_dict(StaticGlyph, message["return-value"])
+    data = encodeBinaryMessage({**message, "return-value": glyph})
+    assert len(data) % 8 == 0
+    assert base64.b64encode(data).decode("ascii") == encoded
+
+
+@pytest.mark.parametrize("testName, message, encoded", binaryMessageTestData)
+def test_decodeBinaryMessage(testName, message, encoded):
+    assert decodeBinaryMessage(base64.b64decode(encoded)) == message
+
+
+def test_binaryMessageRoundTrip():
+    message = {
+        "server-call-id": 3,
+        "method-name": "externalChange",
+        "arguments": [{"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", 500]}],
+    }
+    assert decodeBinaryMessage(encodeBinaryMessage(message)) == message
+
+
+def test_encodeBinaryDict():
+    values = {
+        "a": PackedPath(coordinates=[0, 0.5, 100, 200], pointTypes=[0, 0]),
+        "b": None,
+        "c": [PackedPath(coordinates=[1, 2], pointTypes=[0])],
+    }
+    encodedDict = encodeBinaryDict(
+        {key: encodeBinaryValue(value) for key, value in values.items()}
+    )
+    assert encodedDict == encodeBinaryValue(values)
+    message = {"client-call-id": 1}
+    data = encodeBinaryMessageWithValue(message, "return-value", encodedDict)
+    assert data == encodeBinaryMessage({**message, "return-value": values})
@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from fontra.core import cachedir
+from fontra.core.cachedir import writeFileAtomically
+
+
+def test_writeFileAtomically(tmp_path):
+    path = tmp_path / "sub" / "data.json"
+    writeFileAtomically(path, b"old")
+    assert path.read_bytes() == b"old"
+    writeFileAtomically(path, b"new")
+    assert path.read_bytes() == b"new"
+    assert sorted(p.name for p in path.parent.iterdir()) == ["data.json"]
+
+
+def test_writeFileAtomicallyConcurrent(tmp_path):
+    path = tmp_path / "data.json"
+    payloads = [bytes([i]) * 100_000 for i in range(8)]
+    threads = [
+        threading.Thread(target=writeFileAtomically, args=(path, payload))
+        for payload in payloads
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # One of the writes wins, in full
+    assert path.read_bytes() in payloads
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.json"]
+
+
+def test_writeFileAtomicallyError(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    writeFileAtomically(path, b"old")
+
+    def failingReplace(src, dst):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(cachedir.os, "replace", failingReplace)
+    with pytest.raises(OSError):
+        writeFileAtomically(path, b"new")
+    assert path.read_bytes() == b"old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.json"]
@@ -5,9 +5,14 @@ from copy import deepcopy
 import pytest
 
 from fontra.core.changes import (
+    SubscriptionIndex,
+    _applyChange,
     applyChange,
     collectChangePaths,
+    collectShiftingChangeTargets,
+    compactChanges,
     filterChangePattern,
+    filterChangeTargets,
     matchChangePattern,
     patternDifference,
     patternFromPath,
@@ -45,6 +50,28 @@ def test_applyChange(testName, inputDataName, change, expectedData):
     assert subject == expectedData
 
 
+@pytest.mark.parametrize(
+    "testName, inputDataName, change, expectedData", applyChangeTestData
+)
+def test_applyChange_interpreted(testName, inputDataName, change, expectedData):
+    # _applyChange() is the reference implementation for compileChange()
+    subject = deepcopy(applyChangeTestInputData[inputDataName])
+    _applyChange(subject, change)
+    assert subject == expectedData
+
+
+@pytest.mark.parametrize(
+    "testName, inputDataName, change, expectedData", applyChangeTestData
+)
+def test_applyChange_copyOnWrite(testName, inputDataName, change, expectedData):
+    inputData = applyChangeTestInputData[inputDataName]
+    inputDataCopy = deepcopy(inputData)
+    subject = {"root": inputData}
+    applyChange(subject, {"p": ["root"], "c": [change]}, copyOnWrite=True)
+    assert subject["root"] == expectedData
+    assert inputData == inputDataCopy
+
+
 @pytest.mark.parametrize(
     "patternA, path, expectedPattern",
     [
@@ -175,6 +202,41 @@ def test_matchChangePattern(change, pattern, expectedResult):
     assert expectedResult == result
 
 
+@pytest.mark.parametrize(
+    "change, pattern, expectedResult",
+    getTestData("match-change-pattern-test-data.json"),
+)
+def test_subscriptionIndex_matchChange(change, pattern, expectedResult):
+    index = SubscriptionIndex()
+    index.setPattern("subscriber", pattern)
+    index.setPattern("other", {"other": {"path": None}})
+    result = "subscriber" in index.matchChange(change)
+    assert expectedResult == result
+
+
+def test_subscriptionIndex():
+    index = SubscriptionIndex()
+    index.setPattern("A", {"glyphs": {"a": None, "b": None}})
+    index.setPattern("B", {"glyphs": None, "lib": None})
+    index.setPattern("C", {"glyphs": {"b": None}})
+    glyphChange = {"p": ["glyphs"], "c": [{"p": ["b", "layers"], "f": "=", "a": []}]}
+    assert index.matchChange(glyphChange) == {"A", "B", "C"}
+    assert index.matchChange({"p": ["glyphs", "a"]}) == {"A", "B"}
+    assert index.matchChange({"p": ["lib"], "f": "=", "a": ["x", 1]}) == {"B"}
+    assert index.matchChange({"p": ["axes"], "f": "=", "a": [0, 1]}) == set()
+    assert index.matchPattern({"glyphs": {"a": None}}) == {"A", "B"}
+    assert index.matchPattern({"glyphs": None}) == {"A", "B", "C"}
+
+    index.setPattern("A", {"glyphs": {"a": None}})
+    assert index.matchChange({"p": ["glyphs", "b"]}) == {"B", "C"}
+    index.setPattern("B", {})
+    index.setPattern("C", {})
+    assert index.matchChange({"p": ["glyphs", "b"]}) == set()
+    assert index.matchPattern({"glyphs": None}) == {"A"}
+    index.setPattern("A", {})
+    assert not index._root.children
+
+
 @pytest.mark.parametrize(
     "change, pattern, inverse, expectedResult",
     getTestData("filter-change-pattern-test-data.json"),
@@ -194,6 +256,176 @@ def test_collectChangePaths(change, depth, expectedPaths):
     assert expectedPaths == paths
 
 
+@pytest.mark.parametrize(
+    "testName, inputDataName, change, expectedData", applyChangeTestData
+)
+def test_compactChanges_applyChange(testName, inputDataName, change, expectedData):
+    subject = deepcopy(applyChangeTestInputData[inputDataName])
+    compactedChange = compactChanges([change, change])
+    if compactedChange is not None:
+        applyChange(subject, compactedChange)
+    expectedSubject = deepcopy(applyChangeTestInputData[inputDataName])
+    applyChange(expectedSubject, change)
+    applyChange(expectedSubject, change)
+    assert subject == expectedSubject
+
+
+@pytest.mark.parametrize(
+    "changes, expectedChange",
+    [
+        ([], None),
+        ([{"p": ["a"]}], None),
+        (
+            [{"p": ["a"], "f": "=", "a": ["b", 1]}],
+            {"p": ["a"], "f": "=", "a": ["b", 1]},
+        ),
+        (
+            [
+                {"p": ["a"], "f": "=", "a": ["b", 1]},
+                {"p": ["a"], "f": "=", "a": ["b", 2]},
+            ],
+            {"p": ["a"], "f": "=", "a": ["b", 2]},
+        ),
+        (
+            [
+                {"p": ["a"], "f": "=", "a": ["b", 1]},
+                {"p": ["a"], "f": "d", "a": ["b"]},
+            ],
+            {"p": ["a"], "f": "d", "a": ["b"]},
+        ),
+        (
+            [
+                {"p": ["a"], "f": "=", "a": ["b", 1]},
+                {"p": ["a"], "f": "=", "a": ["c", 2]},
+                {"p": ["a"], "f": "=", "a": ["b", 3]},
+            ],
+            {
+                "p": ["a"],
+                "c": [{"f": "=", "a": ["c", 2]}, {"f": "=", "a": ["b", 3]}],
+            },
+        ),
+        (
+            [
+                {"p": ["a", "b", "c"], "f": "=", "a": ["d", 1]},
+                {"p": ["a", "b"], "f": "+", "a": [0, 1]},
+                {"p": ["a"], "f": "=", "a": ["b", []]},
+            ],
+            {"p": ["a"], "f": "=", "a": ["b", []]},
+        ),
+        (
+            [
+                {"p": ["path"], "f": "=xy", "a": [0, 1, 2]},
+                {"p": ["path"], "f": "=xy", "a": [1, 3, 4]},
+                {"p": ["path"], "f": "=xy", "a": [0, 5, 6]},
+                {"p": ["path"], "f": "=xy", "a": [1, 7, 8]},
+            ],
+            {
+                "p": ["path"],
+                "c": [{"f": "=xy", "a": [0, 5, 6]}, {"f": "=xy", "a": [1, 7, 8]}],
+            },
+        ),
+        (
+            # Inserting a point shifts point indices
+            [
+                {"p": ["path"], "f": "=xy", "a": [1, 1, 2]},
+                {"p": ["path"], "f": "insertPoint", "a": [0, 0, {"x": 0, "y": 0}]},
+                {"p": ["path"], "f": "=xy", "a": [1, 3, 4]},
+            ],
+            {
+                "p": ["path"],
+                "c": [
+                    {"f": "=xy", "a": [1, 1, 2]},
+                    {"f": "insertPoint", "a": [0, 0, {"x": 0, "y": 0}]},
+                    {"f": "=xy", "a": [1, 3, 4]},
+                ],
+            },
+        ),
+        (
+            # Inserting a list item shifts the indices of the items after it
+            [
+                {"p": ["items", 1], "f": "=", "a": ["name", "x"]},
+                {"p": ["items"], "f": "+", "a": [0, {}]},
+                {"p": ["items", 1], "f": "=", "a": ["name", "y"]},
+            ],
+            {
+                "p": ["items"],
+                "c": [
+                    {"p": [1], "f": "=", "a": ["name", "x"]},
+                    {"f": "+", "a": [0, {}]},
+                    {"p": [1], "f": "=", "a": ["name", "y"]},
+                ],
+            },
+        ),
+        (
+            [
+                {
+                    "p": ["glyphs", "A", "layers"],
+                    "c": [
+                        {"p": ["bold", "glyph"], "f": "=", "a": ["xAdvance", 500]},
+                        {"p": ["light", "glyph"], "f": "=", "a": ["xAdvance", 400]},
+                    ],
+                },
+                {
+                    "p": ["glyphs", "A", "layers", "bold", "glyph"],
+                    "f": "=",
+                    "a": ["xAdvance", 600],
+                },
+            ],
+            {
+                "p": ["glyphs", "A", "layers"],
+                "c": [
+                    {"p": ["light", "glyph"], "f": "=", "a": ["xAdvance", 400]},
+                    {"p": ["bold", "glyph"], "f": "=", "a": ["xAdvance", 600]},
+                ],
+            },
+        ),
+    ],
+)
+def test_compactChanges(changes, expectedChange):
+    assert compactChanges(changes) == expectedChange
+
+
+def test_filterChangeTargets():
+    change = {
+        "p": ["glyphs"],
+        "c": [
+            {"p": ["A", "path"], "f": "=xy", "a": [0, 10, 20]},
+            {"f": "d", "a": ["B"]},
+            {"p": ["C", "sources"], "f": "+", "a": [0, {}]},
+        ],
+    }
+    targets = []
+    assert filterChangeTargets(change, lambda target: targets.append(target)) is None
+    assert targets == [
+        ("glyphs", "A", "path", ("=xy", 0)),
+        ("glyphs", "B"),
+        ("glyphs", "C", "sources"),
+    ]
+    assert filterChangeTargets(change, lambda target: target[1] != "B") == {
+        "p": ["glyphs"],
+        "c": [
+            {"p": ["A", "path"], "f": "=xy", "a": [0, 10, 20]},
+            {"p": ["C", "sources"], "f": "+", "a": [0, {}]},
+        ],
+    }
+
+
+def test_collectShiftingChangeTargets():
+    change = {
+        "p": ["glyphs"],
+        "c": [
+            {"p": ["A", "path"], "f": "=xy", "a": [0, 10, 20]},
+            {"p": ["A", "path"], "f": "insertPoint", "a": [0, 1, {"x": 0, "y": 0}]},
+            {"f": "d", "a": ["B"]},
+            {"p": ["C", "sources"], "f": "+", "a": [0, {}]},
+        ],
+    }
+    assert collectShiftingChangeTargets(change) == [
+        ("glyphs", "A", "path"),
+        ("glyphs", "C", "sources"),
+    ]
+
+
 @pytest.mark.parametrize(
     "path, expectedPattern",
     [
@@ -1,7 +1,25 @@
+import contextlib
 import json
 import pathlib
+from dataclasses import asdict
 
-from fontra.core.classes import serializableClassSchema
+import dacite
+import pytest
+
+from fontra.backends.designspace import DesignspaceBackend
+from fontra.core.classes import (
+    Component,
+    Font,
+    Layer,
+    Source,
+    StaticGlyph,
+    VariableGlyph,
+    classSchema,
+    from_dict,
+    serializableClassSchema,
+    toDict,
+)
+from fontra.core.packedpath import PointType, jsonDefault
 
 repoRoot = pathlib.Path(__file__).resolve().parent.parent
 jsonPath = repoRoot / "src" / "fontra" / "client" / "core" / "classes.json"
@@ -14,3 +32,84 @@ def test_classes_json():
     assert (
         serializableClassSchema() == classesFromJSON
     ), "classes.json is stale, please run ./scripts/rebuild_classes_json.sh"
+
+
+mutatorSansPath = (
+    pathlib.Path(__file__).resolve().parent
+    / "data"
+    / "mutatorsans"
+    / "MutatorSans.designspace"
+)
+
+
+async def getTestGlyphs():
+    font = DesignspaceBackend.fromPath(mutatorSansPath)
+    with contextlib.closing(font):
+        glyphMap = await font.getGlyphMap()
+        return [await font.getGlyph(glyphName) for glyphName in sorted(glyphMap)]
+
+
+@pytest.mark.asyncio
+async def test_toDict_fromDict():
+    glyphs = await getTestGlyphs()
+    for glyph in glyphs:
+        glyphDict = toDict(glyph)
+        assert json.dumps(glyphDict, default=jsonDefault) == json.dumps(
+            asdict(glyph), default=jsonDefault
+        )
+        glyphDict = json.loads(json.dumps(glyphDict, default=jsonDefault))
+        glyphFromDict = from_dict(VariableGlyph, glyphDict)
+        assert glyphFromDict == glyph
+        assert glyphFromDict == dacite.from_dict(
+            VariableGlyph, glyphDict, config=dacite.Config(cast=[PointType])
+        )
+
+
+def test_fromDict_defaults():
+    source = from_dict(Source, {"name": "a", "layerName": "b", "unknownKey": 1})
+    assert source == Source(name="a", layerName="b")
+    location = {"wght": 100}
+    component = from_dict(Component, {"name": "a", "location": location})
+    assert component == Component(name="a", location=location)
+    assert component.location is not location
+    layer = Layer(glyph=StaticGlyph())
+    assert from_dict(VariableGlyph, {"name": "a", "layers": {"x": layer}}).layers == {
+        "x": layer
+    }
+    with pytest.raises(TypeError):
+        from_dict(Source, {"name": "a"})
+
+
+@pytest.mark.parametrize(
+    "cls, data",
+    [
+        (Source, ["a", "b"]),
+        (Source, {"name": 1, "layerName": "b"}),
+        (Source, {"name": "a", "layerName": "b", "inactive": "yes"}),
+        (Source, {"name": "a", "layerName": "b", "location": []}),
+        (Component, {"name": "a", "transformation": 1}),
+        (StaticGlyph, {"xAdvance": "500"}),
+        (StaticGlyph, {"components": "abc"}),
+        (StaticGlyph, {"components": [1]}),
+        (VariableGlyph, {"name": "a", "layers": {"x": "layer"}}),
+    ],
+)
+def test_fromDict_wrongType(cls, data):
+    with pytest.raises(TypeError, match="wrong value type"):
+        from_dict(cls, data)
+
+
+def test_fromDict_acceptedTypes():
+    glyph = from_dict(StaticGlyph, {"xAdvance": 500, "yAdvance": None})
+    assert glyph.xAdvance == 500
+    assert glyph.yAdvance is None
+
+
+def test_slots():
+    # Font is not slot-based: it tracks attribute assignments, see fonthandler.py
+    for cls in classSchema:
+        assert ("__slots__" in vars(cls)) == (cls is not Font), cls
+    font = Font()
+    font._trackAssignedAttributeNames()
+    font.unitsPerEm = 2000
+    assert font._assignedAttributeNames == {"unitsPerEm"}
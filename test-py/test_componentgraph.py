@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from fontra.core.componentgraph import ComponentGraph
+
+
+def makeGraph(madeOf):
+    graph = ComponentGraph()
+    for glyphName, componentNames in madeOf.items():
+        graph.setComponents(glyphName, componentNames)
+    return graph
+
+
+def naiveClosure(edges, glyphName):
+    closure = set()
+    stack = [glyphName]
+    while stack:
+        for name in edges.get(stack.pop(), ()):
+            if name not in closure:
+                closure.add(name)
+                stack.append(name)
+    return closure
+
+
+def reverseEdges(edges):
+    reversedEdges = {}
+    for glyphName, componentNames in edges.items():
+        for componentName in componentNames:
+            reversedEdges.setdefault(componentName, set()).add(glyphName)
+    return reversedEdges
+
+
+testMadeOf = {
+    "A": [],
+    "acute": [],
+    "Aacute": ["A", "acute"],
+    "Aacute.alt": ["Aacute"],
+    "dot": [],
+    "dieresis": ["dot"],
+    "Adieresis": ["A", "dieresis"],
+}
+
+
+@pytest.mark.parametrize(
+    "glyphName, transitive, expectedUsedBy",
+    [
+        ("A", True, {"Aacute", "Aacute.alt", "Adieresis"}),
+        ("A", False, {"Aacute", "Adieresis"}),
+        ("dot", True, {"dieresis", "Adieresis"}),
+        ("Aacute.alt", True, set()),
+        ("nonexistent", True, set()),
+    ],
+)
+def test_getUsedBy(glyphName, transitive, expectedUsedBy):
+    graph = makeGraph(testMadeOf)
+    assert graph.getUsedBy(glyphName, transitive) == expectedUsedBy
+
+
+@pytest.mark.parametrize(
+    "glyphName, transitive, expectedMadeOf",
+    [
+        ("Aacute.alt", True, {"Aacute", "A", "acute"}),
+        ("Aacute.alt", False, {"Aacute"}),
+        ("Adieresis", True, {"A", "dieresis", "dot"}),
+        ("A", True, set()),
+        ("nonexistent", True, set()),
+    ],
+)
+def test_getMadeOf(glyphName, transitive, expectedMadeOf):
+    graph = makeGraph(testMadeOf)
+    assert graph.getMadeOf(glyphName, transitive) == expectedMadeOf
+
+
+def test_incrementalUpdates():
+    graph = makeGraph(testMadeOf)
+    assert graph.getUsedBy("dot") == {"dieresis", "Adieresis"}
+    assert graph.getMadeOf("Aacute.alt") == {"Aacute", "A", "acute"}
+    graph.setComponents("acute", ["dot"])
+    expectedUsedBy = {"dieresis", "Adieresis", "acute", "Aacute", "Aacute.alt"}
+    assert graph.getUsedBy("dot") == expectedUsedBy
+    assert graph.getMadeOf("Aacute.alt") == {"Aacute", "A", "acute", "dot"}
+    graph.removeGlyph("Aacute")
+    assert "Aacute" not in graph
+    assert graph.getUsedBy("dot") == {"dieresis", "Adieresis", "acute"}
+    assert graph.getMadeOf("Aacute.alt") == {"Aacute"}
+
+
+def test_cycles():
+    graph = makeGraph({"a": ["b"], "b": ["c"], "c": ["a"], "d": ["a"], "e": ["e"]})
+    assert graph.getMadeOf("a") == {"a", "b", "c"}
+    assert graph.getUsedBy("a") == {"a", "b", "c", "d"}
+    assert graph.getMadeOf("d") == {"a", "b", "c"}
+    assert graph.getCyclicGlyphs() == {"a", "b", "c", "e"}
+    assert not graph.isCyclic("d")
+    graph.setComponents("c", [])
+    assert graph.getCyclicGlyphs() == {"e"}
+    assert graph.getUsedBy("a") == {"d"}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_randomEdits(seed):
+    rng = random.Random(seed)
+    glyphNames = "abcdefgh"
+    graph = ComponentGraph()
+    madeOf = {}
+    for _ in range(50):
+        glyphName = rng.choice(glyphNames)
+        if rng.random() < 0.2:
+            graph.removeGlyph(glyphName)
+            madeOf.pop(glyphName, None)
+        else:
+            componentNames = set(rng.sample(glyphNames, rng.randint(0, 3)))
+            graph.setComponents(glyphName, componentNames)
+            madeOf[glyphName] = componentNames
+        usedBy = reverseEdges(madeOf)
+        for queryName in rng.sample(glyphNames, 4):
+            assert graph.getMadeOf(queryName) == naiveClosure(madeOf, queryName)
+            assert graph.getUsedBy(queryName) == naiveClosure(usedBy, queryName)
+        assert graph.getCyclicGlyphs() == {
+            glyphName
+            for glyphName in madeOf
+            if glyphName in naiveClosure(madeOf, glyphName)
+        }
@@ -4,8 +4,13 @@ from dataclasses import asdict
 from importlib.metadata import entry_points
 
 import pytest
+from fontTools.ttLib import TTFont
 
+from fontra.backends import opentype
+from fontra.backends.opentype import OTFBackend, serializeGlyph
 from fontra.core.classes import GlobalAxis, VariableGlyph, from_dict
+from fontra.core.fonthandler import FontHandler
+from fontra.core.lrucache import LRUCache
 
 dataDir = pathlib.Path(__file__).resolve().parent / "data"
 
@@ -839,3 +844,109 @@ async def test_cff2InterpolationCompatibility():
     firstPointTypes = layers[0].glyph.path.pointTypes
     for layer in layers:
         assert layer.glyph.path.pointTypes == firstPointTypes
+
+
+@pytest.mark.asyncio
+async def test_instantiateFromGvar():
+    # The direct gvar path must give the same result as the instanced glyph sets
+    font = getTestFont("ttf")
+    defaultLocation = {axis.name: 0 for axis in await font.getGlobalAxes()}
+    for glyphName in font.glyphMap:
+        locations = [
+            defaultLocation | loc for loc in font._getGlyphVariationLocations(glyphName)
+        ]
+        varGlyphs = font._instantiateFromGvar(glyphName, locations)
+        assert len(varGlyphs) == len(locations)
+        for location, varGlyph in zip(locations, varGlyphs):
+            expectedGlyph = serializeGlyph(
+                font.font.getGlyphSet(location=location, normalized=True), glyphName
+            )
+            assert varGlyph == expectedGlyph
+    assert not font.variationGlyphSets
+
+
+@pytest.mark.asyncio
+async def test_instantiateFromGvarFallback(monkeypatch):
+    expectedGlyph = await getTestFont("ttf").getGlyph("A")
+
+    def incompatibleSetCoordinates(glyph, coord, glyfTable):
+        raise TypeError("incompatible fontTools")
+
+    monkeypatch.setattr(opentype, "_setCoordinates", incompatibleSetCoordinates)
+    font = getTestFont("ttf")
+    assert font._canInstantiateFromGvar("A")
+    assert await font.getGlyph("A") == expectedGlyph
+    assert not font._canInstantiateFromGvar("A")
+
+    monkeypatch.setattr(opentype, "canInstantiateFromGvar", False)
+    font = getTestFont("ttf")
+    assert not font._canInstantiateFromGvar("A")
+    assert await font.getGlyph("A") == expectedGlyph
+
+
+@pytest.mark.asyncio
+async def test_variationGlyphSetCache():
+    font = getTestFont("otf")
+    font.variationGlyphSets = LRUCache(2)
+    glyph = await font.getGlyph("A")
+    assert len(glyph.layers) > 3
+    assert len(font.variationGlyphSets) == 2
+
+
+@pytest.mark.asyncio
+async def test_variationLocationIndex(tmp_path):
+    fontPath = tmp_path / "MutatorSans.ttf"
+    fontPath.write_bytes(testFontPaths["ttf"].read_bytes())
+    font = OTFBackend.fromPath(fontPath)
+    with contextlib.closing(font):
+        assert not await font.updateVariationLocationIndex(20)
+        assert len(font.variationLocationIndex.entries) == 20
+        assert await font.updateVariationLocationIndex()
+        entries = font.variationLocationIndex.entries
+        assert sorted(entries) == sorted(font.glyphMap)
+        assert entries["period"] == font._collectGlyphVariationLocations("period")
+        assert font.variationLocationIndex.path.exists()
+
+    font = OTFBackend.fromPath(fontPath)
+    with contextlib.closing(font):
+        # The persisted index is used
+        assert font.variationLocationIndex.entries == entries
+        glyph = await font.getGlyph("period")
+        assert len(glyph.sources) == len(entries["period"]) + 1
+
+    # Changing the font invalidates the index
+    ttFont = TTFont(fontPath)
+    ttFont["gvar"].variations["period"] = []
+    ttFont.save(fontPath)
+    font = OTFBackend.fromPath(fontPath)
+    with contextlib.closing(font):
+        assert not font.variationLocationIndex.entries
+
+
+@pytest.mark.asyncio
+async def test_hvarOnlyVariations(tmp_path):
+    # The advance of "period" still varies when its outline doesn't
+    fontPath = tmp_path / "MutatorSans.ttf"
+    ttFont = TTFont(testFontPaths["ttf"])
+    ttFont["gvar"].variations["period"] = []
+    ttFont.save(fontPath)
+    font = OTFBackend.fromPath(fontPath)
+    with contextlib.closing(font):
+        glyph = await font.getGlyph("period")
+        layers = list(glyph.layers.values())
+        assert len(layers) > 1
+        defaultGlyph = layers[0].glyph
+        assert len({layer.glyph.xAdvance for layer in layers}) > 1
+        for layer in layers:
+            assert layer.glyph.path == defaultGlyph.path
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_variationLocationIndex():
+    font = getTestFont("otf")
+    fontHandler = FontHandler(font, readOnly=True, variationIndexChunkSize=7)
+    await fontHandler.startTasks()
+    await fontHandler._variationIndexTask
+    assert sorted(font.variationLocationIndex.entries) == sorted(font.glyphMap)
+    assert not font.variationLocationIndex.dirty
+    await fontHandler.close()
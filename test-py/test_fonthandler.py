@@ -1,13 +1,19 @@
 import asyncio
+import json
 import logging
 import pathlib
 import shutil
+import threading
+import time
 from contextlib import asynccontextmanager
+from types import SimpleNamespace
 
 import pytest
 
 from fontra.backends.designspace import DesignspaceBackend
-from fontra.core.fonthandler import FontHandler
+from fontra.core.fonthandler import ExecutorBackend, FontHandler
+from fontra.core.journal import ChangeJournal
+from fontra.core.remote import PreEncodedDict, PreEncodedValue
 
 
 @asynccontextmanager
@@ -33,7 +39,10 @@ mutatorFiles = [
 
 @pytest.fixture(scope="session")
 def testFontPath(tmp_path_factory):
-    tmpDir = tmp_path_factory.mktemp("font")
+    return copyMutatorSans(tmp_path_factory.mktemp("font"))
+
+
+def copyMutatorSans(tmpDir):
     for fn in mutatorFiles:
         srcPath = mutatorSansDir / fn
         dstPath = tmpDir / fn
@@ -117,7 +126,7 @@ async def test_fontHandler_editGlyph(testFontHandler):
 
         glyph = await testFontHandler.getGlyph("A", connection=None)
         layerName, layer = firstLayerItem(glyph)
-        assert [20, 55] == layer.glyph.path.coordinates[:2]
+        assert [20, 55] == list(layer.glyph.path.coordinates[:2])
 
         # give the write queue the opportunity to complete
         await testFontHandler.finishWriting()
@@ -133,6 +142,102 @@ async def test_fontHandler_editGlyph(testFontHandler):
     await asyncio.sleep(0)
 
 
+@pytest.mark.asyncio
+async def test_fontHandler_undoRedo(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        layerName, layer = firstLayerItem(glyph)
+        originalCoordinates = list(layer.glyph.path.coordinates[:2])
+        path = ["glyphs", "A", "layers", layerName, "glyph", "path"]
+        change = {"p": path, "f": "=xy", "a": [0, 20, 155]}
+        rollbackChange = {"p": path, "f": "=xy", "a": [0, *originalCoordinates]}
+
+        assert await testFontHandler.undo("A", connection=None) is None
+        await testFontHandler.editFinal(
+            change, rollbackChange, "Test edit", False, connection=None
+        )
+        info = await testFontHandler.getUndoRedoInfo("A", connection=None)
+        assert info["label"] == "Test edit"
+        assert await testFontHandler.getUndoRedoInfo("B", connection=None) is None
+
+        info = await testFontHandler.undo("A", connection=None)
+        assert info["label"] == "Test edit"
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        assert originalCoordinates == list(
+            glyph.layers[layerName].glyph.path.coordinates[:2]
+        )
+        assert await testFontHandler.undo("A", connection=None) is None
+
+        await testFontHandler.redo("A", connection=None)
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        assert [20, 155] == list(glyph.layers[layerName].glyph.path.coordinates[:2])
+        assert await testFontHandler.redo("A", connection=None) is None
+
+        await testFontHandler.undo("A", connection=None)
+        await testFontHandler.finishWriting()
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        assert originalCoordinates == list(
+            glyph.layers[layerName].glyph.path.coordinates[:2]
+        )
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_undoRedoPerClient(testFontHandler):
+    connectionA = SimpleNamespace(clientUUID="client-a")
+    connectionB = SimpleNamespace(clientUUID="client-b")
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyph = await testFontHandler.getGlyph("A")
+        layerName, layer = firstLayerItem(glyph)
+        path = ["glyphs", "A", "layers", layerName, "glyph"]
+        xAdvance = layer.glyph.xAdvance
+        for connection, newXAdvance in [
+            (connectionA, xAdvance + 1),
+            (connectionB, xAdvance + 2),
+        ]:
+            currentXAdvance = (
+                (await testFontHandler.getGlyph("A")).layers[layerName].glyph.xAdvance
+            )
+            await testFontHandler.editFinal(
+                {"p": path, "f": "=", "a": ["xAdvance", newXAdvance]},
+                {"p": path, "f": "=", "a": ["xAdvance", currentXAdvance]},
+                f"Edit {connection.clientUUID}",
+                False,
+                connection=connection,
+            )
+
+        # Client A's undo reverts its own edit, not client B's later edit
+        info = await testFontHandler.getUndoRedoInfo("A", connection=connectionA)
+        assert info["label"] == "Edit client-a"
+        info = await testFontHandler.undo("A", connection=connectionA)
+        assert info["clientUUID"] == "client-a"
+        glyph = await testFontHandler.getGlyph("A")
+        assert glyph.layers[layerName].glyph.xAdvance == xAdvance
+        assert await testFontHandler.undo("A", connection=connectionA) is None
+
+        info = await testFontHandler.undo("A", connection=connectionB)
+        assert info["label"] == "Edit client-b"
+        glyph = await testFontHandler.getGlyph("A")
+        assert glyph.layers[layerName].glyph.xAdvance == xAdvance + 1
+        await testFontHandler.redo("A", connection=connectionB)
+        glyph = await testFontHandler.getGlyph("A")
+        assert glyph.layers[layerName].glyph.xAdvance == xAdvance + 2
+
+        # Restore the original state for the other tests
+        await testFontHandler.editFinal(
+            {"p": path, "f": "=", "a": ["xAdvance", xAdvance]},
+            {"p": path, "f": "=", "a": ["xAdvance", xAdvance + 2]},
+            "Restore",
+            False,
+            connection=connectionA,
+        )
+        await testFontHandler.finishWriting()
+
+
 @pytest.mark.asyncio
 async def test_fontHandler_editGlyph_delete_layer(testFontHandler):
     async with asyncClosing(testFontHandler):
@@ -286,5 +391,645 @@ async def test_fontHandler_new_glyph(testFontHandler):
         assert glifPath.exists()
 
 
+@pytest.mark.asyncio
+async def test_fontHandler_copyOnWrite(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyph = await testFontHandler.getGlyph("A")
+        layerName, layer = firstLayerItem(glyph)
+        pathChangePath = ["glyphs", "A", "layers", layerName, "glyph", "path"]
+        originalCoordinates = list(layer.glyph.path.coordinates)
+
+        change = {"p": pathChangePath, "f": "=xy", "a": [0, 20, 55]}
+        await testFontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+        # The glyph is replaced rather than modified in place
+        assert list(layer.glyph.path.coordinates) == originalCoordinates
+
+        ((_, (_, scheduledGlyph, _)), _) = testFontHandler._dataScheduledForWriting[
+            ("glyphs", "A")
+        ]
+        editedGlyph = await testFontHandler.getGlyph("A")
+        assert scheduledGlyph is editedGlyph
+        assert list(editedGlyph.layers[layerName].glyph.path.coordinates[:2]) == [
+            20,
+            55,
+        ]
+
+        change = {"p": pathChangePath, "f": "=xy", "a": [0, 30, 65]}
+        await testFontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+        # The previously scheduled glyph is left alone
+        assert list(scheduledGlyph.layers[layerName].glyph.path.coordinates[:2]) == [
+            20,
+            55,
+        ]
+        glyph = await testFontHandler.getGlyph("A")
+        assert list(glyph.layers[layerName].glyph.path.coordinates[:2]) == [30, 65]
+
+        await testFontHandler.finishWriting()
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_glyphMapInPlace(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyphMap = await testFontHandler.getData("glyphMap")
+        unicodesA = glyphMap["A"]
+        unicodesB = glyphMap["B"]
+
+        change = {"p": ["glyphMap", "A"], "f": "+", "a": [0, 0x1234]}
+        await testFontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+        # The glyphMap is not copied, only the changed entry is replaced
+        assert await testFontHandler.getData("glyphMap") is glyphMap
+        assert glyphMap["A"] == [0x1234] + unicodesA
+        assert glyphMap["A"] is not unicodesA
+        assert 0x1234 not in unicodesA
+        assert glyphMap["B"] is unicodesB
+
+        await testFontHandler.finishWriting()
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_batchedWrites(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        backendPutGlyphs = testFontHandler.backend.putGlyphs
+        batches = []
+
+        async def recordingPutGlyphs(glyphs):
+            batches.append([glyphName for glyphName, _, _ in glyphs])
+            return await backendPutGlyphs(glyphs)
+
+        testFontHandler.backend.putGlyphs = recordingPutGlyphs
+
+        for glyphName in ["A", "B", "A"]:
+            glyph = await testFontHandler.getGlyph(glyphName)
+            layerName, layer = firstLayerItem(glyph)
+            change = {
+                "p": ["glyphs", glyphName, "layers", layerName, "glyph", "path"],
+                "f": "=xy",
+                "a": [0, 20, 55],
+            }
+            await testFontHandler.editFinal(
+                change, {}, "Test edit", False, connection=None
+            )
+
+        await testFontHandler.finishWriting()
+        assert batches == [["B", "A"]]
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_debouncedWrites(testFontHandler):
+    testFontHandler.writeDelay = 0.2
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        backendPutGlyphs = testFontHandler.backend.putGlyphs
+        batches = []
+
+        async def recordingPutGlyphs(glyphs):
+            batches.append([glyphName for glyphName, _, _ in glyphs])
+            return await backendPutGlyphs(glyphs)
+
+        testFontHandler.backend.putGlyphs = recordingPutGlyphs
+        testFontHandler.backend.putGlyph = lambda *args: recordingPutGlyphs([args])
+
+        glyph = await testFontHandler.getGlyph("A")
+        layerName, layer = firstLayerItem(glyph)
+        for x in [30, 40]:
+            change = {
+                "p": ["glyphs", "A", "layers", layerName, "glyph", "path"],
+                "f": "=xy",
+                "a": [0, x, 55],
+            }
+            await testFontHandler.editFinal(
+                change, {}, "Test edit", False, connection=None
+            )
+            await asyncio.sleep(0.12)
+
+        # The second edit restarted the write delay for "A"
+        assert batches == []
+        await testFontHandler.finishWriting()
+        assert batches == [["A"]]
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_deleteGlyph(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyphName = "period"
+        ufoLayers = testFontHandler.backend.ufoLayers
+        glifPaths = [
+            pathlib.Path(
+                layer.glyphSet.fs.getsyspath(layer.glyphSet.contents[glyphName])
+            )
+            for layer in ufoLayers
+            if glyphName in layer.glyphSet
+        ]
+        assert len(glifPaths) > 1
+        assert all(glifPath.exists() for glifPath in glifPaths)
+
+        change = {"p": ["glyphs"], "f": "d", "a": [glyphName]}
+        await testFontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+        await testFontHandler.finishWriting()
+
+        assert not any(glifPath.exists() for glifPath in glifPaths)
+        assert glyphName not in await testFontHandler.backend.getGlyphMap()
+        assert not any(glyphName in layer.glyphSet for layer in ufoLayers)
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_closeFinishesWriting(tmp_path):
+    fontHandler = FontHandler(DesignspaceBackend.fromPath(copyMutatorSans(tmp_path)))
+    fontHandler.writeDelay = 0.2
+    await fontHandler.startTasks()
+    backend = fontHandler.backend
+    events = []
+    backendPutGlyphs = backend.putGlyphs
+    backendClose = backend.backend.close
+
+    async def recordingPutGlyphs(glyphs):
+        events.append("putGlyphs")
+        return await backendPutGlyphs(glyphs)
+
+    def recordingClose():
+        events.append("close")
+        backendClose()
+
+    backend.putGlyphs = recordingPutGlyphs
+    backend.putGlyph = lambda *args: recordingPutGlyphs([args])
+    backend.backend.close = recordingClose
+
+    glyph = await fontHandler.getGlyph("A")
+    layerName, layer = firstLayerItem(glyph)
+    change = {
+        "p": ["glyphs", "A", "layers", layerName, "glyph", "path"],
+        "f": "=xy",
+        "a": [0, 30, 55],
+    }
+    await fontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+    await fontHandler.close()
+    # The pending write reached the backend before it was closed, so the
+    # glyph map index it saved on close is up to date
+    assert events == ["putGlyphs", "close"]
+
+
+class BlockingTestBackend:
+    hasBlockingIO = True
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.threads = set()
+        self.numActiveReads = 0
+        self.maxActiveReads = 0
+        self.readsDuringWrite = 0
+
+    def close(self):
+        pass
+
+    async def getGlyph(self, glyphName):
+        with self.lock:
+            self.threads.add(threading.current_thread())
+            self.numActiveReads += 1
+            self.maxActiveReads = max(self.maxActiveReads, self.numActiveReads)
+        time.sleep(0.02)
+        with self.lock:
+            self.numActiveReads -= 1
+        return None
+
+    async def putGlyph(self, glyphName, glyph, unicodes):
+        with self.lock:
+            self.readsDuringWrite = max(self.readsDuringWrite, self.numActiveReads)
+        time.sleep(0.02)
+        with self.lock:
+            self.readsDuringWrite = max(self.readsDuringWrite, self.numActiveReads)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_executorBackend():
+    backend = BlockingTestBackend()
+    fontHandler = FontHandler(backend, maxConcurrentBackendReads=3)
+    assert isinstance(fontHandler.backend, ExecutorBackend)
+    assert fontHandler.backend.close == backend.close
+
+    glyphNames = [f"glyph{i}" for i in range(6)]
+    await asyncio.gather(
+        *(fontHandler.backend.getGlyph(glyphName) for glyphName in glyphNames),
+        fontHandler.backend.putGlyph("glyph0", None, []),
+        *(fontHandler.backend.getGlyph(glyphName) for glyphName in glyphNames),
+    )
+    assert threading.current_thread() not in backend.threads
+    assert 1 < backend.maxActiveReads <= 3
+    assert backend.readsDuringWrite == 0
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_closeWaitsForExecutor():
+    class SlowIndexBackend(BlockingTestBackend):
+        def __init__(self):
+            super().__init__()
+            self.indexing = False
+            self.closedWhileIndexing = None
+
+        def close(self):
+            self.closedWhileIndexing = self.indexing
+
+        async def updateVariationLocationIndex(self, maxNumGlyphs=None):
+            self.indexing = True
+            time.sleep(0.1)
+            self.indexing = False
+            return False
+
+    backend = SlowIndexBackend()
+    fontHandler = FontHandler(backend)
+    await fontHandler.startTasks()
+    await asyncio.sleep(0.02)
+    assert backend.indexing
+    await fontHandler.close()
+    assert backend.closedWhileIndexing is False
+
+
+@pytest.mark.asyncio
+async def test_executorBackend_suspendingMethod():
+    class SuspendingBackend:
+        async def getGlyph(self, glyphName):
+            await asyncio.sleep(0)
+
+    backend = ExecutorBackend(SuspendingBackend())
+    with pytest.raises(RuntimeError, match="suspended"):
+        await backend.getGlyph("A")
+
+
+@pytest.mark.asyncio
+async def test_executorBackend_externalChanges(tmp_path):
+    backend = ExecutorBackend(DesignspaceBackend.fromPath(copyMutatorSans(tmp_path)))
+    threads = []
+    processExternalChanges = backend.backend.processExternalChanges
+
+    async def recordingProcessExternalChanges(changes):
+        threads.append(threading.current_thread())
+        return await processExternalChanges(changes)
+
+    backend.backend.processExternalChanges = recordingProcessExternalChanges
+    watcher = backend.watchExternalChanges()
+    nextChange = asyncio.create_task(watcher.__anext__())
+    await asyncio.sleep(0.1)
+    glifPath = tmp_path / "MutatorSansLightCondensed.ufo" / "glyphs" / "A_.glif"
+    glifPath.write_text(glifPath.read_text().replace('x="20"', 'x="-100"'))
+    change, reloadPattern = await asyncio.wait_for(nextChange, 5)
+    await watcher.aclose()
+    assert change is None
+    assert reloadPattern == {"glyphs": {"A": None}}
+    assert threads and threading.current_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphs(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        backendGetGlyph = testFontHandler.backend.getGlyph
+        requestedGlyphNames = []
+
+        async def countingGetGlyph(glyphName):
+            requestedGlyphNames.append(glyphName)
+            return await backendGetGlyph(glyphName)
+
+        testFontHandler.backend.getGlyph = countingGetGlyph
+
+        glyphNames = ["A", "B", "C", "nonexistent"]
+        glyphs, glyphsAgain = await asyncio.gather(
+            testFontHandler.getGlyphs(glyphNames, connection=None),
+            testFontHandler.getGlyphs(glyphNames, connection=None),
+        )
+        assert list(glyphs) == glyphNames
+        assert glyphs["nonexistent"] is None
+        assert [glyph.name for glyph in list(glyphs.values())[:3]] == glyphNames[:3]
+        assert glyphs == glyphsAgain
+        # Concurrent requests for the same glyph must share a single load
+        assert sorted(requestedGlyphNames) == sorted(glyphNames)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphsError(testFontHandler, caplog):
+    async with asyncClosing(testFontHandler):
+        backendGetGlyph = testFontHandler.backend.getGlyph
+
+        async def failingGetGlyph(glyphName):
+            if glyphName == "B":
+                raise ValueError("broken glyph")
+            return await backendGetGlyph(glyphName)
+
+        testFontHandler.backend.getGlyph = failingGetGlyph
+
+        glyphNames = ["A", "B", "C"]
+        with caplog.at_level(logging.ERROR):
+            glyphs = await testFontHandler.getGlyphs(glyphNames, connection=None)
+        assert "broken glyph" in caplog.text
+        assert glyphs["A"].name == "A"
+        assert glyphs["B"] is None
+        assert glyphs["C"].name == "C"
+
+        encodedGlyphs = await testFontHandler.getGlyphs(glyphNames, connection=object())
+        encodedGlyphs = json.loads(encodedGlyphs.getJSON())
+        assert encodedGlyphs["A"]["name"] == "A"
+        assert encodedGlyphs["B"] == {"exception": "ValueError('broken glyph')"}
+        assert encodedGlyphs["C"]["name"] == "C"
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_encodedGlyphs(testFontHandler):
+    connection = object()  # getGlyph() only checks whether it's a remote call
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        encodedGlyph = await testFontHandler.getGlyph("B", connection=connection)
+        glyph = await testFontHandler.getGlyph("B")
+        assert encodedGlyph.value is glyph
+        assert await testFontHandler.getGlyph("B", connection=connection) is (
+            encodedGlyph
+        )
+
+        layerName, layer = firstLayerItem(glyph)
+        xAdvance = layer.glyph.xAdvance
+        path = ["glyphs", "B", "layers", layerName, "glyph"]
+        change = {"p": path, "f": "=", "a": ["xAdvance", xAdvance + 1]}
+        rollbackChange = {"p": path, "f": "=", "a": ["xAdvance", xAdvance]}
+        await testFontHandler.editFinal(
+            change, rollbackChange, "Test edit", False, connection=None
+        )
+        assert "B" not in testFontHandler.encodedGlyphs
+        newEncodedGlyph = await testFontHandler.getGlyph("B", connection=connection)
+        assert newEncodedGlyph is not encodedGlyph
+        assert newEncodedGlyph.value.layers[layerName].glyph.xAdvance == xAdvance + 1
+
+        await testFontHandler.undo("B", connection=None)
+        await testFontHandler.finishWriting()
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphsEncoded(testFontHandler):
+    connection = object()  # getGlyphs() only checks whether it's a remote call
+    async with asyncClosing(testFontHandler):
+        glyphNames = ["A", "B", "nonexistent"]
+        encodedGlyphs = await testFontHandler.getGlyphs(
+            glyphNames, connection=connection
+        )
+        assert isinstance(encodedGlyphs, PreEncodedDict)
+        assert list(encodedGlyphs.value) == glyphNames
+        # The glyphs are encoded through the cache, and encoded only once
+        assert encodedGlyphs.value["A"] is testFontHandler.encodedGlyphs["A"]
+        assert await testFontHandler.getGlyph("B", connection=connection) is (
+            encodedGlyphs.value["B"]
+        )
+        assert encodedGlyphs.value["nonexistent"] is None
+        glyphs = await testFontHandler.getGlyphs(glyphNames, connection=None)
+        assert json.loads(encodedGlyphs.getJSON()) == {
+            glyphName: None
+            if glyph is None
+            else json.loads(PreEncodedValue(glyph).getJSON())
+            for glyphName, glyph in glyphs.items()
+        }
+
+
+def readAdvanceWidth(fontPath, glifFileName):
+    ufoPath = fontPath.parent / "MutatorSansLightCondensed.ufo"
+    glifData = (ufoPath / "glyphs" / glifFileName).read_text()
+    return int(glifData.split('<advance width="')[1].split('"')[0])
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_journal(tmp_path):
+    fontPath = copyMutatorSans(tmp_path)
+    journalPath = tmp_path / "journal.jsonl"
+    fontHandler = FontHandler(
+        DesignspaceBackend.fromPath(fontPath), journalPath=journalPath
+    )
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        glyph = await fontHandler.getGlyph("E")
+        layerName, _ = firstLayerItem(glyph)
+        change = {
+            "p": ["glyphs", "E", "layers", layerName, "glyph"],
+            "f": "=",
+            "a": ["xAdvance", 400],
+        }
+        await fontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+        changes, _, _ = ChangeJournal(journalPath).read()
+        assert changes == [(1, change)]
+
+        await fontHandler.finishWriting()
+        assert readAdvanceWidth(fontPath, "E_.glif") == 400
+        # Everything was written, so the journal is empty
+        assert journalPath.read_bytes() == b""
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_replayJournal(tmp_path):
+    fontPath = copyMutatorSans(tmp_path)
+    assert readAdvanceWidth(fontPath, "E_.glif") == 380
+    assert readAdvanceWidth(fontPath, "F_.glif") == 380
+    layerName = "MutatorSansLightCondensed/foreground"
+    change = {
+        "p": ["glyphs"],
+        "c": [
+            {
+                "p": [glyphName, "layers", layerName, "glyph"],
+                "f": "=",
+                "a": ["xAdvance", 500],
+            }
+            for glyphName in "EF"
+        ],
+    }
+
+    # Simulate a crash: the edit of E has been written, the edit of F hasn't.
+    # (The glif file of E is left alone, to check that its edit is skipped.)
+    journalPath = tmp_path / "journal.jsonl"
+    journal = ChangeJournal(journalPath)
+    journal.appendChange(change)
+    journal.appendWritten(("glyphs", "E"), 1)
+    journal.close()
+    with open(journalPath, "ab") as f:
+        f.write(b'{"s":2,"c":{"p":')  # partially written line
+
+    fontHandler = FontHandler(
+        DesignspaceBackend.fromPath(fontPath), journalPath=journalPath
+    )
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        glyph = await fontHandler.getGlyph("F")
+        assert glyph.layers[layerName].glyph.xAdvance == 500
+        await fontHandler.finishWriting()
+        assert readAdvanceWidth(fontPath, "E_.glif") == 380
+        assert readAdvanceWidth(fontPath, "F_.glif") == 500
+        assert journalPath.read_bytes() == b""
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_replayJournalInsertion(tmp_path):
+    fontPath = copyMutatorSans(tmp_path)
+    glifPath = fontPath.parent / "MutatorSansLightCondensed.ufo" / "glyphs" / "E_.glif"
+    assert glifPath.read_text().count("<component") == 0
+    layerName = "MutatorSansLightCondensed/foreground"
+    change = {
+        "p": ["glyphs", "E", "layers", layerName, "glyph", "components"],
+        "f": "+",
+        "a": [0, {"name": "dot"}],
+    }
+
+    # Simulate a crash after the edit has been written, but before it has
+    # been marked as written
+    journalPath = tmp_path / "journal.jsonl"
+    fontHandler = FontHandler(
+        DesignspaceBackend.fromPath(fontPath), journalPath=journalPath
+    )
+    fontHandler.journal.appendWritten = lambda writeKey, seq: None
+    fontHandler.journal.truncate = lambda: None
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        await fontHandler.editFinal(change, {}, "Test edit", False, connection=None)
+        await fontHandler.finishWriting()
+    assert glifPath.read_text().count("<component") == 1
+
+    # The insertion must not be replayed onto the written data
+    fontHandler = FontHandler(
+        DesignspaceBackend.fromPath(fontPath), journalPath=journalPath
+    )
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        glyph = await fontHandler.getGlyph("E")
+        assert [c.name for c in glyph.layers[layerName].glyph.components] == ["dot"]
+        await fontHandler.finishWriting()
+        assert glifPath.read_text().count("<component") == 1
+        assert journalPath.read_bytes() == b""
+
+
 def firstLayerItem(glyph):
     return next(iter(glyph.layers.items()))
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_componentGraph(tmp_path):
+    fontHandler = FontHandler(DesignspaceBackend.fromPath(copyMutatorSans(tmp_path)))
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        requestedGlyphNames = []
+        backendGetGlyph = fontHandler.backend.getGlyph
+
+        async def countingGetGlyph(glyphName):
+            requestedGlyphNames.append(glyphName)
+            return await backendGetGlyph(glyphName)
+
+        fontHandler.backend.getGlyph = countingGetGlyph
+
+        assert await fontHandler.getGlyphsUsedBy("comma", connection=None) == [
+            "quotedblbase",
+            "quotedblleft",
+            "quotedblright",
+            "quotesinglbase",
+            "semicolon",
+        ]
+        assert await fontHandler.getGlyphsUsedBy("dot", connection=None) == [
+            "Adieresis",
+            "dieresis",
+        ]
+        assert await fontHandler.getGlyphsUsedBy("dot", False, connection=None) == [
+            "dieresis"
+        ]
+        assert await fontHandler.getGlyphsMadeOf("Adieresis", connection=None) == [
+            "A",
+            "dieresis",
+            "dot",
+        ]
+        assert await fontHandler.getCyclicGlyphs(connection=None) == []
+        # The graph is built without loading any glyphs
+        assert requestedGlyphNames == []
+
+        # Make dieresis use Adieresis, which uses dieresis
+        glyph = await fontHandler.getGlyph("dieresis")
+        layerName, layer = firstLayerItem(glyph)
+        assert layer.glyph.components[0].name == "dot"
+        componentPath = ["glyphs", "dieresis", "layers", layerName, "glyph"]
+        change = {
+            "p": componentPath + ["components", 0],
+            "f": "=",
+            "a": ["name", "Adieresis"],
+        }
+        rollbackChange = {
+            "p": componentPath + ["components", 0],
+            "f": "=",
+            "a": ["name", "dot"],
+        }
+        await fontHandler.editFinal(
+            change, rollbackChange, "Test edit", False, connection=None
+        )
+        assert await fontHandler.getCyclicGlyphs(connection=None) == [
+            "Adieresis",
+            "dieresis",
+        ]
+        assert sorted(fontHandler.iterGlyphUsedBy("dot")) == ["Adieresis", "dieresis"]
+
+        # Reloaded glyphs are scanned again
+        await fontHandler.finishWriting()
+        await fontHandler.reloadData({"glyphs": {"dieresis": None}})
+        assert "dieresis" not in fontHandler.componentGraph
+        assert await fontHandler.getGlyphsUsedBy("Adieresis", connection=None) == [
+            "Adieresis",
+            "dieresis",
+        ]
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphInstance(tmp_path):
+    fontHandler = FontHandler(DesignspaceBackend.fromPath(copyMutatorSans(tmp_path)))
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        location = {"weight": 500, "width": 500}
+        instance = await fontHandler.getGlyphInstance(
+            "period", location, connection=None
+        )
+        assert instance.xAdvance == pytest.approx(255)
+        # Instances are cached by normalized location
+        assert instance is await fontHandler.getGlyphInstance(
+            "period", {**location, "unknownAxis": 1}, connection=None
+        )
+        assert (
+            await fontHandler.getGlyphInstance("nonexistent", location, connection=None)
+            is None
+        )
+
+        glyph = await fontHandler.getGlyph("period")
+        for layerName, layer in glyph.layers.items():
+            change = {
+                "p": ["glyphs", "period", "layers", layerName, "glyph"],
+                "f": "=",
+                "a": ["xAdvance", layer.glyph.xAdvance + 100],
+            }
+            rollbackChange = {
+                "p": ["glyphs", "period", "layers", layerName, "glyph"],
+                "f": "=",
+                "a": ["xAdvance", layer.glyph.xAdvance],
+            }
+            await fontHandler.editFinal(
+                change, rollbackChange, "Test edit", False, connection=None
+            )
+        instance = await fontHandler.getGlyphInstance(
+            "period", location, connection=None
+        )
+        assert instance.xAdvance == pytest.approx(355)
+
+    # give the event loop a moment to clean up
+    await asyncio.sleep(0)
@@ -0,0 +1,187 @@
+import pytest
+
+from fontra.core.history import EditHistory, HistoryRecord, getHistoryKey
+
+
+def makeRecord(value, label="edit", clientUUID=None):
+    return HistoryRecord(
+        {"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", value]},
+        {"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", value - 1]},
+        label,
+        clientUUID=clientUUID,
+    )
+
+
+def advanceOfRecord(record):
+    return record.change["a"][1]
+
+
+@pytest.mark.parametrize(
+    "change, expectedKey",
+    [
+        ({"p": ["glyphs", "A", "layers"], "f": "d", "a": ["bold"]}, "A"),
+        (
+            {
+                "p": ["glyphs"],
+                "c": [
+                    {"p": ["A"], "f": "=", "a": ["xAdvance", 500]},
+                    {"p": ["A", "layers"], "f": "d", "a": ["bold"]},
+                ],
+            },
+            "A",
+        ),
+        (
+            {
+                "p": ["glyphs"],
+                "c": [
+                    {"p": ["A"], "f": "=", "a": ["xAdvance", 500]},
+                    {"p": ["B"], "f": "=", "a": ["xAdvance", 500]},
+                ],
+            },
+            None,
+        ),
+        (
+            {
+                "c": [
+                    {"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", 500]},
+                    {"p": ["glyphMap"], "f": "=", "a": ["A", [65]]},
+                ],
+            },
+            None,
+        ),
+        ({"p": ["glyphMap"], "f": "=", "a": ["A", [65]]}, None),
+    ],
+)
+def test_getHistoryKey(change, expectedKey):
+    assert getHistoryKey(change) == expectedKey
+
+
+def test_undoRedo():
+    history = EditHistory()
+    assert history.popRecord("A", False) is None
+    for value in [1, 2, 3]:
+        history.pushRecord("A", makeRecord(value))
+    assert history.getTopRecord("A", True) is None
+    assert advanceOfRecord(history.getTopRecord("A", False)) == 3
+
+    record = history.popRecord("A", False)
+    assert advanceOfRecord(record) == 3
+    record = history.popRecord("A", False)
+    assert advanceOfRecord(record) == 2
+    # Redo returns the reversed record: its rollback change is the redo change
+    record = history.popRecord("A", True)
+    assert record.rollbackChange["a"] == ["xAdvance", 2]
+
+    history.pushRecord("A", makeRecord(10))
+    assert history.popRecord("A", True) is None
+    assert advanceOfRecord(history.popRecord("A", False)) == 10
+    assert advanceOfRecord(history.popRecord("A", False)) == 2
+    assert advanceOfRecord(history.popRecord("A", False)) == 1
+    assert history.popRecord("A", False) is None
+
+    history.clear("A")
+    assert history.popRecord("A", True) is None
+    assert history.getStatistics()["numRecords"] == 0
+    assert history.totalSize == 0
+
+
+def test_clientStacks(tmp_path):
+    history = EditHistory(maxSize=3 * 1000, logPath=tmp_path / "history.jsonl")
+    for value, clientUUID in [(1, "a"), (2, "b"), (3, "a"), (4, "b"), (5, "b")]:
+        record = makeRecord(value, clientUUID=clientUUID)
+        record.size = 1000
+        history.pushRecord("A", record)
+    # Each client only undoes its own edits, also after spilling
+    assert history.getStatistics()["numSpilledRecords"] == 2
+    assert history.popRecord("A", False) is None
+    assert advanceOfRecord(history.popRecord("A", False, "a")) == 3
+    assert advanceOfRecord(history.popRecord("A", False, "a")) == 1
+    assert history.popRecord("A", False, "a") is None
+    assert advanceOfRecord(history.popRecord("A", True, "a").reversed()) == 1
+    assert advanceOfRecord(history.getTopRecord("A", False, "b")) == 5
+    assert history.getTopRecord("A", True, "b") is None
+    assert [advanceOfRecord(history.popRecord("A", False, "b")) for _ in range(3)] == [
+        5,
+        4,
+        2,
+    ]
+
+    # Clearing a key clears the stacks of all clients
+    history.clear("A")
+    assert history.getTopRecord("A", True, "a") is None
+    assert history.getTopRecord("A", True, "b") is None
+    assert history.getStatistics()["numRecords"] == 0
+    history.close()
+
+
+def test_eviction():
+    recordSize = 1000
+    history = EditHistory(maxSize=3 * recordSize)
+    for value in range(5):
+        record = makeRecord(value)
+        record.size = recordSize
+        history.pushRecord("A" if value % 2 else "B", record)
+    assert history.totalSize == 3 * recordSize
+    assert advanceOfRecord(history.popRecord("B", False)) == 4
+    assert advanceOfRecord(history.popRecord("B", False)) == 2
+    assert history.popRecord("B", False) is None
+    assert advanceOfRecord(history.popRecord("A", False)) == 3
+    assert history.popRecord("A", False) is None
+
+    # B is the least recently used key. Evicting the bottom of its stack, the
+    # top of its redo stack, invalidates its other redo records.
+    record = makeRecord(5)
+    record.size = recordSize
+    history.pushRecord("C", record)
+    assert history.popRecord("B", True) is None
+    assert history.popRecord("A", True).rollbackChange["a"] == ["xAdvance", 3]
+
+
+def test_spill(tmp_path):
+    logPath = tmp_path / "history.jsonl"
+    recordSize = 1000
+    history = EditHistory(maxSize=2 * recordSize, logPath=logPath)
+    for value in range(6):
+        record = makeRecord(value, f"edit {value}")
+        record.size = recordSize
+        history.pushRecord("A", record)
+    assert history.getStatistics()["numSpilledRecords"] == 4
+    assert logPath.exists()
+
+    for value in reversed(range(6)):
+        record = history.popRecord("A", False)
+        assert advanceOfRecord(record) == value
+        assert record.editLabel == f"edit {value}"
+    assert history.popRecord("A", False) is None
+
+    history.close()
+    assert not logPath.exists()
+
+
+def test_spillUndoRedoPush(tmp_path):
+    logPath = tmp_path / "history.jsonl"
+    recordSize = 1000
+    history = EditHistory(maxSize=3 * recordSize, logPath=logPath)
+
+    def pushRecord(key, value):
+        record = makeRecord(value)
+        record.size = recordSize
+        history.pushRecord(key, record)
+
+    for value in range(4):
+        pushRecord("A", value)
+    assert history.getStatistics()["numSpilledRecords"] == 1
+    for value in reversed(range(4)):
+        # The last undo restores the spilled record
+        assert advanceOfRecord(history.popRecord("A", False)) == value
+    assert history.getStatistics()["numSpilledRecords"] == 0
+    assert advanceOfRecord(history.popRecord("A", True).reversed()) == 0
+    pushRecord("B", 10)
+    pushRecord("A", 11)
+    pushRecord("B", 12)
+    assert history.totalSize <= 3 * recordSize
+    assert advanceOfRecord(history.popRecord("B", False)) == 12
+    assert advanceOfRecord(history.popRecord("A", False)) == 11
+    assert advanceOfRecord(history.popRecord("A", False)) == 0
+    assert history.popRecord("A", False) is None
+    history.close()
@@ -0,0 +1,176 @@
+import io
+import json
+import pathlib
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import ClientPayloadError, web
+from aiohttp.test_utils import TestClient, TestServer
+from fontTools.designspaceLib import InstanceDescriptor
+from fontTools.ufoLib import UFOReader
+
+from fontra.backends.designspace import DesignspaceBackend
+from fontra.core.fonthandler import FontHandler
+from fontra.core.instancer import GlyphInstancer
+from fontra.filesystem import projectmanager
+from fontra.filesystem.instanceexport import exportInstanceAsUFOZip, getExportLocation
+from fontra.filesystem.projectmanager import (
+    FileSystemProjectManager,
+    getFileSystemBackend,
+)
+
+mutatorSansDir = pathlib.Path(__file__).resolve().parent / "data" / "mutatorsans"
+testFontPath = mutatorSansDir / "MutatorSans.designspace"
+
+
+@pytest.fixture
+async def testFontHandler():
+    fontHandler = FontHandler(DesignspaceBackend.fromPath(testFontPath), readOnly=True)
+    await fontHandler.startTasks()
+    yield fontHandler
+    await fontHandler.close()
+
+
+def readZippedUFO(zipData, tmpPath):
+    with zipfile.ZipFile(io.BytesIO(zipData)) as zipFile:
+        (ufoName,) = {name.split("/")[0] for name in zipFile.namelist()}
+        zipFile.extractall(tmpPath)
+    return ufoName, UFOReader(tmpPath / ufoName, validate=True)
+
+
+async def test_exportInstanceAsUFOZip(testFontHandler, tmp_path):
+    location = {"weight": 500, "width": 300}
+    pieces = []
+
+    async def write(data):
+        pieces.append(data)
+
+    await exportInstanceAsUFOZip(
+        testFontHandler,
+        testFontPath,
+        getFileSystemBackend,
+        location,
+        "Test",
+        write,
+        maxWorkers=2,
+        chunkSize=10,
+    )
+    glyphMap = await testFontHandler.getData("glyphMap")
+    # The zip file is written as the chunks come in
+    assert len(pieces) > len(glyphMap) // 10
+
+    ufoName, reader = readZippedUFO(b"".join(pieces), tmp_path)
+    assert ufoName == "MutatorSans-Test.ufo"
+    info = SimpleNamespace()
+    reader.readInfo(info)
+    assert info.styleName == "Test"
+    assert info.familyName == "MutatorMathTest"
+    assert reader.readLib()["public.glyphOrder"] == list(glyphMap)
+    glyphSet = reader.getGlyphSet()
+    assert sorted(glyphSet.keys()) == sorted(glyphMap)
+
+    globalAxes = await testFontHandler.getData("axes")
+    for glyphName in ["A", "Adieresis", "varcotest1"]:
+        glyph = await testFontHandler.getGlyph(glyphName)
+        instance = GlyphInstancer(glyph, globalAxes).instantiate(location)
+        ufoGlyph = SimpleNamespace(lib={})
+        glyphSet.readGlyph(glyphName, ufoGlyph)
+        assert ufoGlyph.width == pytest.approx(instance.xAdvance)
+        assert ufoGlyph.unicodes == glyphMap[glyphName]
+    assert "com.black-foundry.variable-components" in ufoGlyph.lib
+
+
+def openFailingBackend(projectPath):
+    raise ValueError("can't open the font")
+
+
+async def test_exportInstanceAsUFOZipError(testFontHandler):
+    pieces = []
+
+    async def write(data):
+        pieces.append(data)
+
+    with pytest.raises(Exception):
+        await exportInstanceAsUFOZip(
+            testFontHandler, testFontPath, openFailingBackend, {}, "Test", write
+        )
+    assert not pieces
+
+
+async def test_getExportLocation(testFontHandler):
+    assert await getExportLocation(
+        testFontHandler, {"location": json.dumps({"weight": 500})}
+    ) == ({"weight": 500}, "weight500")
+    assert await getExportLocation(
+        testFontHandler, {"location": "{}", "styleName": "Regular"}
+    ) == ({}, "Regular")
+
+    dsDoc = testFontHandler.backend.dsDoc
+    dsDoc.addInstance(
+        InstanceDescriptor(
+            name="bold", styleName="Bold", userLocation={"weight": 900, "width": 0}
+        )
+    )
+    location, styleName = await getExportLocation(testFontHandler, {"instance": "Bold"})
+    assert styleName == "Bold"
+    assert location == {"weight": 900, "width": 0}
+
+    for query in [
+        {"instance": "Black"},
+        {"location": "not json"},
+        {"location": json.dumps({"weight": "bold"})},
+        {"location": json.dumps({"slant": 10})},
+    ]:
+        with pytest.raises(ValueError):
+            await getExportLocation(testFontHandler, query)
+
+
+async def test_exportInstanceHandler(tmp_path):
+    projectManager = FileSystemProjectManager(mutatorSansDir, readOnly=True)
+    httpApp = web.Application()
+    projectManager.setupWebRoutes(SimpleNamespace(httpApp=httpApp))
+    async with TestClient(TestServer(httpApp)) as client:
+        response = await client.get(
+            "/exportinstance/MutatorSans.designspace",
+            params={"location": json.dumps({"weight": 700}), "styleName": "Bold"},
+        )
+        assert response.status == 200
+        assert response.content_type == "application/zip"
+        ufoName, reader = readZippedUFO(await response.read(), tmp_path)
+        assert ufoName == "MutatorSans-Bold.ufo"
+        assert "A" in reader.getGlyphSet()
+
+        response = await client.get(
+            "/exportinstance/MutatorSans.designspace",
+            params={"location": json.dumps({"slant": 10})},
+        )
+        assert response.status == 400
+        response = await client.get("/exportinstance/Nonexistent.designspace")
+        assert response.status == 404
+    await projectManager.close()
+
+
+async def test_exportInstanceHandlerErrors(monkeypatch):
+    projectManager = FileSystemProjectManager(mutatorSansDir, readOnly=True)
+    httpApp = web.Application()
+    projectManager.setupWebRoutes(SimpleNamespace(httpApp=httpApp))
+    async with TestClient(TestServer(httpApp)) as client:
+        # An error before any data is written results in an error status
+        await projectManager.getRemoteSubject("/MutatorSans.designspace", "yes")
+        monkeypatch.setattr(projectmanager, "getFileSystemBackend", openFailingBackend)
+        response = await client.get("/exportinstance/MutatorSans.designspace")
+        assert response.status == 500
+
+        # An error after the headers are sent aborts the connection
+        async def failingExport(*args, **kwargs):
+            write = args[5]
+            await write(b"PK")
+            raise ValueError("export failed")
+
+        monkeypatch.setattr(projectmanager, "exportInstanceAsUFOZip", failingExport)
+        response = await client.get("/exportinstance/MutatorSans.designspace")
+        assert response.status == 200
+        with pytest.raises(ClientPayloadError):
+            await response.read()
+    await projectManager.close()
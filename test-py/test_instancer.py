@@ -0,0 +1,166 @@
+import pathlib
+
+import pytest
+from fontTools.misc.vector import Vector
+from fontTools.varLib.models import VariationModel
+
+from fontra.backends.designspace import DesignspaceBackend
+from fontra.core.classes import Component, Layer, Source, StaticGlyph, VariableGlyph
+from fontra.core.instancer import GlyphInstancer, getVariationModel
+from fontra.core.packedpath import PackedPath
+
+dataDir = pathlib.Path(__file__).resolve().parent / "data"
+
+
+@pytest.fixture(scope="module")
+def testFont():
+    return DesignspaceBackend.fromPath(
+        dataDir / "mutatorsans" / "MutatorSans.designspace"
+    )
+
+
+async def makeInstancer(testFont, glyphName):
+    glyph = await testFont.getGlyph(glyphName)
+    return GlyphInstancer(glyph, await testFont.getGlobalAxes())
+
+
+def referenceInstance(instancer, location):
+    # Interpolate the path coordinates and the advance width with fontTools
+    normalizedLocation = dict(instancer.getNormalizedLocation(location))
+    model = VariationModel([dict(loc) for loc in instancer.sourceLocations])
+    masterValues = [
+        Vector(
+            [*instancer.glyph.layers[source.layerName].glyph.path.coordinates]
+            + [instancer.glyph.layers[source.layerName].glyph.xAdvance]
+        )
+        for source in instancer.sources
+    ]
+    return list(model.interpolateFromMasters(normalizedLocation, masterValues))
+
+
+@pytest.mark.parametrize("glyphName", ["A", "B", "Q", "period"])
+@pytest.mark.parametrize(
+    "location",
+    [
+        {"weight": 500, "width": 500},
+        {"weight": 100, "width": 1000},
+        {"weight": 321, "width": 123},
+        {"weight": 2000},
+    ],
+)
+async def test_instantiate(testFont, glyphName, location):
+    instancer = await makeInstancer(testFont, glyphName)
+    instance = instancer.instantiate(location)
+    expected = referenceInstance(instancer, location)
+    assert list(instance.path.coordinates) + [instance.xAdvance] == pytest.approx(
+        expected
+    )
+    defaultGlyph = instancer.glyph.layers[instancer.sources[0].layerName].glyph
+    assert instance.path.contourInfo == defaultGlyph.path.contourInfo
+    assert instance.path.pointTypes == defaultGlyph.path.pointTypes
+    assert [c.name for c in instance.components] == [
+        c.name for c in defaultGlyph.components
+    ]
+
+
+async def test_instantiate_sourceLocation(testFont):
+    instancer = await makeInstancer(testFont, "A")
+    boldSource = next(s for s in instancer.sources if s.name == "BoldCondensed")
+    # The weight axis maps user space 900 to designspace 850
+    instance = instancer.instantiate({"weight": 900, "width": 0})
+    assert instance is instancer.glyph.layers[boldSource.layerName].glyph
+
+
+async def test_instantiate_localAxes(testFont):
+    instancer = await makeInstancer(testFont, "varcotest2")
+    assert [axis.name for axis in instancer.glyph.axes] == ["flip", "flop"]
+    defaultGlyph = instancer.instantiate({})
+    flipGlyph = instancer.instantiate({"flip": 100})
+    halfwayGlyph = instancer.instantiate({"flip": 50})
+    assert list(halfwayGlyph.path.coordinates) == pytest.approx(
+        [
+            (a + b) / 2
+            for a, b in zip(defaultGlyph.path.coordinates, flipGlyph.path.coordinates)
+        ]
+    )
+
+
+async def test_instantiate_components(testFont):
+    instancer = await makeInstancer(testFont, "varcotest1")
+    instance = instancer.instantiate({"weight": 500})
+    assert [component.name for component in instance.components] == [
+        "A",
+        "varcotest2",
+        "varcotest2",
+    ]
+
+
+async def test_sharedModel(testFont):
+    instancerA = await makeInstancer(testFont, "A")
+    instancerB = await makeInstancer(testFont, "period")
+    instancerC = await makeInstancer(testFont, "B")
+    for instancer in [instancerA, instancerB, instancerC]:
+        instancer.instantiate({"weight": 500})
+    assert instancerA.sourceLocations == instancerB.sourceLocations
+    assert instancerA._model is instancerB._model
+    # B has an additional intermediate source
+    assert instancerA._model is not instancerC._model
+
+
+def test_getVariationModel():
+    locations = [(), (("weight", 1.0),), (("width", 1.0),)]
+    axes = [("weight", 100, 100, 900), ("width", 0, 0, 1000)]
+    model = getVariationModel(locations, axes)
+    assert model is getVariationModel(list(locations), list(axes))
+    assert model.supports == [{}, {"weight": (0, 1.0, 1.0)}, {"width": (0, 1.0, 1.0)}]
+    otherAxes = [("weight", 100, 100, 800), ("width", 0, 0, 1000)]
+    assert model is not getVariationModel(locations, otherAxes)
+
+
+def makeSquareGlyph(size, components=()):
+    path = PackedPath.fromUnpackedContours(
+        [
+            dict(
+                points=[
+                    dict(x=0, y=0),
+                    dict(x=0, y=size),
+                    dict(x=size, y=size),
+                    dict(x=size, y=0),
+                ],
+                isClosed=True,
+            )
+        ]
+    )
+    return StaticGlyph(path=path, components=list(components), xAdvance=size)
+
+
+def makeVariableGlyph(lightGlyph, boldGlyph):
+    return VariableGlyph(
+        "test",
+        sources=[
+            Source(name="light", layerName="light", location={"weight": 150}),
+            Source(name="bold", layerName="bold", location={"weight": 850}),
+        ],
+        layers={"light": Layer(glyph=lightGlyph), "bold": Layer(glyph=boldGlyph)},
+    )
+
+
+async def test_componentLocations(testFont):
+    lightGlyph = makeSquareGlyph(100, [Component("x", location={"a": 0, "b": 10})])
+    boldGlyph = makeSquareGlyph(300, [Component("x", location={"a": 100, "b": 20})])
+    glyph = makeVariableGlyph(lightGlyph, boldGlyph)
+    # In designspace coordinates, the weight axis goes from 150 to 850
+    instancer = GlyphInstancer(glyph, await testFont.getGlobalAxes())
+    instance = instancer.instantiate({"weight": 500})
+    assert instance.xAdvance == pytest.approx(200)
+    assert instance.components[0].location == pytest.approx({"a": 50, "b": 15})
+
+
+async def test_incompatibleSources(testFont, caplog):
+    lightGlyph = makeSquareGlyph(100)
+    boldGlyph = makeSquareGlyph(300, [Component("x")])
+    glyph = makeVariableGlyph(lightGlyph, boldGlyph)
+    instancer = GlyphInstancer(glyph, await testFont.getGlobalAxes())
+    assert instancer.instantiate({"weight": 300}) is lightGlyph
+    assert instancer.instantiate({"weight": 700}) is boldGlyph
+    assert "Interpolation error while instantiating glyph test" in caplog.text
@@ -1,4 +1,4 @@
-from fontra.core.lrucache import LRUCache
+from fontra.core.lrucache import LRUCache, SizedLRUCache, estimateSize
 
 
 def test_lruCache():
@@ -19,3 +19,36 @@ def test_lruCache():
     _ = cache["a"]
     cache["f"] = None
     assert ["c", "e", "a", "f"] == list(cache.keys())
+
+
+def test_sizedLRUCache():
+    cache = SizedLRUCache(10, sizeFunc=len, isPinned=lambda key: key.isupper())
+    cache["a"] = "xxxx"
+    cache["b"] = "xxxx"
+    cache["A"] = "x" * 100
+    assert ["A", "a", "b"] == list(cache.keys())
+    assert 8 == cache.totalSize
+    _ = cache["a"]
+    cache["c"] = "xxxx"
+    assert ["A", "a", "c"] == list(cache.keys())
+    assert 8 == cache.totalSize
+    assert 1 == cache.evictions
+    assert None is cache.get("b")
+    assert 1 == cache.hits
+    assert 1 == cache.misses
+    cache["d"] = "x" * 20  # too big, but the newest item is always kept
+    assert ["A", "d"] == list(cache.keys())
+    assert 20 == cache.totalSize
+    assert "x" * 20 == cache.pop("d")
+    assert 0 == cache.totalSize
+    assert None is cache.pop("d", None)
+    assert "A" in cache
+    del cache["A"]
+    assert [] == list(cache.keys())
+
+
+def test_estimateSize():
+    small = estimateSize([0.5] * 10)
+    large = estimateSize([0.5] * 1000)
+    assert small < large
+    assert estimateSize({"a": [0.5] * 1000}) > large
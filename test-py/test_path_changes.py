@@ -3,7 +3,7 @@ import pathlib
 
 import pytest
 
-from fontra.core.changes import applyChange
+from fontra.core.changes import _applyChange, applyChange
 from fontra.core.packedpath import PackedPath
 
 testDataPath = (
@@ -32,3 +32,39 @@ def test_applyChange(testName, inputPathName, change, expectedData):
     subject = PackedPath.fromUnpackedContours(pathChangeTestInputData[inputPathName])
     applyChange(subject, change)
     assert subject == expectedData
+    assert subject.coordinates.typecode == "d"
+    assert subject.pointTypes.typecode == "B"
+
+
+@pytest.mark.parametrize(
+    "testName, inputPathName, change, expectedData", pathChangeTestData
+)
+def test_applyChange_copyOnWrite(testName, inputPathName, change, expectedData):
+    path = PackedPath.fromUnpackedContours(pathChangeTestInputData[inputPathName])
+    pathCopy = path.copy()
+    subject = {"path": path}
+    applyChange(subject, {"p": ["path"], "c": [change]}, copyOnWrite=True)
+    assert subject["path"] == expectedData
+    assert path == pathCopy
+
+
+def test_applyChange_multipleChildren():
+    inputPath = pathChangeTestInputData["twoContoursMorePoints"]
+    change = {
+        "p": ["path"],
+        "c": [
+            {"f": "=xy", "a": [0, 10, 20]},
+            {"f": "=xy", "a": [1, 30, 40]},
+            {"f": "insertPoint", "a": [0, 1, {"x": 5, "y": 6}]},
+            {"f": "=xy", "a": [2, 50, 60]},
+            {"p": ["contourInfo", 0], "f": "=", "a": ["isClosed", False]},
+            {"f": "=xy", "a": [3, 70, 80]},
+        ],
+    }
+    subject = {"path": PackedPath.fromUnpackedContours(inputPath)}
+    applyChange(subject, change)
+    expectedSubject = {"path": PackedPath.fromUnpackedContours(inputPath)}
+    _applyChange(expectedSubject, change)
+    assert subject == expectedSubject
+    assert list(subject["path"].coordinates[:8]) == [10, 20, 5, 6, 50, 60, 70, 80]
+    assert not subject["path"].contourInfo[0].isClosed
@@ -0,0 +1,148 @@
+import pytest
+from fontTools.misc.transform import Transform
+from fontTools.pens.boundsPen import BoundsPen, ControlBoundsPen
+from fontTools.pens.pointPen import PointToSegmentPen
+from fontTools.pens.recordingPen import RecordingPointPen
+from fontTools.pens.transformPen import TransformPointPen
+from fontTools.varLib.models import VariationModel
+
+from fontra.core.packedpath import PackedPath, VariationError
+
+
+def makePath(*contours):
+    return PackedPath.fromUnpackedContours(
+        [
+            dict(
+                points=[dict(zip("xy", pt), **attrs) for *pt, attrs in points],
+                isClosed=isClosed,
+            )
+            for points, isClosed in contours
+        ]
+    )
+
+
+rectangle = ([(0, 0, {}), (0, 100, {}), (200, 100, {}), (200, 0, {})], True)
+insideCurve = (
+    [
+        (10, 10, {}),
+        (20, 50, {"type": "cubic"}),
+        (40, 50, {"type": "cubic"}),
+        (50, 10, {"smooth": True}),
+    ],
+    True,
+)
+overshootingCurve = (
+    [
+        (0, 0, {}),
+        (-50, 80, {"type": "cubic"}),
+        (250, 120, {"type": "cubic"}),
+        (200, 0, {}),
+    ],
+    True,
+)
+quadBlob = (
+    [(0, 0, {"type": "quad"}), (0, 300, {"type": "quad"}), (300, 0, {"type": "quad"})],
+    True,
+)
+openContour = (
+    [
+        (0, 0, {"type": "cubic"}),
+        (10, 10, {}),
+        (20, 30, {}),
+        (500, 500, {"type": "cubic"}),
+    ],
+    False,
+)
+
+geometryTestPaths = [
+    makePath(),
+    makePath(rectangle),
+    makePath(rectangle, insideCurve),
+    makePath(overshootingCurve),
+    makePath(rectangle, quadBlob),
+    makePath(quadBlob),
+    makePath(openContour),
+    makePath(rectangle, openContour, overshootingCurve),
+]
+
+
+def penBounds(path, penClass):
+    pen = penClass(None)
+    path.drawPoints(PointToSegmentPen(pen))
+    return pen.bounds
+
+
+@pytest.mark.parametrize("path", geometryTestPaths)
+def test_getBounds(path):
+    assert path.getBounds() == penBounds(path, BoundsPen)
+
+
+@pytest.mark.parametrize("path", geometryTestPaths)
+def test_getControlBounds(path):
+    bounds = path.getControlBounds()
+    if path.coordinates:
+        xs = path.coordinates[0::2]
+        ys = path.coordinates[1::2]
+        assert bounds == (min(xs), min(ys), max(xs), max(ys))
+    else:
+        assert bounds is None
+    if not path.contourInfo or all(info.isClosed for info in path.contourInfo):
+        # drawPoints() skips leading and trailing off-curves of open contours
+        assert bounds == penBounds(path, ControlBoundsPen)
+
+
+@pytest.mark.parametrize("path", geometryTestPaths)
+@pytest.mark.parametrize(
+    "transformation",
+    [
+        Transform(),
+        Transform().translate(10, -20),
+        Transform().rotate(0.3).scale(2, 0.5),
+    ],
+)
+def test_transformed(path, transformation):
+    transformedPath = path.transformed(transformation)
+    expectedPen = RecordingPointPen()
+    path.drawPoints(TransformPointPen(expectedPen, transformation))
+    pen = RecordingPointPen()
+    transformedPath.drawPoints(pen)
+    assert pen.value == pytest.approx(expectedPen.value)
+    assert transformedPath.pointTypes == path.pointTypes
+    assert transformedPath.contourInfo == path.contourInfo
+    assert transformedPath.contourInfo is not path.contourInfo
+
+
+def test_isCompatible():
+    path1 = makePath(rectangle, insideCurve)
+    path2 = path1.transformed((2, 0, 0, 2, 0, 0))
+    assert path1.isCompatible(path2)
+    # smooth flags don't affect compatibility
+    path2.pointTypes[0] |= 0x08
+    assert path1.isCompatible(path2)
+    path2.pointTypes[1] = 0x02
+    assert not path1.isCompatible(path2)
+    assert not path1.isCompatible(makePath(rectangle))
+    assert not path1.isCompatible(makePath(insideCurve, rectangle))
+    with pytest.raises(VariationError):
+        path1.interpolate(makePath(rectangle), 0.5)
+
+
+def test_interpolate():
+    path1 = makePath(rectangle, insideCurve)
+    path2 = path1.transformed((2, 0, 0, 3, 10, 20))
+    assert path1.interpolate(path2, 0) == path1
+    assert path1.interpolate(path2, 1) == path2
+    halfway = path1.interpolate(path2, 0.5)
+    assert list(halfway.coordinates) == [
+        (a + b) / 2 for a, b in zip(path1.coordinates, path2.coordinates)
+    ]
+    assert path1 + (path2 - path1) * 0.5 == halfway
+
+
+def test_variationModel():
+    model = VariationModel([{}, {"wght": 1}])
+    path1 = makePath(rectangle, quadBlob)
+    path2 = path1.transformed((1.5, 0, 0, 1, 0, 0))
+    deltas = model.getDeltas([path1, path2])
+    instance = model.interpolateFromDeltas({"wght": 0.25}, deltas)
+    assert instance == path1.interpolate(path2, 0.25)
@@ -1,6 +1,7 @@
 from dataclasses import asdict
 
 import pytest
+from fontTools.pens.recordingPen import RecordingPointPen
 
 from fontra.core.classes import from_dict
 from fontra.core.packedpath import PackedPath, PackedPathPointPen
@@ -136,3 +137,77 @@ async def test_unpackPathRoundTrip(path):
     repackedPath = PackedPath.fromUnpackedContours(unpackedPath)
     assert path == repackedPath
     assert asdict(path) == asdict(repackedPath)
+
+
+def drawnCoordinates(path):
+    pen = RecordingPointPen()
+    path.drawPoints(pen)
+    return [
+        value
+        for method, args, _ in pen.value
+        if method == "addPoint"
+        for value in args[0]
+    ]
+
+
+def test_keepIntegralFloats():
+    pen = PackedPathPointPen(keepIntegralFloats=True)
+    pen.beginPath()
+    for pt in [(0, 364.0), (10.5, 20), (30.0, 40)]:
+        pen.addPoint(pt, "line")
+    pen.endPath()
+    path = pen.getPath()
+    expectedCoordinates = [0, 364.0, 10.5, 20, 30.0, 40]
+    assert drawnCoordinates(path) == expectedCoordinates
+    assert list(map(type, drawnCoordinates(path))) == list(
+        map(type, expectedCoordinates)
+    )
+    assert path == PackedPath.fromUnpackedContours(path.unpackedContours())
+
+    # Edited coordinates are no longer integral floats, unedited ones still are
+    path = path.copy()
+    path.setPointPosition(0, 1, 364)
+    path.setPointPosition(2, 31, 40)
+    drawn = drawnCoordinates(path)
+    assert drawn == [1, 364, 10.5, 20, 31, 40]
+    assert [type(value) for value in drawn] == [int, float, float, int, int, int]
+
+    # Without keepIntegralFloats, integral values are drawn as ints
+    pen = PackedPathPointPen()
+    pen.beginPath()
+    pen.addPoint((0, 364.0), "line")
+    pen.endPath()
+    assert [type(value) for value in drawnCoordinates(pen.getPath())] == [int, int]
+
+
+def test_keepIntegralFloatsInsertDeletePoint():
+    pen = PackedPathPointPen(keepIntegralFloats=True)
+    pen.beginPath()
+    for pt in [(0, 364.0), (10, 20), (30.0, 40)]:
+        pen.addPoint(pt, "line")
+    pen.endPath()
+    path = pen.getPath()
+
+    # The recorded integral floats move along with their points
+    insertedPath = path.copy()
+    insertedPath.insertPoint(0, 0, dict(x=0, y=364))
+    drawn = drawnCoordinates(insertedPath)
+    assert drawn == [0, 364, 0, 364.0, 10, 20, 30.0, 40]
+    expectedTypes = [int, int, int, float, int, int, float, int]
+    assert [type(value) for value in drawn] == expectedTypes
+
+    # The path round-trips through a point pen after the insert
+    roundTripPen = PackedPathPointPen(keepIntegralFloats=True)
+    insertedPath.drawPoints(roundTripPen)
+    roundTripped = drawnCoordinates(roundTripPen.getPath())
+    assert roundTripped == drawn
+    assert [type(value) for value in roundTripped] == expectedTypes
+
+    # The original path is unaffected
+    expectedTypes = [int, float, int, int, float, int]
+    assert [type(value) for value in drawnCoordinates(path)] == expectedTypes
+
+    path.deletePoint(0, 1)
+    drawn = drawnCoordinates(path)
+    assert drawn == [0, 364.0, 30.0, 40]
+    assert [type(value) for value in drawn] == [int, float, float, int]
@@ -0,0 +1,61 @@
+import pathlib
+
+import pytest
+
+from fontra.filesystem import projectmanager
+from fontra.filesystem.projectmanager import getFileSystemBackend
+
+mutatorSansDir = pathlib.Path(__file__).resolve().parent / "data" / "mutatorsans"
+testFontPath = mutatorSansDir / "MutatorSans.designspace"
+
+
+class OldStyleBackend:
+    @classmethod
+    def fromPath(cls, path):
+        return cls()
+
+
+class ProgressBackend:
+    @classmethod
+    def fromPath(cls, path, progressCallback=None):
+        backend = cls()
+        backend.progressCallback = progressCallback
+        return backend
+
+
+class KeywordsBackend:
+    @classmethod
+    def fromPath(cls, path, **kwargs):
+        backend = cls()
+        backend.kwargs = kwargs
+        return backend
+
+
+class FakeEntryPoint:
+    def __init__(self, backendClass):
+        self.backendClass = backendClass
+
+    def load(self):
+        return self.backendClass
+
+
+@pytest.mark.parametrize(
+    "backendClass", [OldStyleBackend, ProgressBackend, KeywordsBackend]
+)
+def test_getFileSystemBackend_progressCallback(monkeypatch, backendClass):
+    monkeypatch.setattr(
+        projectmanager,
+        "entry_points",
+        lambda group: {"designspace": FakeEntryPoint(backendClass)},
+    )
+
+    def progressCallback(fraction):
+        pass
+
+    backend = getFileSystemBackend(testFontPath, progressCallback=progressCallback)
+    assert isinstance(backend, backendClass)
+    if backendClass is ProgressBackend:
+        assert backend.progressCallback is progressCallback
+    elif backendClass is KeywordsBackend:
+        assert backend.kwargs == {"progressCallback": progressCallback}
+    assert isinstance(getFileSystemBackend(testFontPath), backendClass)
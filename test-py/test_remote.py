@@ -0,0 +1,191 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import WSMsgType
+
+from fontra.core.binarymessage import BINARY_ENCODING, decodeBinaryMessage
+from fontra.core.fonthandler import remoteMethod
+from fontra.core.packedpath import PackedPath
+from fontra.core.remote import (
+    PreEncodedDict,
+    PreEncodedValue,
+    RemoteCallStatistics,
+    RemoteObjectConnection,
+)
+
+
+class FakeFrameWriter:
+    def __init__(self, compress):
+        self.compress = compress
+
+
+class FakeMessage:
+    def __init__(self, data):
+        self.data = data
+        self.type = WSMsgType.BINARY if isinstance(data, bytes) else WSMsgType.TEXT
+
+    def json(self):
+        return json.loads(self.data)
+
+
+class FakeWebSocket:
+    def __init__(self, incomingMessages, compress=15):
+        self.incomingMessages = [FakeMessage(json.dumps(m)) for m in incomingMessages]
+        self.compress = compress
+        self._writer = FakeFrameWriter(compress)
+        self.sentFrames = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.incomingMessages:
+            raise StopAsyncIteration
+        return self.incomingMessages.pop(0)
+
+    async def send_str(self, data):
+        self.sentFrames.append((json.loads(data), bool(self._writer.compress)))
+        await asyncio.sleep(0)  # like waiting for the transport to drain
+
+    async def send_bytes(self, data):
+        self.sentFrames.append((decodeBinaryMessage(data), bool(self._writer.compress)))
+        await asyncio.sleep(0)
+
+    async def close(self):
+        pass
+
+
+preEncodedPath = PreEncodedValue(
+    PackedPath(coordinates=[0, 0.5, 100, 200], pointTypes=[0, 0])
+)
+
+
+class DummySubject:
+    @remoteMethod
+    async def getData(self, size, *, connection):
+        return "x" * size
+
+    @remoteMethod
+    async def getPath(self, *, connection):
+        return PackedPath(coordinates=[0, 0.5, 100, 200], pointTypes=[0, 0])
+
+    @remoteMethod
+    async def getPreEncodedPath(self, *, connection):
+        return preEncodedPath
+
+    @remoteMethod
+    async def getPreEncodedPaths(self, *, connection):
+        return PreEncodedDict({"a": preEncodedPath, "b": None, "c": preEncodedPath})
+
+
+def callMessage(clientCallID, methodName, arguments):
+    return {
+        "client-call-id": clientCallID,
+        "method-name": methodName,
+        "arguments": arguments,
+    }
+
+
+async def runConnection(websocket, numResponses=2, **kwargs):
+    connection = RemoteObjectConnection(websocket, "/", DummySubject(), True, **kwargs)
+    await connection.handleConnection()
+    # wait for the call tasks to finish
+    while len(websocket.sentFrames) < numResponses:
+        await asyncio.sleep(0)
+    return connection
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encodings", [[], [BINARY_ENCODING]])
+async def test_sendPackedPath(encodings):
+    websocket = FakeWebSocket(
+        [
+            {"client-uuid": "test-client", "encodings": encodings},
+            callMessage(0, "getPath", []),
+        ]
+    )
+    await runConnection(websocket, numResponses=1)
+    [(message, _)] = websocket.sentFrames
+    assert message["return-value"] == {
+        "coordinates": [0, 0.5, 100, 200],
+        "pointTypes": [0, 0],
+        "contourInfo": [],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encodings", [[], [BINARY_ENCODING]])
+async def test_sendPreEncodedValue(encodings):
+    websocket = FakeWebSocket(
+        [
+            {"client-uuid": "test-client", "encodings": encodings},
+            callMessage(0, "getPreEncodedPath", []),
+            callMessage(1, "getPreEncodedPath", []),
+            callMessage(2, "getPath", []),
+        ]
+    )
+    await runConnection(websocket, numResponses=3)
+    sentFrames = sorted(websocket.sentFrames, key=lambda f: f[0]["client-call-id"])
+    [message0, message1, message2] = [message for message, _ in sentFrames]
+    assert message0["return-value"] == message2["return-value"]
+    assert message1 == {**message0, "client-call-id": 1}
+    if encodings:
+        assert preEncodedPath._binary is not None
+    else:
+        assert preEncodedPath._json is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encodings", [[], [BINARY_ENCODING]])
+async def test_compressionThreshold(encodings):
+    websocket = FakeWebSocket(
+        [
+            {"client-uuid": "test-client", "encodings": encodings},
+            callMessage(0, "getData", [10]),
+            callMessage(1, "getData", [1000]),
+        ]
+    )
+    await runConnection(websocket, compressionThreshold=500)
+    sentFrames = sorted(websocket.sentFrames, key=lambda f: f[0]["client-call-id"])
+    assert [len(message["return-value"]) for message, _ in sentFrames] == [10, 1000]
+    assert [compressed for _, compressed in sentFrames] == [False, True]
+    assert websocket._writer.compress == 15
+
+
+@pytest.mark.asyncio
+async def test_remoteCallStatistics():
+    callStatistics = RemoteCallStatistics()
+    websocket = FakeWebSocket(
+        [
+            {"client-uuid": "test-client"},
+            callMessage(0, "getData", [10]),
+            callMessage(1, "getData", [1000]),
+        ]
+    )
+    await runConnection(websocket, callStatistics=callStatistics)
+    summary = callStatistics.getSummary()
+    assert list(summary) == ["getData"]
+    assert summary["getData"]["calls"] == 2
+    assert summary["getData"]["bytesIn"] == sum(
+        len(json.dumps(callMessage(i, "getData", [size])))
+        for i, size in enumerate([10, 1000])
+    )
+    assert summary["getData"]["bytesOut"] > 1010
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encodings", [[], [BINARY_ENCODING]])
+async def test_sendPreEncodedDict(encodings):
+    websocket = FakeWebSocket(
+        [
+            {"client-uuid": "test-client", "encodings": encodings},
+            callMessage(0, "getPreEncodedPaths", []),
+            callMessage(1, "getPath", []),
+        ]
+    )
+    await runConnection(websocket, numResponses=2)
+    sentFrames = sorted(websocket.sentFrames, key=lambda f: f[0]["client-call-id"])
+    [message0, message1] = [message for message, _ in sentFrames]
+    path = message1["return-value"]
+    assert message0["return-value"] == {"a": path, "b": None, "c": path}